@@ -0,0 +1,456 @@
+"""
+HTTP Load Test
+Drives the service under gunicorn at a fixed arrival rate and reports latency percentiles
+
+Usage:
+    python benchmarks/load_test.py --rate 50,100,200 --duration 30
+    python benchmarks/load_test.py --worker-class sync,gthread --workers 1,2,4 --save load.json
+    python benchmarks/load_test.py --url http://staging:5000 --rate 200
+
+For every worker class and worker count combination the harness starts
+`gunicorn --config gunicorn.conf.py app:create_app()` on a free local
+port, logs in through /api/v1/auth/login and replays a weighted mix of
+/analyze, /batch and /model/info calls. Requests are sent on a fixed
+schedule (open loop): a slow server does not slow the sender down, and
+latency is measured from the moment a request was due, so queueing
+delay shows up in the percentiles instead of being hidden. Each
+configuration reports throughput, error counts and p50/p95/p99 latency
+per endpoint, followed by a comparison table across configurations.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+from run_benchmarks import TEXT_LENGTHS, VOCABULARY
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+API_PREFIX = '/api/v1'
+ENDPOINTS = ('analyze', 'batch', 'model_info')
+DEFAULT_MIX = 'analyze=70,batch=20,model_info=10'
+# Worker classes needing an optional package
+WORKER_CLASS_MODULES = {'gevent': 'gevent', 'eventlet': 'eventlet'}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """
+    Parse an endpoint mix such as 'analyze=70,batch=20,model_info=10'
+
+    Returns:
+        Endpoint name to weight
+    """
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name} (choose from {', '.join(ENDPOINTS)})")
+        weights[name] = float(weight or 1)
+    if not weights or sum(weights.values()) <= 0:
+        raise ValueError("Endpoint mix needs a positive weight")
+    return weights
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class RequestFactory:
+    """
+    Builds request payloads for each endpoint of the mix
+    """
+
+    def __init__(self, batch_size: int, text_words: int, repeat_ratio: float, seed: int = 42):
+        """
+        Initialize request factory
+
+        Args:
+            batch_size: Texts per /batch request
+            text_words: Words per generated text
+            repeat_ratio: Fraction of texts drawn from a small fixed pool
+                (prediction-cache hits); the rest are unique
+            seed: Random seed
+        """
+        self.batch_size = batch_size
+        self.text_words = text_words
+        self.repeat_ratio = repeat_ratio
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._pool = [self._make_text() for _ in range(50)]
+
+    def _make_text(self) -> str:
+        return ' '.join(self._rng.choices(VOCABULARY, k=self.text_words))
+
+    def text(self) -> str:
+        with self._lock:
+            if self._rng.random() < self.repeat_ratio:
+                return self._rng.choice(self._pool)
+            # A unique suffix keeps the text out of the prediction cache
+            self._counter += 1
+            return f'{self._make_text()} {self._counter}'
+
+    def build(self, endpoint: str) -> Tuple[str, str, Optional[Dict]]:
+        """(method, path, JSON body) of one request"""
+        if endpoint == 'analyze':
+            return 'POST', f'{API_PREFIX}/analyze', {'text': self.text()}
+        if endpoint == 'batch':
+            return 'POST', f'{API_PREFIX}/batch', {'texts': [self.text() for _ in range(self.batch_size)]}
+        return 'GET', f'{API_PREFIX}/model/info', None
+
+
+class LoadGenerator:
+    """
+    Open-loop request sender with per-endpoint latency recording
+    """
+
+    def __init__(self, base_url: str, token: str, factory: RequestFactory, concurrency: int,
+                 timeout: float):
+        """
+        Initialize load generator
+
+        Args:
+            base_url: Server root, e.g. http://127.0.0.1:5000
+            token: Bearer token sent with every request
+            factory: Payload builder
+            concurrency: Maximum requests in flight (sender threads)
+            timeout: Per-request timeout in seconds
+        """
+        self.base_url = base_url.rstrip('/')
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.factory = factory
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _send(self, endpoint: str, due: float) -> Tuple[str, float, str]:
+        method, path, body = self.factory.build(endpoint)
+        try:
+            response = self._session().request(method, self.base_url + path, json=body,
+                                               headers=self.headers, timeout=self.timeout)
+            outcome = str(response.status_code)
+        except requests.RequestException as e:
+            outcome = type(e).__name__
+        # Measured from when the request was due, not when a sender was free
+        return endpoint, time.perf_counter() - due, outcome
+
+    def run(self, rate: float, duration: float, mix: Dict[str, float], seed: int = 42) -> Dict:
+        """
+        Send requests at `rate` per second for `duration` seconds
+
+        Returns:
+            Report with overall and per-endpoint results
+        """
+        rng = random.Random(seed)
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        total = int(rate * duration)
+        schedule = rng.choices(names, weights=weights, k=total)
+
+        futures = []
+        lag = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            started = time.perf_counter()
+            for i, endpoint in enumerate(schedule):
+                due = started + i / rate
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    lag.append(-delay)
+                futures.append(pool.submit(self._send, endpoint, due))
+            results = [future.result() for future in futures]
+            elapsed = time.perf_counter() - started
+
+        return summarize(results, elapsed, rate, max(lag, default=0.0))
+
+
+def percentiles(latencies: List[float]) -> Dict:
+    """p50/p95/p99/max of latencies in milliseconds"""
+    if not latencies:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'max_ms': round(float(values.max()), 2)
+    }
+
+
+def summarize(results: List[Tuple[str, float, str]], elapsed: float, rate: float, max_lag: float) -> Dict:
+    """
+    Aggregate (endpoint, latency, outcome) samples
+
+    Only 2xx responses count towards throughput and latency percentiles;
+    everything else is reported under errors by status code or exception.
+    """
+    def section(samples):
+        ok = [latency for _, latency, outcome in samples if outcome.startswith('2')]
+        errors = Counter(outcome for _, _, outcome in samples if not outcome.startswith('2'))
+        return dict(
+            {'requests': len(samples), 'ok': len(ok), 'errors': dict(errors),
+             'throughput_rps': round(len(ok) / elapsed, 2) if elapsed else 0.0},
+            **percentiles(ok)
+        )
+
+    endpoints = {}
+    for endpoint in ENDPOINTS:
+        samples = [sample for sample in results if sample[0] == endpoint]
+        if samples:
+            endpoints[endpoint] = section(samples)
+
+    return {
+        'target_rps': rate,
+        'elapsed_s': round(elapsed, 3),
+        # Sender fell behind the schedule (client-side bottleneck) by this much
+        'max_sender_lag_ms': round(max_lag * 1000, 2),
+        'overall': section(results),
+        'endpoints': endpoints
+    }
+
+
+class GunicornServer:
+    """
+    gunicorn running the app on a local port for the duration of a test
+    """
+
+    def __init__(self, worker_class: str, workers: int, threads: int, rate_limits: bool,
+                 startup_timeout: float = 60.0, extra_env: Optional[Dict] = None):
+        self.worker_class = worker_class
+        self.workers = workers
+        self.threads = threads
+        self.rate_limits = rate_limits
+        self.startup_timeout = startup_timeout
+        self.extra_env = extra_env or {}
+        self.port = free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.process = None
+        self._tmp_dir = None
+        self._log = None
+
+    def __enter__(self):
+        self._tmp_dir = tempfile.mkdtemp(prefix='sentiment-load-')
+        env = dict(
+            os.environ,
+            FLASK_ENV='production',
+            PROMETHEUS_MULTIPROC_DIR=os.path.join(self._tmp_dir, 'metrics'),
+            RATE_LIMIT_PATH=os.path.join(self._tmp_dir, 'ratelimit'),
+            RATE_LIMIT_ENABLED='true' if self.rate_limits else 'false',
+            LOG_LEVEL=os.getenv('LOG_LEVEL', 'WARNING'),
+            **self.extra_env
+        )
+        command = [
+            sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+            '--bind', f'127.0.0.1:{self.port}',
+            '--workers', str(self.workers),
+            '--worker-class', self.worker_class,
+            '--threads', str(self.threads),
+            '--log-level', 'warning',
+            'app:create_app()'
+        ]
+        # Server output goes to a file so it does not interleave with the report
+        self._log = open(os.path.join(self._tmp_dir, 'gunicorn.log'), 'wb')
+        self.process = subprocess.Popen(command, cwd=SRC_DIR, env=env, stdout=self._log,
+                                        stderr=subprocess.STDOUT, start_new_session=True)
+        self._wait_ready()
+        return self
+
+    def log_tail(self, lines: int = 20) -> str:
+        """Last lines of the server output"""
+        with open(self._log.name, 'rb') as f:
+            return b''.join(f.readlines()[-lines:]).decode('utf-8', 'replace')
+
+    def _wait_ready(self):
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                output = self.log_tail()
+                self.__exit__(None, None, None)
+                raise RuntimeError(f"gunicorn exited with status {self.process.returncode}:\n{output}")
+            try:
+                if requests.get(f'{self.url}/ready', timeout=1).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"gunicorn did not become ready within {self.startup_timeout}s")
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self.process is not None and self.process.poll() is None:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                self.process.wait()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+
+def login(base_url: str, username: str, password: str) -> str:
+    """Access token from /api/v1/auth/login"""
+    response = requests.post(f'{base_url.rstrip("/")}{API_PREFIX}/auth/login',
+                             json={'username': username, 'password': password}, timeout=10)
+    response.raise_for_status()
+    return response.json()['access_token']
+
+
+def run_load(base_url: str, args, mix: Dict[str, float], rate: float) -> Dict:
+    """Log in, warm up and run the measured load against one server"""
+    token = login(base_url, args.username, args.password)
+    factory = RequestFactory(args.batch_size, args.text_words, args.repeat_ratio, seed=args.seed)
+    generator = LoadGenerator(base_url, token, factory, args.concurrency, args.timeout)
+    if args.warmup > 0:
+        generator.run(rate, args.warmup, mix, seed=args.seed + 1)
+    return generator.run(rate, args.duration, mix, seed=args.seed)
+
+
+def print_report(label: str, report: Dict):
+    print(f"\n{label}: target {report['target_rps']:.1f} req/s over {report['elapsed_s']:.1f}s"
+          f" (max sender lag {report['max_sender_lag_ms']:.1f} ms)")
+    print(f"{'endpoint':<12} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}")
+    rows = list(report['endpoints'].items()) + [('overall', report['overall'])]
+    for name, result in rows:
+        errors = sum(result['errors'].values())
+        latencies = [result[key] for key in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms')]
+        formatted = ' '.join(f'{value:>9.2f}' if value is not None else f'{"-":>9}' for value in latencies)
+        print(f"{name:<12} {result['requests']:>9} {errors:>7} {result['throughput_rps']:>9.1f} {formatted}")
+        if result['errors']:
+            print(f"{'':<12} errors: {result['errors']}")
+
+
+def print_comparison(runs: List[Dict]):
+    print(f"\n{'worker class':<14} {'workers':>7} {'threads':>7} {'target':>7} {'ok rps':>9} {'errors':>7} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for run in runs:
+        if 'error' in run:
+            print(f"{run['worker_class']:<14} {run['workers']:>7} {run['threads']:>7} {run['rate']:>7.0f}  "
+                  f"{run['error']}")
+            continue
+        overall = run['report']['overall']
+        latencies = ' '.join(
+            f'{overall[key]:>9.2f}' if overall[key] is not None else f'{"-":>9}'
+            for key in ('p50_ms', 'p95_ms', 'p99_ms')
+        )
+        print(f"{run['worker_class']:<14} {run['workers']:>7} {run['threads']:>7} {run['rate']:>7.0f} "
+              f"{overall['throughput_rps']:>9.1f} {sum(overall['errors'].values()):>7} {latencies}")
+
+
+def main(argv=None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description='Sentiment service HTTP load test')
+    parser.add_argument('--url', help='Test an already running server instead of starting gunicorn')
+    parser.add_argument('--worker-class', default='gthread',
+                        help='Comma-separated gunicorn worker classes (e.g. sync,gthread,gevent)')
+    parser.add_argument('--workers', default='2', help='Comma-separated worker counts (e.g. 1,2,4)')
+    parser.add_argument('--threads', type=int, default=8,
+                        help='Threads per gthread worker (other classes use 1)')
+    parser.add_argument('--rate', default='50',
+                        help='Comma-separated arrival rates in requests per second (e.g. 50,100,200)')
+    parser.add_argument('--duration', type=float, default=20.0, help='Measured seconds per rate')
+    parser.add_argument('--warmup', type=float, default=3.0, help='Unmeasured seconds before measuring')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Endpoint weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--batch-size', type=int, default=20, help='Texts per /batch request')
+    parser.add_argument('--text-words', type=int, default=TEXT_LENGTHS['short'] * 2,
+                        help='Words per generated text')
+    parser.add_argument('--repeat-ratio', type=float, default=0.0,
+                        help='Fraction of texts repeated from a small pool (prediction-cache hits)')
+    parser.add_argument('--concurrency', type=int, default=64, help='Maximum requests in flight')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+    parser.add_argument('--username', default='admin@university.edu')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--rate-limits', action='store_true',
+                        help='Keep per-user rate limits on (429s are reported as errors)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save', help='Write the report to this JSON file')
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    rates = [float(rate) for rate in args.rate.split(',')]
+    runs = []
+
+    if args.url:
+        for rate in rates:
+            report = run_load(args.url, args, mix, rate)
+            print_report(args.url, report)
+            runs.append({'url': args.url, 'rate': rate, 'report': report})
+    else:
+        for worker_class in [name.strip() for name in args.worker_class.split(',')]:
+            module = WORKER_CLASS_MODULES.get(worker_class)
+            missing = module is not None and importlib.util.find_spec(module) is None
+            if missing:
+                print(f"\nSkipping {worker_class}: {module} is not installed")
+            # gunicorn turns sync workers with threads > 1 into gthread ones
+            threads = args.threads if worker_class == 'gthread' else 1
+            for workers in [int(count) for count in args.workers.split(',')]:
+                config_runs = [{'worker_class': worker_class, 'workers': workers, 'threads': threads,
+                                'rate': rate} for rate in rates]
+                runs.extend(config_runs)
+                if missing:
+                    for run in config_runs:
+                        run['error'] = f'skipped: {module} is not installed'
+                    continue
+                try:
+                    # One server per configuration, loaded at each rate in turn
+                    with GunicornServer(worker_class, workers, threads, args.rate_limits) as server:
+                        for run in config_runs:
+                            run['report'] = run_load(server.url, args, mix, run['rate'])
+                            print_report(f'{worker_class} x {workers} workers', run['report'])
+                except (RuntimeError, requests.RequestException) as e:
+                    print(f"\n{worker_class} x {workers}: {e}")
+                    for run in config_runs:
+                        if 'report' not in run:
+                            run['error'] = str(e)
+        print_comparison(runs)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({
+                'meta': {
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'cpus': os.cpu_count(),
+                    'args': vars(args)
+                },
+                'runs': runs
+            }, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    return 1 if any('error' in run and not run['error'].startswith('skipped') for run in runs) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
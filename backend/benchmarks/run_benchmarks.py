@@ -0,0 +1,309 @@
+"""
+Performance Benchmark Suite
+Measures model, vectorizer, auth and end-to-end request throughput and gates regressions
+
+Usage:
+    python benchmarks/run_benchmarks.py --save benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json --threshold 0.25
+
+Each benchmark reports operations per second (texts per second for the
+model benchmarks). Compare mode exits with status 1 when any benchmark
+is slower than the baseline by more than the threshold. Baselines are
+machine specific, so compare against one recorded on the same host.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache, partial
+from typing import Callable, Dict, List, Tuple
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config.settings import TestingConfig
+from models.hashing_vectorizer import HashingVectorizer
+from models.sentiment_model import SentimentAnalyzer
+from services.auth_service import AuthService
+
+VOCABULARY = [
+    'the', 'product', 'service', 'was', 'really', 'good', 'great', 'bad', 'terrible',
+    'delivery', 'happy', 'sad', 'angry', 'excellent', 'okay', 'price', 'quality', 'not'
+]
+TEXT_LENGTHS = {'short': 8, 'medium': 64, 'long': 512}
+BATCH_SIZES = (1, 10, 100)
+
+# (name, setup) pairs; setup returns (operation, units processed per call).
+# Fixtures are built inside setup, so filtered-out benchmarks cost nothing.
+Benchmark = Tuple[str, Callable[[], Tuple[Callable[[], object], int]]]
+
+
+def make_texts(count: int, words: int, seed: int = 42) -> List[str]:
+    """Generate deterministic review-like texts"""
+    rng = random.Random(seed)
+    return [' '.join(rng.choices(VOCABULARY, k=words)) for _ in range(count)]
+
+
+def measure(operation: Callable[[], object], units: int, min_time: float, repeat: int) -> Dict:
+    """
+    Time an operation
+
+    Runs enough calls to fill min_time per round and keeps the median of
+    `repeat` rounds to damp scheduler noise.
+
+    Returns:
+        Dictionary with ops_per_sec and mean_us per unit
+    """
+    operation()
+
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(calls):
+            operation()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        calls *= 2
+
+    rounds = [elapsed]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(calls):
+            operation()
+        rounds.append(time.perf_counter() - started)
+
+    per_unit = statistics.median(rounds) / (calls * units)
+    return {
+        'ops_per_sec': round(1.0 / per_unit, 2),
+        'mean_us': round(per_unit * 1e6, 3)
+    }
+
+
+def model_benchmarks() -> List[Benchmark]:
+    """SentimentAnalyzer.analyze and batch_analyze throughput"""
+    @lru_cache(maxsize=None)
+    def analyzer():
+        return SentimentAnalyzer()
+
+    def analyze(words):
+        model, text = analyzer(), make_texts(1, words)[0]
+        return lambda: model.analyze(text), 1
+
+    def batch_analyze(size):
+        model, texts = analyzer(), make_texts(size, TEXT_LENGTHS['medium'])
+        return lambda: model.batch_analyze(texts), len(texts)
+
+    return [
+        (f'model.analyze[{length_name}]', partial(analyze, words))
+        for length_name, words in TEXT_LENGTHS.items()
+    ] + [
+        (f'model.batch_analyze[{size}]', partial(batch_analyze, size))
+        for size in BATCH_SIZES
+    ]
+
+
+def vectorizer_benchmarks() -> List[Benchmark]:
+    """HashingVectorizer.transform against a fitted TfidfVectorizer"""
+    texts = make_texts(100, TEXT_LENGTHS['medium'])
+
+    @lru_cache(maxsize=None)
+    def tfidf(**params):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        # Vocabulary fitted on a larger corpus, as a trained model would carry
+        return TfidfVectorizer(**params).fit(make_texts(1000, TEXT_LENGTHS['medium'], seed=7))
+
+    def hashing(**params):
+        vectorizer = HashingVectorizer(**params)
+        return lambda: vectorizer.transform(texts), len(texts)
+
+    def tfidf_words():
+        words = tfidf(ngram_range=(1, 2))
+        return lambda: words.transform(texts), len(texts)
+
+    def tfidf_words_chars():
+        words, chars = tfidf(ngram_range=(1, 2)), tfidf(analyzer='char', ngram_range=(3, 5))
+        return lambda: (words.transform(texts), chars.transform(texts)), len(texts)
+
+    return [
+        ('vectorizer.hashing[words]', partial(hashing, char_ngrams=None)),
+        ('vectorizer.tfidf[words]', tfidf_words),
+        ('vectorizer.hashing[words+chars]', hashing),
+        ('vectorizer.tfidf[words+chars]', tfidf_words_chars)
+    ]
+
+
+def auth_benchmarks() -> List[Benchmark]:
+    """AuthService token verification and login cost"""
+    @lru_cache(maxsize=None)
+    def fixture():
+        auth_service = AuthService()
+        return auth_service, auth_service.login('student@university.edu', 'student123')['access_token']
+
+    def verify_cached():
+        auth_service, token = fixture()
+        return lambda: auth_service.verify_token(token), 1
+
+    def verify_uncached():
+        auth_service, token = fixture()
+
+        def verify():
+            auth_service.token_cache.clear()
+            return auth_service.verify_token(token)
+
+        return verify, 1
+
+    def login():
+        auth_service, _ = fixture()
+        return lambda: auth_service.login('student@university.edu', 'student123'), 1
+
+    return [
+        ('auth.verify_token[cached]', verify_cached),
+        ('auth.verify_token[uncached]', verify_uncached),
+        ('auth.login', login)
+    ]
+
+
+def http_benchmarks() -> List[Benchmark]:
+    """End-to-end latency through the Flask test client"""
+    # Fresh texts per call so the prediction cache does not hide model cost
+    counter = iter(range(10 ** 9))
+
+    @lru_cache(maxsize=None)
+    def fixture():
+        from app import create_app
+
+        client = create_app(TestingConfig).test_client()
+        token = client.post(
+            '/api/v1/auth/login',
+            json={'username': 'student@university.edu', 'password': 'student123'}
+        ).json['access_token']
+        return client, {'Authorization': f'Bearer {token}'}
+
+    def analyze():
+        client, headers = fixture()
+
+        def post_analyze():
+            response = client.post(
+                '/api/v1/analyze',
+                json={'text': f'{make_texts(1, 16)[0]} {next(counter)}'},
+                headers=headers
+            )
+            assert response.status_code == 200, response.status_code
+
+        return post_analyze, 1
+
+    def batch():
+        client, headers = fixture()
+        batch_texts = make_texts(100, TEXT_LENGTHS['medium'])
+
+        def post_batch():
+            suffix = next(counter)
+            response = client.post(
+                '/api/v1/batch',
+                json={'texts': [f'{text} {suffix}' for text in batch_texts]},
+                headers=headers
+            )
+            assert response.status_code == 200, response.status_code
+
+        return post_batch, 1
+
+    return [
+        ('http.analyze', analyze),
+        ('http.batch[100]', batch)
+    ]
+
+
+def run_benchmarks(name_filter: str = '', min_time: float = 0.2, repeat: int = 5) -> Dict:
+    """
+    Run all benchmarks matching the filter
+
+    Returns:
+        Report with environment metadata and per-benchmark results
+    """
+    results = {}
+    for name, setup in model_benchmarks() + vectorizer_benchmarks() + auth_benchmarks() + http_benchmarks():
+        if name_filter and name_filter not in name:
+            continue
+        operation, units = setup()
+        results[name] = measure(operation, units, min_time, repeat)
+        print(f"{name:<32} {results[name]['ops_per_sec']:>14,.1f} ops/s {results[name]['mean_us']:>12,.2f} us/op")
+
+    return {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'min_time': min_time,
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+
+def compare(report: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Compare a report against a baseline
+
+    Args:
+        report: Current run
+        baseline: Saved run
+        threshold: Allowed fractional throughput drop (0.25 = 25% slower)
+
+    Returns:
+        Names of benchmarks that regressed past the threshold
+    """
+    regressions = []
+    for name, result in report['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+
+        change = result['ops_per_sec'] / reference['ops_per_sec'] - 1.0
+        regressed = change < -threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<32} {change:>+8.1%} {'REGRESSION' if regressed else 'ok'}")
+
+    return regressions
+
+
+def main(argv=None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description='Sentiment service performance benchmarks')
+    parser.add_argument('--save', help='Write results to this JSON baseline file')
+    parser.add_argument('--compare', help='Baseline JSON file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed throughput drop before failing (default: 0.25)')
+    parser.add_argument('--filter', default='', help='Only run benchmarks whose name contains this')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Seconds per timing round')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing rounds per benchmark')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.filter, args.min_time, args.repeat)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,11 +3,18 @@ API Routes
 Defines all RESTful endpoints for the sentiment analysis system
 """
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, send_file, stream_with_context
 from functools import wraps
+from werkzeug.exceptions import HTTPException
+from itertools import islice
 import logging
+import math
 from datetime import datetime
 
+from services import log_pipeline
+from services.metrics import observe_stage, observe_batch_size, timed_iter
+from utils.validators import check_text, validate_batch
+
 logger = logging.getLogger(__name__)
 
 api_bp = Blueprint('api', __name__)
@@ -22,7 +29,8 @@ def require_auth(f):
             return jsonify({'error': 'Missing or invalid authorization header'}), 401
         
         token = auth_header.replace('Bearer ', '')
-        payload = current_app.auth_service.verify_token(token)
+        with observe_stage('auth'):
+            payload = current_app.auth_service.verify_token(token)
         
         if not payload:
             return jsonify({'error': 'Invalid or expired token'}), 401
@@ -49,6 +57,61 @@ def require_role(role):
         return decorated_function
     return decorator
 
+def require_model(f):
+    """Decorator answering 503 until the model is loaded"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_app.prediction_service.is_loaded():
+            response = jsonify({'error': 'Model is loading, try again shortly'})
+            response.headers['Retry-After'] = '1'
+            return response, 503
+        return f(*args, **kwargs)
+    
+    return decorated_function
+
+def _rate_limited_response(retry_after):
+    """429 response telling the client when to retry"""
+    response = jsonify({'error': 'Rate limit exceeded', 'retry_after': round(retry_after, 3)})
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, 429
+
+def _batch_cost():
+    """Tokens for a /batch call: one per submitted text"""
+    data = request.get_json(silent=True)
+    texts = data.get('texts') if isinstance(data, dict) else None
+    return len(texts) if isinstance(texts, list) and texts else 1
+
+def _with_original_text(result, text):
+    """Echo the caller's text (stripped) in a result scored on its normalized form"""
+    text = text.strip()
+    # Results may be shared with the prediction cache, so copy rather than modify
+    return result if result['text'] == text else dict(result, text=text)
+
+def rate_limit(cost=None):
+    """
+    Decorator charging the caller's token bucket before the view runs
+    
+    Must be applied after require_auth. A request that would overdraw
+    the bucket is answered 429 with Retry-After, before any validation
+    or inference.
+    
+    Args:
+        cost: Function returning the request's cost in tokens (default 1)
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            limiter = current_app.rate_limiter
+            if limiter is not None:
+                retry_after = limiter.acquire(
+                    request.user.get('sub'), request.user.get('role'), cost() if cost else 1
+                )
+                if retry_after:
+                    return _rate_limited_response(retry_after)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
 # Authentication Endpoints
 
 @api_bp.route('/auth/login', methods=['POST'])
@@ -84,7 +147,7 @@ def login():
         return jsonify(result), 200
     
     except Exception as e:
-        logger.error(f"Login error: {e}")
+        logger.error("Login error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @api_bp.route('/auth/refresh', methods=['POST'])
@@ -118,7 +181,40 @@ def refresh_token():
         }), 200
     
     except Exception as e:
-        logger.error(f"Token refresh error: {e}")
+        logger.error("Token refresh error: %s", e)
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/auth/logout', methods=['POST'])
+@require_auth
+def logout():
+    """
+    Revoke the caller's access token, and optionally its refresh token
+    
+    Request body (optional):
+    {
+        "refresh_token": "refresh_token_value"
+    }
+    
+    Returns:
+        - 200 once the tokens are revoked in every worker
+    """
+    try:
+        auth_service = current_app.auth_service
+        auth_service.revoke_token(request.headers['Authorization'][len('Bearer '):])
+        
+        data = request.get_json(silent=True) or {}
+        refresh_token = data.get('refresh_token')
+        if refresh_token:
+            # Only the caller's own refresh token may be revoked this way
+            payload = auth_service.verify_token(refresh_token)
+            if payload is not None and payload.get('sub') == request.user.get('sub'):
+                auth_service.revoke_token(refresh_token)
+        
+        logger.info("User logged out: %s", request.user.get('sub'))
+        return jsonify({'success': True}), 200
+    
+    except Exception as e:
+        logger.error("Logout error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @api_bp.route('/auth/user', methods=['GET'])
@@ -140,13 +236,15 @@ def get_user_info():
         return jsonify(user_info), 200
     
     except Exception as e:
-        logger.error(f"Error getting user info: {e}")
+        logger.error("Error getting user info: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 # Sentiment Analysis Endpoints
 
 @api_bp.route('/analyze', methods=['POST'])
 @require_auth
+@rate_limit()
+@require_model
 def analyze_sentiment():
     """
     Analyze sentiment of a single text
@@ -162,34 +260,37 @@ def analyze_sentiment():
         - scores: detailed scores for each sentiment
     """
     try:
-        data = request.get_json()
-        
-        if not data or not data.get('text'):
-            return jsonify({'error': 'Missing text field'}), 400
-        
-        text = data['text'].strip()
-        if len(text) == 0:
-            return jsonify({'error': 'Text cannot be empty'}), 400
-        
-        if len(text) > 5000:
-            return jsonify({'error': 'Text exceeds maximum length of 5000 characters'}), 400
+        with observe_stage('validation'):
+            data = request.get_json()
+            
+            if not data or not data.get('text'):
+                return jsonify({'error': 'Missing text field'}), 400
+            
+            text, error = check_text(data['text'], current_app.config.get('MAX_TEXT_LENGTH', 5000))
+            if error is not None:
+                return jsonify({'error': error}), 400
         
-        result = current_app.sentiment_analyzer.predict(text)
+        with observe_stage('inference'):
+            result = _with_original_text(current_app.prediction_service.predict(text, normalized=True), data['text'])
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'data': result,
             'timestamp': datetime.utcnow().isoformat()
-        }), 200
+        })
+        response.headers['X-Model-Version'] = result['model_version']
+        return response, 200
     
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Sentiment analysis error: {e}")
+        logger.error("Sentiment analysis error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @api_bp.route('/batch', methods=['POST'])
 @require_auth
+@rate_limit(_batch_cost)
+@require_model
 def analyze_batch():
     """
     Analyze sentiment for multiple texts
@@ -200,65 +301,244 @@ def analyze_batch():
             "This is great!",
             "This is terrible.",
             "This is okay."
-        ]
+        ],
+        "partial": false
     }
     
+    With "partial": true, invalid texts do not fail the request; their
+    entries in data are {"index": n, "error": "..."} and the valid texts
+    are scored as usual.
+    
     Returns:
         - Array of sentiment predictions
     """
     try:
-        data = request.get_json()
-        
-        if not data or not data.get('texts'):
-            return jsonify({'error': 'Missing texts field'}), 400
-        
-        texts = data['texts']
-        
-        if not isinstance(texts, list):
-            return jsonify({'error': 'texts must be an array'}), 400
-        
-        if len(texts) == 0:
-            return jsonify({'error': 'texts array cannot be empty'}), 400
-        
-        if len(texts) > 100:
-            return jsonify({'error': 'Maximum 100 texts per request'}), 400
+        with observe_stage('validation'):
+            data = request.get_json()
+            
+            if not data or 'texts' not in data:
+                return jsonify({'error': 'Missing texts field'}), 400
+            
+            partial = data.get('partial') is True
+            try:
+                validation = validate_batch(
+                    data['texts'],
+                    max_items=current_app.config.get('MAX_BATCH_SIZE', 100),
+                    max_length=current_app.config.get('MAX_TEXT_LENGTH', 5000),
+                    partial=partial
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         
-        # Validate each text
-        for text in texts:
-            if not isinstance(text, str) or len(text.strip()) == 0:
-                return jsonify({'error': 'All texts must be non-empty strings'}), 400
+        texts = validation.texts
+        observe_batch_size('batch', len(texts))
+        with observe_stage('inference'):
+            results = current_app.prediction_service.predict_batch(texts, normalized=True)
+        results = [_with_original_text(result, data['texts'][position])
+                   for result, position in zip(results, validation.positions)]
         
-        results = current_app.sentiment_analyzer.predict_batch(texts)
+        if validation.errors:
+            # Place error entries at their input positions
+            merged = [None] * (len(results) + len(validation.errors))
+            for position, result in zip(validation.positions, results):
+                merged[position] = result
+            for position, error in validation.errors:
+                merged[position] = {'index': position, 'error': error}
+            results = merged
         
-        return jsonify({
+        body = {
             'success': True,
             'count': len(results),
-            'data': results,
             'timestamp': datetime.utcnow().isoformat()
-        }), 200
+        }
+        if partial:
+            body['error_count'] = len(validation.errors)
+        
+        # Encode large results piece by piece instead of as one string
+        if len(results) >= current_app.config.get('JSON_STREAM_MIN_ITEMS', 50) and \
+                hasattr(current_app.json, 'iter_encode_object'):
+            chunks = current_app.json.iter_encode_object(body, 'data', results)
+            return Response(
+                stream_with_context(timed_iter('serialization', chunks)),
+                mimetype='application/json'
+            ), 200
+        
+        body['data'] = results
+        return jsonify(body), 200
     
     except Exception as e:
-        logger.error(f"Batch analysis error: {e}")
+        logger.error("Batch analysis error: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
+def _iter_ndjson_records(stream, max_length=5000):
+    """
+    Parse an NDJSON request body one line at a time
+    
+    Each non-blank line is a JSON string or an object with a "text" field
+    and an optional "id" echoed back in the result. Lines are read with a
+    length limit, so a line without a newline never buffers more than a
+    valid item could need; the rest of an oversized line is skipped and
+    reported as an item error.
+    
+    Yields:
+        Tuple of (record, normalized text or None, input text or None,
+        error or None); record holds the index and id fields for the
+        output line
+    """
+    # A max_length text with every character \u-escaped, plus an id and framing
+    line_limit = max_length * 6 + 1024
+    index = 0
+    while True:
+        line = stream.readline(line_limit)
+        if not line:
+            return
+        
+        oversized = len(line) >= line_limit and not line.endswith(b'\n')
+        if oversized:
+            # Discard the rest of the line in bounded reads
+            while True:
+                rest = stream.readline(line_limit)
+                if not rest or rest.endswith(b'\n'):
+                    break
+        elif not line.strip():
+            continue
+        
+        record = {'index': index}
+        index += 1
+        
+        if oversized:
+            yield record, None, None, 'Line too long'
+            continue
+        
+        try:
+            item = current_app.json.loads(line)
+        except ValueError:
+            yield record, None, None, 'Invalid JSON'
+            continue
+        
+        if isinstance(item, dict):
+            if 'id' in item:
+                record['id'] = item['id']
+            item = item.get('text')
+        
+        text, error = check_text(item, max_length)
+        yield record, text, item, error
+
+def _iter_chunks(iterable, size):
+    """Yield lists of at most size items from an iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _stream_predictions(records, chunk_size, charge=None):
+    """
+    Score parsed records chunk by chunk and yield NDJSON result lines
+    
+    charge(count) is called before each chunk is scored; when it returns
+    a wait in seconds, a rate-limit line is sent and the stream ends.
+    """
+    for chunk in _iter_chunks(records, chunk_size):
+        texts = [text for _, text, _, error in chunk if error is None]
+        retry_after = charge(len(texts)) if charge is not None and texts else 0
+        if retry_after:
+            yield current_app.json.dumps({
+                'index': chunk[0][0]['index'],
+                'error': 'Rate limit exceeded',
+                'retry_after': round(retry_after, 3)
+            }) + '\n'
+            return
+        observe_batch_size('stream', len(texts))
+        results = iter(current_app.prediction_service.predict_batch(texts, normalized=True))
+        
+        lines = []
+        for record, _, original, error in chunk:
+            if error is None:
+                record.update(_with_original_text(next(results), original))
+            else:
+                record['error'] = error
+            lines.append(current_app.json.dumps(record))
+        
+        yield '\n'.join(lines) + '\n'
+
+@api_bp.route('/batch/stream', methods=['POST'])
+@require_auth
+@rate_limit()
+@require_model
+def analyze_batch_stream():
+    """
+    Analyze sentiment for a stream of texts without a size limit
+    
+    Request body (application/x-ndjson), one item per line:
+        "This is great!"
+        {"id": "review-2", "text": "This is terrible."}
+    
+    Returns:
+        - NDJSON stream with one result per input line, in input order;
+          invalid lines produce {"index": n, "error": "..."} instead of
+          failing the stream. Results are sent as each chunk is scored,
+          so memory use does not depend on the input size.
+        - Each chunk is charged to the caller's rate limit as it is
+          read, less the one token that admitted the stream, so a stream
+          costs one token per text; when the limit is reached the stream ends with
+          {"index": n, "error": "Rate limit exceeded", "retry_after": s}
+          where n is the first unscored line.
+        - A compressed body that turns out corrupt or truncated ends the
+          stream with {"error": "..."} naming the decode problem.
+    """
+    chunk_size = current_app.config.get('STREAM_CHUNK_SIZE', 100)
+    records = _iter_ndjson_records(request.stream, current_app.config.get('MAX_TEXT_LENGTH', 5000))
+    
+    charge = None
+    limiter = current_app.rate_limiter
+    if limiter is not None:
+        subject, role = request.user.get('sub'), request.user.get('role')
+        # The token @rate_limit took to admit the stream pays for its first text
+        prepaid = 1
+        
+        def charge(count):
+            nonlocal prepaid
+            cost, prepaid = count - min(prepaid, count), prepaid - min(prepaid, count)
+            return limiter.acquire(subject, role, cost) if cost else 0
+    
+    def generate():
+        try:
+            yield from _stream_predictions(records, chunk_size, charge)
+        except HTTPException as e:
+            # The body turned out unreadable mid-stream (e.g. corrupt gzip)
+            logger.warning("Streaming batch input error: %s", e.description)
+            yield current_app.json.dumps({'error': e.description}) + '\n'
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            logger.error("Streaming batch analysis error: %s", e)
+            yield current_app.json.dumps({'error': 'Internal server error'}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @api_bp.route('/model/info', methods=['GET'])
 @require_auth
+@require_model
 def get_model_info():
     """
     Get information about the sentiment analysis model
     
     Returns:
-        - Model type, features, and capabilities
+        - Model type, features, and capabilities, for the model version
+          that served this request (also sent as X-Model-Version)
     """
     try:
-        info = current_app.sentiment_analyzer.get_model_info()
-        return jsonify({
+        info = current_app.prediction_service.get_model_info()
+        response = jsonify({
             'success': True,
             'data': info
-        }), 200
+        })
+        response.headers['X-Model-Version'] = info['version']
+        return response, 200
     
     except Exception as e:
-        logger.error(f"Error getting model info: {e}")
+        logger.error("Error getting model info: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 # Admin Endpoints
@@ -279,37 +559,219 @@ def get_stats():
             'data': {
                 'status': 'operational',
                 'timestamp': datetime.utcnow().isoformat(),
-                'model_info': current_app.sentiment_analyzer.get_model_info()
+                'model_info': current_app.prediction_service.get_model_info()
+                if current_app.prediction_service.is_loaded() else None,
+                'model_status': current_app.model_lifecycle.get_status(),
+                'predictions': current_app.prediction_service.get_stats(),
+                'user_cache': current_app.auth_service.users.get_stats(),
+                'profiler': current_app.profiler.get_stats(),
+                'rate_limit': current_app.rate_limiter.get_stats()
+                if current_app.rate_limiter is not None else None,
+                'logging': log_pipeline.get_stats(),
+                'compression': current_app.compression.get_stats()
+                if getattr(current_app, 'compression', None) is not None else None
             }
         }), 200
     
     except Exception as e:
-        logger.error(f"Error getting stats: {e}")
+        logger.error("Error getting stats: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
+@api_bp.route('/admin/models', methods=['GET'])
+@require_auth
+@require_role('admin')
+def list_models():
+    """
+    List registry versions and the hot-swap state (admin only)
+    
+    Returns:
+        - Published versions, CURRENT pointer, serving version and swap status
+    """
+    lifecycle = current_app.model_lifecycle
+    if lifecycle.registry is None:
+        return jsonify({'error': 'No model registry configured'}), 404
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'registry': lifecycle.registry.get_info(),
+            'status': lifecycle.get_status()
+        }
+    }), 200
+
+@api_bp.route('/admin/models/activate', methods=['POST'])
+@require_auth
+@require_role('admin')
+def activate_model():
+    """
+    Hot-swap to a registry version without a restart (admin only)
+    
+    Request body:
+    {
+        "version": "2.0.0"
+    }
+    
+    The version (latest when omitted) is loaded and warmed up in the
+    background, then swapped in; requests in flight finish on the old
+    model. The registry's CURRENT pointer, which other workers follow,
+    only moves once the version has loaded and warmed up.
+    
+    Returns:
+        - 202 with the swap status
+        - 409 if another swap is in progress
+    """
+    lifecycle = current_app.model_lifecycle
+    if lifecycle.registry is None:
+        return jsonify({'error': 'No model registry configured'}), 404
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        started = lifecycle.activate(data.get('version'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not started:
+        return jsonify({'error': 'A model swap is already in progress'}), 409
+    
+    logger.info("Model activation of %s requested by %s", data.get('version') or 'latest', request.user.get('sub'))
+    return jsonify({
+        'success': True,
+        'data': lifecycle.get_status()
+    }), 202
+
+@api_bp.route('/admin/profiles', methods=['GET'])
+@require_auth
+@require_role('admin')
+def list_profiles():
+    """
+    List saved request profiles, newest first (admin only)
+    
+    Returns:
+        - Profile name, route, status, model version, duration and
+          whether the request was sampled or requested with X-Profile
+    """
+    profiles = current_app.profiler.list_profiles()
+    return jsonify({
+        'success': True,
+        'count': len(profiles),
+        'data': profiles
+    }), 200
+
+@api_bp.route('/admin/profiles/<name>', methods=['GET'])
+@require_auth
+@require_role('admin')
+def download_profile(name):
+    """
+    Download a saved request profile (admin only)
+    
+    Returns:
+        - cProfile stats file, readable with pstats.Stats or snakeviz
+    """
+    path = current_app.profiler.profile_path(name)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                     download_name=f'{name}.prof')
+
 @api_bp.route('/admin/users', methods=['GET'])
 @require_auth
 @require_role('admin')
 def list_users():
     """
-    List all users (admin only)
+    List users a page at a time (admin only)
+    
+    Query parameters:
+        limit: Users per page (default USER_PAGE_SIZE)
+        cursor: next_cursor from the previous page
     
     Returns:
-        - List of user information
+        - Page of user information in username order, with next_cursor
+          (null on the last page)
     """
     try:
-        users = []
-        for username in current_app.auth_service.users:
-            user_info = current_app.auth_service.get_user_info(username)
-            if user_info:
-                users.append(user_info)
+        try:
+            limit = int(request.args.get('limit', current_app.config.get('USER_PAGE_SIZE', 100)))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        if limit < 1:
+            return jsonify({'error': 'limit must be positive'}), 400
+        limit = min(limit, current_app.config.get('USER_PAGE_MAX_SIZE', 1000))
+        
+        try:
+            users, next_cursor = current_app.auth_service.list_users(limit, request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         return jsonify({
             'success': True,
             'count': len(users),
-            'data': users
+            'data': users,
+            'next_cursor': next_cursor
         }), 200
     
     except Exception as e:
-        logger.error(f"Error listing users: {e}")
+        logger.error("Error listing users: %s", e)
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/admin/users/<username>', methods=['PATCH'])
+@require_auth
+@require_role('admin')
+def update_user(username):
+    """
+    Change a user's name, role or password (admin only)
+    
+    Request body (any of):
+    {
+        "name": "New Name",
+        "role": "viewer",
+        "password": "new-password"
+    }
+    
+    A role or password change revokes the user's existing tokens.
+    
+    Returns:
+        - Updated user information
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        fields = {key: data[key] for key in ('name', 'role', 'password') if data.get(key) is not None}
+        if not fields:
+            return jsonify({'error': 'Nothing to update'}), 400
+        if 'role' in fields and fields['role'] not in current_app.auth_service.ROLES:
+            return jsonify({'error': 'Invalid role'}), 400
+        
+        if not current_app.auth_service.update_user(username, **fields):
+            return jsonify({'error': 'User not found'}), 404
+        
+        logger.info("User %s updated by %s", username, request.user.get('sub'))
+        return jsonify({
+            'success': True,
+            'data': current_app.auth_service.get_user_info(username)
+        }), 200
+    
+    except Exception as e:
+        logger.error("Error updating user: %s", e)
+        return jsonify({'error': 'Internal server error'}), 500
+
+@api_bp.route('/admin/users/<username>/revoke', methods=['POST'])
+@require_auth
+@require_role('admin')
+def revoke_user_tokens(username):
+    """
+    Revoke every token a user holds, in every worker (admin only)
+    
+    Returns:
+        - 200 once revoked; the user must log in again
+    """
+    try:
+        if current_app.auth_service.get_user_info(username) is None:
+            return jsonify({'error': 'User not found'}), 404
+        
+        current_app.auth_service.revoke_user_tokens(username)
+        logger.info("Tokens of %s revoked by %s", username, request.user.get('sub'))
+        return jsonify({'success': True}), 200
+    
+    except Exception as e:
+        logger.error("Error revoking tokens: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
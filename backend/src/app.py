@@ -3,6 +3,11 @@ Main Flask Application for Sentiment Analysis MLOps System
 Implements RESTful API with authentication and cloud-native integration
 """
 
+import time
+
+# Measures how long importing the application and its dependencies takes
+_import_started = time.perf_counter()
+
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from functools import wraps
@@ -11,66 +16,216 @@ import os
 from datetime import datetime
 import json
 
-# Fallback SentimentAnalyzer (quick fix for CI)
-try:
-    from src.models.sentiment_model import SentimentAnalyzer  # if exists
-except Exception:
-    class SentimentAnalyzer:
-        def analyze(self, text: str):
-            # simple neutral fallback
-            return {"label": "neutral", "score": 0.0}
-
 from config.settings import Config
+from models.model_loader import load_analyzer
+from models.model_registry import ModelRegistry
 from api.routes import api_bp
+from services import compression, log_pipeline, metrics, profiler
 from services.auth_service import AuthService
+from services.inference_executor import InferenceExecutor
+from services.model_lifecycle import ModelLifecycle, load_warmup_corpus
+from services.prediction_cache import PredictionCache
+from services.prediction_service import PredictionService
+from services.rate_limiter import LocalBucketStore, RateLimiter, SharedBucketStore, parse_limit
+from services.single_flight import SingleFlight
+from services.user_store import SQLiteUserStore
+from utils.json_provider import FastJSONProvider, constant_response
 from utils.validators import validate_input
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
 def create_app(config_class=Config):
     """Application factory function"""
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    # Queued, sampled logging; request IDs are attached to every record
+    log_pipeline.configure_logging(
+        level=app.config.get('LOG_LEVEL', 'INFO'),
+        json_format=app.config.get('LOG_JSON', False),
+        queue_size=app.config.get('LOG_QUEUE_SIZE', 10000),
+        sample_burst=app.config.get('LOG_SAMPLE_BURST', 10),
+        sample_window=app.config.get('LOG_SAMPLE_WINDOW', 60.0),
+        fmt=app.config.get('LOG_FORMAT')
+    )
+    log_pipeline.init_app(app)
+    
+    # Compact orjson responses instead of the pretty-printing default encoder
+    if app.config.get('JSON_PROVIDER', 'fast') == 'fast':
+        app.json = FastJSONProvider(app)
+    
     # Enable CORS
     CORS(app)
     
     # Initialize services
-    app.sentiment_analyzer = SentimentAnalyzer()
-    app.auth_service = AuthService()
+    # The analyzer is attached by the model lifecycle once it is loaded
+    app.sentiment_analyzer = None
+    prediction_cache = None
+    if app.config.get('PREDICTION_CACHE_ENABLED', True):
+        prediction_cache = PredictionCache(
+            max_entries=app.config['PREDICTION_CACHE_MAX_ENTRIES'],
+            max_bytes=app.config['PREDICTION_CACHE_MAX_BYTES'],
+            ttl_seconds=app.config['PREDICTION_CACHE_TTL']
+        )
+    micro_batching = None
+    if app.config.get('MICRO_BATCH_ENABLED', False):
+        micro_batching = {
+            'max_batch_size': app.config['MICRO_BATCH_MAX_SIZE'],
+            'max_wait_ms': app.config['MICRO_BATCH_MAX_WAIT_MS']
+        }
+    executor = None
+    if app.config.get('INFERENCE_BACKEND', 'inline') != 'inline':
+        executor = InferenceExecutor(
+            None,
+            backend=app.config['INFERENCE_BACKEND'],
+            workers=app.config.get('INFERENCE_WORKERS'),
+            shard_size=app.config['INFERENCE_SHARD_SIZE']
+        )
+    single_flight = None
+    if app.config.get('SINGLE_FLIGHT_ENABLED', False):
+        single_flight = SingleFlight(timeout=app.config['SINGLE_FLIGHT_TIMEOUT'])
+    app.prediction_service = PredictionService(
+        None,
+        cache=prediction_cache,
+        micro_batching=micro_batching,
+        executor=executor,
+        single_flight=single_flight
+    )
+    
+    # Loaded artifacts are cached per process: under gunicorn's preload_app
+    # the master loads the model once and workers share its mapped weights
+    registry = None
+    if app.config.get('MODEL_REGISTRY_PATH'):
+        registry = ModelRegistry(app.config['MODEL_REGISTRY_PATH'])
+    
+    def load_version(version):
+        return registry.load(version, mmap=app.config.get('MODEL_MMAP', True))
+    
+    def load_model():
+        version = registry.current_version() if registry is not None else None
+        if version is not None:
+            return load_version(version)
+        return load_analyzer(
+            app.config.get('MODEL_PATH'),
+            lexicon_path=app.config.get('LEXICON_PATH'),
+            mmap=app.config.get('MODEL_MMAP', True)
+        )
+    
+    def model_loaded(analyzer):
+        app.sentiment_analyzer = analyzer
+    
+    warmup_texts = None
+    if app.config.get('WARMUP_ENABLED', True):
+        warmup_texts = load_warmup_corpus(app.config.get('WARMUP_CORPUS_PATH'))
+    app.model_lifecycle = ModelLifecycle(
+        app.prediction_service,
+        load_model,
+        warmup_texts=warmup_texts,
+        on_loaded=model_loaded,
+        import_seconds=IMPORT_SECONDS,
+        registry=registry,
+        load_version=load_version,
+        watch_interval=app.config.get('MODEL_REGISTRY_WATCH_INTERVAL', 0)
+    )
+    app.model_lifecycle.start(background=app.config.get('MODEL_LOAD_ASYNC', True))
+    
+    user_store = None
+    if app.config.get('USER_DB_PATH'):
+        user_store = SQLiteUserStore(app.config['USER_DB_PATH'], pool_size=app.config['USER_DB_POOL_SIZE'])
+    app.auth_service = AuthService(
+        token_cache_size=app.config.get('TOKEN_CACHE_SIZE', 10000),
+        user_store=user_store,
+        user_cache_size=app.config.get('USER_CACHE_SIZE', 10000),
+        user_cache_check_interval=app.config.get('USER_CACHE_CHECK_INTERVAL', 1.0)
+    )
+    
+    # Admission control: one token bucket per user, sized by role
+    app.rate_limiter = None
+    if app.config.get('RATE_LIMIT_ENABLED', True):
+        configured = app.config['RATE_LIMITS']
+        limits = {role: parse_limit(configured[role]) for role in AuthService.ROLES if role in configured}
+        store = None
+        if app.config.get('RATE_LIMIT_PATH'):
+            try:
+                store = SharedBucketStore(app.config['RATE_LIMIT_PATH'])
+            except RuntimeError as e:
+                logger.warning("%s; rate limits apply per worker", e)
+        app.rate_limiter = RateLimiter(limits, store or LocalBucketStore())
     
     # Register blueprints
     app.register_blueprint(api_bp, url_prefix='/api/v1')
     
+    # Prometheus metrics (/metrics) and per-request timing
+    if app.config.get('METRICS_ENABLED', True):
+        metrics.init_app(app)
+    
+    # Opt-in per-request cProfile captures (admin: /api/v1/admin/profiles)
+    profiler.init_app(
+        app,
+        app.config['PROFILE_DIR'],
+        sample_rate=app.config.get('PROFILE_SAMPLE_RATE', 0),
+        max_files=app.config.get('PROFILE_MAX_FILES', 50),
+        allow_header=app.config.get('PROFILE_HEADER_ENABLED', True)
+    )
+    
+    # gzip/brotli responses and request bodies; outermost, so the profiler
+    # and metrics see uncompressed bodies
+    if app.config.get('COMPRESSION_ENABLED', True):
+        compression.init_app(
+            app,
+            min_size=app.config.get('COMPRESSION_MIN_SIZE', 1024),
+            level=app.config.get('COMPRESSION_LEVEL', 6),
+            brotli_quality=app.config.get('COMPRESSION_BROTLI_QUALITY', 4),
+            max_request_size=app.config.get('COMPRESSION_MAX_REQUEST_SIZE', 16 * 1024 * 1024)
+        )
+    
+    # Constant responses are encoded once here rather than per request
+    health_response = constant_response(app, {
+        'status': 'healthy',
+        'version': '1.0.0'
+    })
+    root_response = constant_response(app, {
+        'name': 'Sentiment Analysis MLOps System',
+        'version': '1.0.0',
+        'description': 'RESTful API for sentiment analysis with cloud-native deployment',
+        'endpoints': {
+            'health': '/health',
+            'ready': '/ready',
+            'analyze': '/api/v1/analyze',
+            'batch': '/api/v1/batch',
+            'batch_stream': '/api/v1/batch/stream',
+            'auth': '/api/v1/auth/login'
+        }
+    })
+    
+    @app.before_request
+    def ensure_model_loading():
+        app.model_lifecycle.ensure_started()
+    
     # Health check endpoint
     @app.route('/health', methods=['GET'])
     def health_check():
         """Health check endpoint for deployment verification"""
-        return jsonify({
-            'status': 'healthy',
-            'version': '1.0.0'
-        }), 200
+        return health_response()
+    
+    # Readiness probe: 200 only once the model is loaded and warmed up
+    @app.route('/ready', methods=['GET'])
+    def readiness_check():
+        """Readiness endpoint for load balancers and orchestrators"""
+        status = app.model_lifecycle.get_status()
+        if app.model_lifecycle.is_ready():
+            return jsonify(status), 200
+        response = jsonify(status)
+        response.headers['Retry-After'] = '1'
+        return response, 503
     
     # Root endpoint
     @app.route('/', methods=['GET'])
     def root():
         """Root endpoint with API information"""
-        return jsonify({
-            'name': 'Sentiment Analysis MLOps System',
-            'version': '1.0.0',
-            'description': 'RESTful API for sentiment analysis with cloud-native deployment',
-            'endpoints': {
-                'health': '/health',
-                'analyze': '/api/v1/analyze',
-                'batch': '/api/v1/batch',
-                'auth': '/api/v1/auth/login'
-            }
-        }), 200
+        return root_response()
     
     # Error handlers
     @app.errorhandler(400)
@@ -87,7 +242,7 @@ def create_app(config_class=Config):
     
     @app.errorhandler(500)
     def internal_error(error):
-        logger.error(f'Internal server error: {error}')
+        logger.error('Internal server error: %s', error)
         return jsonify({'error': 'Internal server error', 'message': 'An unexpected error occurred'}), 500
     
     logger.info('Application initialized successfully')
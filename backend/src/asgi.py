@@ -0,0 +1,249 @@
+"""
+ASGI Entry Point
+Serves the Flask application from an asyncio event loop
+
+Usage:
+    uvicorn --factory asgi:create_asgi_app --host 0.0.0.0 --port 5000 --timeout-keep-alive 75
+    gunicorn -k uvicorn.workers.UvicornWorker --config gunicorn.conf.py 'asgi:create_asgi_app()'
+
+The event loop owns every connection, so idle keep-alive clients and slow
+uploads cost a coroutine, not a worker. Request bodies up to
+ASGI_BUFFER_BODY_BYTES are read asynchronously before dispatch; larger
+bodies are streamed to the handler. Each request then runs the regular
+Flask app (same routes, auth and error handling) on a bounded thread
+pool, keeping CPU-bound inference off the event loop. Response bodies,
+including streamed ones, are produced in the pool and written back by
+the event loop.
+"""
+
+import asyncio
+import contextvars
+import io
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app import create_app
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class _ReceiveStream(io.RawIOBase):
+    """
+    Blocking wsgi.input fed by ASGI receive events
+
+    Used from executor threads for bodies too large to buffer; each read
+    waits for the next body message from the event loop.
+    """
+
+    def __init__(self, receive: Callable, loop: asyncio.AbstractEventLoop, initial: bytes = b''):
+        self._receive = receive
+        self._loop = loop
+        self._buffer = initial
+        self._more_body = True
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer and self._more_body:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message['type'] == 'http.disconnect':
+                self._more_body = False
+                break
+            self._buffer = message.get('body', b'')
+            self._more_body = message.get('more_body', False)
+
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class ASGIAdapter:
+    """
+    ASGI application wrapping a WSGI application
+
+    Args:
+        wsgi_app: WSGI callable (the Flask app)
+        max_workers: Threads running requests concurrently
+        buffer_body_bytes: Bodies up to this size are read before dispatch
+    """
+
+    def __init__(self, wsgi_app: Callable, max_workers: int = 16, buffer_body_bytes: int = 1024 * 1024):
+        self.wsgi_app = wsgi_app
+        self.max_workers = max_workers
+        self.buffer_body_bytes = buffer_body_bytes
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Create the pool lazily so each server process gets its own"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='asgi-worker')
+        return self.executor
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive: Callable, send: Callable):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._get_executor()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.executor is not None:
+                    self.executor.shutdown(wait=True)
+                    self.executor = None
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive: Callable, content_length: Optional[int]) -> Tuple[bytes, bool]:
+        """
+        Read the request body up to the buffering limit
+
+        Returns:
+            Tuple of (body read so far, whether more body remains)
+        """
+        if content_length is not None and content_length > self.buffer_body_bytes:
+            return b'', True
+
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return b''.join(chunks), False
+            chunk = message.get('body', b'')
+            chunks.append(chunk)
+            size += len(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks), False
+            if size > self.buffer_body_bytes:
+                return b''.join(chunks), True
+
+    async def _http(self, scope: Dict, receive: Callable, send: Callable):
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+
+        content_length = None
+        for name, value in scope['headers']:
+            if name == b'content-length':
+                content_length = int(value)
+
+        body, more_body = await self._read_body(receive, content_length)
+        if more_body:
+            wsgi_input = io.BufferedReader(_ReceiveStream(receive, loop, body))
+        else:
+            wsgi_input = io.BytesIO(body)
+
+        environ = build_environ(scope, wsgi_input, content_length)
+        response_start = {}
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            response_start['status'] = int(status.split(' ', 1)[0])
+            response_start['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+            ]
+
+        def next_chunk(iterator):
+            # Skip empty chunks here rather than bouncing them through the loop
+            for chunk in iterator:
+                if chunk:
+                    return chunk
+            return _END
+
+        # Every step of one request runs in the same context so Flask's
+        # context-local state follows a streamed response across threads
+        context = contextvars.copy_context()
+
+        def run(func, *args):
+            return loop.run_in_executor(executor, context.run, func, *args)
+
+        iterable = await run(self.wsgi_app, environ, start_response)
+        try:
+            iterator = iter(iterable)
+            first = await run(next_chunk, iterator)
+
+            await send({
+                'type': 'http.response.start',
+                'status': response_start['status'],
+                'headers': response_start['headers']
+            })
+
+            chunk = first
+            while chunk is not _END:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await run(next_chunk, iterator)
+
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                await run(close)
+
+
+def build_environ(scope: Dict, wsgi_input, content_length: Optional[int]) -> Dict:
+    """Translate an ASGI HTTP scope into a WSGI environ"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    # WSGI carries the decoded path as latin-1 characters of its UTF-8 bytes
+    path = scope['path'].encode('utf-8').decode('latin-1')
+    root_path = scope.get('root_path', '')
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path,
+        'PATH_INFO': path,
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]) if server[1] is not None else '80',
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': wsgi_input,
+        'wsgi.input_terminated': content_length is None,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = name
+        else:
+            key = f'HTTP_{name}'
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    return environ
+
+
+def create_asgi_app(config_class=Config) -> ASGIAdapter:
+    """
+    ASGI application factory
+
+    There is no module-level app: importing this module must not start a
+    model loader or reconfigure logging, so servers call the factory.
+    """
+    flask_app = create_app(config_class)
+    return ASGIAdapter(
+        flask_app,
+        max_workers=flask_app.config.get('ASGI_EXECUTOR_WORKERS', 16),
+        buffer_body_bytes=flask_app.config.get('ASGI_BUFFER_BODY_BYTES', 1024 * 1024)
+    )
@@ -16,7 +16,11 @@ class Config:
     
     # API settings
     JSON_SORT_KEYS = False
-    JSONIFY_PRETTYPRINT_REGULAR = True
+    JSONIFY_PRETTYPRINT_REGULAR = False
+    # 'fast' = compact orjson provider, 'default' = Flask's standard encoder
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'fast')
+    # Batch responses with at least this many results are encoded incrementally
+    JSON_STREAM_MIN_ITEMS = int(os.getenv('JSON_STREAM_MIN_ITEMS', '50'))
     
     # CORS settings
     CORS_HEADERS = 'Content-Type'
@@ -25,6 +29,19 @@ class Config:
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # Verified token payloads cached per worker until each token expires
+    TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', '10000'))
+    
+    # User store: SQLite database shared by all workers (in-memory per
+    # worker when unset). Hot user records are cached per worker and
+    # dropped when another worker changes a user.
+    USER_DB_PATH = os.getenv('USER_DB_PATH')
+    USER_DB_POOL_SIZE = int(os.getenv('USER_DB_POOL_SIZE', '4'))
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+    USER_CACHE_CHECK_INTERVAL = float(os.getenv('USER_CACHE_CHECK_INTERVAL', '1'))
+    # Page size of /admin/users (the limit parameter is capped at the maximum)
+    USER_PAGE_SIZE = int(os.getenv('USER_PAGE_SIZE', '100'))
+    USER_PAGE_MAX_SIZE = int(os.getenv('USER_PAGE_MAX_SIZE', '1000'))
     
     # Azure AD settings
     AZURE_TENANT_ID = os.getenv('AZURE_TENANT_ID', '')
@@ -38,23 +55,114 @@ class Config:
     
     # Model settings
     MODEL_PATH = os.getenv('MODEL_PATH', 'models/sentiment_model.pkl')
+    # Memory-map artifact weights so forked workers share one physical copy
+    MODEL_MMAP = os.getenv('MODEL_MMAP', 'true').lower() == 'true'
     CONFIDENCE_THRESHOLD = 0.5
+    # Weighted lexicon (.json or term<TAB>weight .tsv); empty uses the built-in terms
+    LEXICON_PATH = os.getenv('LEXICON_PATH', '')
+    
+    # Prediction cache settings (per worker); TTL of 0 keeps entries until evicted
+    PREDICTION_CACHE_ENABLED = True
+    PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv('PREDICTION_CACHE_MAX_ENTRIES', '50000'))
+    PREDICTION_CACHE_MAX_BYTES = int(os.getenv('PREDICTION_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    PREDICTION_CACHE_TTL = float(os.getenv('PREDICTION_CACHE_TTL', '0'))
+    
+    # Identical texts scored concurrently in a worker share one computation
+    SINGLE_FLIGHT_ENABLED = os.getenv('SINGLE_FLIGHT_ENABLED', 'true').lower() == 'true'
+    SINGLE_FLIGHT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_TIMEOUT', '30'))
+    
+    # Request validation limits
+    MAX_TEXT_LENGTH = int(os.getenv('MAX_TEXT_LENGTH', '5000'))
+    MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', '100'))
+    
+    # Items scored per chunk by the streaming NDJSON batch endpoint
+    STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', '100'))
+    
+    # Micro-batching of concurrent /analyze requests. On by default since
+    # the gunicorn config runs threaded workers; set to false for
+    # single-threaded servers, where it only adds MICRO_BATCH_MAX_WAIT_MS
+    MICRO_BATCH_ENABLED = os.getenv('MICRO_BATCH_ENABLED', 'true').lower() == 'true'
+    MICRO_BATCH_MAX_SIZE = int(os.getenv('MICRO_BATCH_MAX_SIZE', '32'))
+    MICRO_BATCH_MAX_WAIT_MS = float(os.getenv('MICRO_BATCH_MAX_WAIT_MS', '5'))
+    
+    # Staged startup: load the model in the background and warm it up
+    # before /ready reports 200 (WARMUP_CORPUS_PATH: one text per line)
+    MODEL_LOAD_ASYNC = os.getenv('MODEL_LOAD_ASYNC', 'true').lower() == 'true'
+    WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'true').lower() == 'true'
+    WARMUP_CORPUS_PATH = os.getenv('WARMUP_CORPUS_PATH')
+    
+    # Versioned model registry (<path>/<version>/ plus a CURRENT pointer).
+    # Each process polls CURRENT and hot-swaps when it changes.
+    MODEL_REGISTRY_PATH = os.getenv('MODEL_REGISTRY_PATH')
+    MODEL_REGISTRY_WATCH_INTERVAL = float(os.getenv('MODEL_REGISTRY_WATCH_INTERVAL', '5'))
+    
+    # Batch inference backend: inline, thread or process. Batches larger
+    # than INFERENCE_SHARD_SIZE are split across INFERENCE_WORKERS
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'inline')
+    INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', '0')) or None
+    INFERENCE_SHARD_SIZE = int(os.getenv('INFERENCE_SHARD_SIZE', '50'))
+    
+    # ASGI serving mode (asgi.py): request threads and body buffering limit
+    ASGI_EXECUTOR_WORKERS = int(os.getenv('ASGI_EXECUTOR_WORKERS', '16'))
+    ASGI_BUFFER_BODY_BYTES = int(os.getenv('ASGI_BUFFER_BODY_BYTES', str(1024 * 1024)))
+    
+    # Per-user token buckets as "capacity/refill_per_second", in texts
+    # scored (a /batch call costs one token per item). RATE_LIMIT_PATH
+    # shares buckets between workers through a memory-mapped file;
+    # without it each worker limits on its own.
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMITS = {
+        'admin': os.getenv('RATE_LIMIT_ADMIN', '2000/200'),
+        'student': os.getenv('RATE_LIMIT_STUDENT', '500/50'),
+        'viewer': os.getenv('RATE_LIMIT_VIEWER', '100/10')
+    }
+    RATE_LIMIT_PATH = os.getenv('RATE_LIMIT_PATH')
+    
+    # Request profiling: cProfile one in PROFILE_SAMPLE_RATE requests
+    # (0 = never) and admin requests sent with "X-Profile: 1". The last
+    # PROFILE_MAX_FILES captures are kept in PROFILE_DIR.
+    PROFILE_SAMPLE_RATE = int(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_HEADER_ENABLED = os.getenv('PROFILE_HEADER_ENABLED', 'true').lower() == 'true'
+    PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp/sentiment-profiles')
+    PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '50'))
+    
+    # Prometheus metrics endpoint (/metrics)
+    METRICS_ENABLED = True
+    
+    # Response compression (gzip, and br when the brotli package is
+    # installed) for JSON/text bodies of at least COMPRESSION_MIN_SIZE
+    # bytes; compressed request bodies are decoded up to
+    # COMPRESSION_MAX_REQUEST_SIZE bytes (NDJSON streams are not limited).
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+    COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', '6'))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+    COMPRESSION_MAX_REQUEST_SIZE = int(os.getenv('COMPRESSION_MAX_REQUEST_SIZE', str(16 * 1024 * 1024)))
     
-    # Logging settings
-    LOG_LEVEL = 'INFO'
-    LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    # Logging settings: records are written by a background thread; LOG_JSON
+    # writes JSON lines with request IDs. Repeats of a message beyond
+    # LOG_SAMPLE_BURST per LOG_SAMPLE_WINDOW seconds are counted, not written.
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+    LOG_JSON = os.getenv('LOG_JSON', 'false').lower() == 'true'
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', '10'))
+    LOG_SAMPLE_WINDOW = float(os.getenv('LOG_SAMPLE_WINDOW', '60'))
 
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     TESTING = False
-    LOG_LEVEL = 'DEBUG'
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
 
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=5)
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    MODEL_LOAD_ASYNC = False
+    RATE_LIMIT_ENABLED = False
+    MICRO_BATCH_ENABLED = False
 
 class ProductionConfig(Config):
     """Production configuration"""
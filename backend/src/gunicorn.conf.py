@@ -0,0 +1,53 @@
+"""
+Gunicorn configuration
+Preloads the application so model weights are loaded once in the master
+and shared by all forked workers
+"""
+
+import gc
+import os
+import shutil
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+# Threads per worker (gthread when > 1). Concurrent requests in a worker
+# are what the micro-batcher groups into a single predict_batch call.
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# Build the app (and load the model) in the master before forking.
+# Workers inherit the memory-mapped weights instead of re-reading the file.
+preload_app = True
+
+# The master is not serving traffic yet, so load and warm the model
+# synchronously before forking; workers then start out ready
+os.environ.setdefault('MODEL_LOAD_ASYNC', 'false')
+
+# Workers write Prometheus samples here and /metrics aggregates them.
+# Must be set before prometheus_client is imported by the preloaded app.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/sentiment-metrics')
+shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+# Rate-limit buckets shared by all workers (tmpfs when available),
+# starting empty on every deploy
+os.environ.setdefault(
+    'RATE_LIMIT_PATH',
+    '/dev/shm/sentiment-ratelimit' if os.path.isdir('/dev/shm') else '/tmp/sentiment-ratelimit'
+)
+if os.path.exists(os.environ['RATE_LIMIT_PATH']):
+    os.remove(os.environ['RATE_LIMIT_PATH'])
+
+
+def child_exit(server, worker):
+    """Drop live-process samples of a worker that exited"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def pre_fork(server, worker):
+    """Move objects created during preload out of the GC's tracked set"""
+    # Without this, the first collection in each worker touches every
+    # preloaded object and copy-on-write duplicates their pages
+    gc.freeze()
@@ -0,0 +1,218 @@
+"""
+Hashing Vectorizer
+Fixed-size signed feature hashing of word and character n-grams
+
+Features are hashed straight into n_features columns, so there is no
+vocabulary to fit, store or grow: memory depends only on n_features and
+the same configuration produces the same columns in training and in
+every serving process. Half of the hash decides the column and one bit
+the sign, so colliding features tend to cancel instead of accumulating.
+
+A whole batch is hashed with array operations. Texts are lowercased and
+concatenated into one UTF-8 byte buffer; a polynomial prefix hash over
+that buffer gives the hash of any byte window in O(1), which turns every
+character n-gram and word token of the batch into a handful of numpy
+expressions. Word n-grams combine the hashes of consecutive tokens.
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+# Odd multiplier of the polynomial hash (invertible modulo 2**64)
+PRIME = np.uint64(0x100000001B3)
+PRIME_INVERSE = np.uint64(pow(0x100000001B3, -1, 2 ** 64))
+# Bytes that belong to word tokens, matching lexicon.TOKEN_PATTERN on
+# lowercased text; bytes >= 0x80 (non-ASCII letters) are word bytes too
+WORD_BYTES = np.zeros(256, dtype=bool)
+WORD_BYTES[[ord(c) for c in "abcdefghijklmnopqrstuvwxyz0123456789'"]] = True
+WORD_BYTES[0x80:] = True
+SEPARATOR = b'\x00'
+# Namespace salts keep word and character features apart
+WORD_SALT = 0x9E3779B97F4A7C15
+CHAR_SALT = 0xC2B2AE3D27D4EB4F
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: spread hash entropy over all 64 bits"""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+class HashingVectorizer:
+    """
+    Stateless text featurizer shared by training and serving
+    """
+
+    def __init__(self, n_features: int = 2 ** 18, word_ngrams: Optional[Tuple[int, int]] = (1, 2),
+                 char_ngrams: Optional[Tuple[int, int]] = (3, 5), norm: Optional[str] = 'l2'):
+        """
+        Initialize vectorizer
+
+        Args:
+            n_features: Number of columns (a power of two)
+            word_ngrams: (min_n, max_n) word n-gram range, or None for no words
+            char_ngrams: (min_n, max_n) character n-gram range in bytes, or None
+            norm: 'l2' to scale each row to unit length, or None for raw counts
+        """
+        if n_features < 2 or n_features & (n_features - 1):
+            raise ValueError("n_features must be a power of two")
+        if word_ngrams is None and char_ngrams is None:
+            raise ValueError("At least one of word_ngrams and char_ngrams is required")
+        for ngrams in (word_ngrams, char_ngrams):
+            if ngrams is not None and not 1 <= ngrams[0] <= ngrams[1]:
+                raise ValueError(f"Invalid n-gram range: {ngrams}")
+        if norm not in (None, 'l2'):
+            raise ValueError(f"Unsupported norm: {norm}")
+
+        self.n_features = n_features
+        self.word_ngrams = tuple(word_ngrams) if word_ngrams is not None else None
+        self.char_ngrams = tuple(char_ngrams) if char_ngrams is not None else None
+        self.norm = norm
+        self._mask = np.uint64(n_features - 1)
+
+        # Powers of the prime and its inverse, grown to the longest buffer seen
+        self._powers = np.ones(1, dtype=np.uint64)
+        self._inverse_powers = np.ones(1, dtype=np.uint64)
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Sent to process-pool workers: the power tables are rebuilt there
+        return self.get_config()
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def get_config(self) -> Dict:
+        """Parameters that rebuild an identical vectorizer"""
+        return {
+            'n_features': self.n_features,
+            'word_ngrams': list(self.word_ngrams) if self.word_ngrams else None,
+            'char_ngrams': list(self.char_ngrams) if self.char_ngrams else None,
+            'norm': self.norm
+        }
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'HashingVectorizer':
+        """Rebuild a vectorizer from get_config output"""
+        return cls(**config)
+
+    def _get_powers(self, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """PRIME**i and PRIME**-i modulo 2**64 for i < size"""
+        powers, inverse_powers = self._powers, self._inverse_powers
+        if len(powers) >= size:
+            return powers, inverse_powers
+
+        with self._lock:
+            if len(self._powers) < size:
+                size = max(size, 2 * len(self._powers))
+                # uint64 products wrap around, which is the modulo we want
+                with np.errstate(over='ignore'):
+                    self._powers = np.cumprod(np.full(size, PRIME, dtype=np.uint64)) * PRIME_INVERSE
+                    self._inverse_powers = np.cumprod(np.full(size, PRIME_INVERSE, dtype=np.uint64)) * PRIME
+            return self._powers, self._inverse_powers
+
+    def _hash_features(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hash every n-gram of a batch
+
+        Returns:
+            Tuple of (row index, 64-bit hash) arrays, one entry per n-gram
+        """
+        encoded = [text.lower().encode('utf-8') for text in texts]
+        lengths = np.fromiter((len(item) + 1 for item in encoded), dtype=np.int64, count=len(encoded))
+        buffer = np.frombuffer(SEPARATOR.join(encoded) + SEPARATOR, dtype=np.uint8)
+        size = len(buffer)
+        rows_of_bytes = np.repeat(np.arange(len(texts), dtype=np.int32), lengths)
+        powers, inverse_powers = self._get_powers(size + 1)
+
+        with np.errstate(over='ignore'):
+            # prefix[i] = sum((byte[k] + 1) * PRIME**k for k < i)
+            prefix = np.zeros(size + 1, dtype=np.uint64)
+            np.cumsum((buffer.astype(np.uint64) + np.uint64(1)) * powers[:size], out=prefix[1:])
+
+            def window_hash(starts, widths):
+                return (prefix[starts + widths] - prefix[starts]) * inverse_powers[starts]
+
+            rows, hashes = [], []
+
+            if self.char_ngrams is not None:
+                # Windows touching a separator would span two texts
+                separators = np.zeros(size + 1, dtype=np.int64)
+                np.cumsum(buffer == 0, out=separators[1:])
+                for n in range(self.char_ngrams[0], self.char_ngrams[1] + 1):
+                    starts = np.arange(max(size - n + 1, 0), dtype=np.int64)
+                    starts = starts[separators[starts + n] == separators[starts]]
+                    rows.append(rows_of_bytes[starts])
+                    hashes.append(_mix(window_hash(starts, n) ^ np.uint64(CHAR_SALT + n)))
+
+            if self.word_ngrams is not None:
+                is_word = WORD_BYTES[buffer]
+                edges = np.diff(np.concatenate(([False], is_word, [False])).view(np.int8))
+                starts = np.flatnonzero(edges == 1)
+                ends = np.flatnonzero(edges == -1)
+                token_rows = rows_of_bytes[starts]
+                token_hashes = _mix(window_hash(starts, ends - starts) ^ np.uint64(WORD_SALT))
+
+                ngram_hashes = token_hashes
+                for n in range(1, self.word_ngrams[1] + 1):
+                    if n > 1:
+                        # Extend (n-1)-grams by the next token of the same text
+                        same_row = token_rows[n - 1:] == token_rows[:len(token_rows) - n + 1]
+                        ngram_hashes = _mix(ngram_hashes[:-1] * PRIME + token_hashes[n - 1:])
+                        ngram_hashes = np.where(same_row, ngram_hashes, np.uint64(0))
+                        valid = same_row
+                    else:
+                        valid = slice(None)
+                    if n >= self.word_ngrams[0]:
+                        rows.append(token_rows[:len(ngram_hashes)][valid])
+                        hashes.append(ngram_hashes[valid])
+
+        return np.concatenate(rows), np.concatenate(hashes)
+
+    def transform(self, texts: List[str]) -> sparse.csr_matrix:
+        """
+        Build the feature matrix of a batch
+
+        Args:
+            texts: Input texts
+
+        Returns:
+            CSR matrix of shape (len(texts), n_features)
+        """
+        if not texts:
+            return sparse.csr_matrix((0, self.n_features), dtype=np.float64)
+
+        rows, hashes = self._hash_features(texts)
+
+        # One sort of (row, column, sign) keys groups duplicate features
+        # and leaves the columns of each row in order, as CSR needs
+        bits = self.n_features.bit_length() - 1
+        keys = (rows.astype(np.int64) << np.int64(bits + 1)) \
+            | ((hashes & self._mask).astype(np.int64) << np.int64(1)) \
+            | (hashes >> np.uint64(63)).astype(np.int64)
+        keys.sort(kind='stable')
+        signs = 1.0 - 2.0 * (keys & 1)
+        cells = keys >> 1
+        boundaries = np.flatnonzero(np.concatenate(([True], cells[1:] != cells[:-1])))
+        cells = cells[boundaries]
+        values = np.add.reduceat(signs, boundaries)
+
+        counts = np.bincount((cells >> bits).astype(np.int64), minlength=len(texts))
+        indptr = np.concatenate(([0], np.cumsum(counts)))
+        matrix = sparse.csr_matrix(
+            (values, (cells & (self.n_features - 1)).astype(np.int32), indptr),
+            shape=(len(texts), self.n_features)
+        )
+        matrix.has_sorted_indices = True
+        # Features whose signed counts cancelled out
+        matrix.eliminate_zeros()
+        if self.norm == 'l2':
+            matrix = normalize(matrix, norm='l2', copy=False)
+        return matrix
@@ -0,0 +1,242 @@
+"""
+Sentiment Lexicon
+Compiled single-pass matcher for weighted sentiment lexicons
+"""
+
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+# Lowercase word tokens; apostrophes are kept so "don't" stays one term
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Built-in terms used when no lexicon file is configured
+DEFAULT_LEXICON = {
+    'good': 1.0,
+    'great': 1.0,
+    'excellent': 1.0,
+    'happy': 1.0,
+    'bad': -1.0,
+    'terrible': -1.0,
+    'sad': -1.0,
+    'angry': -1.0
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Split lowercased text into lexicon tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class Lexicon:
+    """
+    Weighted sentiment lexicon compiled into a hash lookup
+
+    Terms are single words or multi-word phrases with a signed weight:
+    positive weights add to the positive score, negative weights to the
+    negative score. Matching tokenizes the text once and probes each
+    token position against the term index, so the cost per text depends
+    on the text length and the longest phrase, not on the lexicon size.
+    """
+
+    def __init__(self, terms: Dict[str, float], name: str = 'default'):
+        """
+        Compile lexicon terms
+
+        Args:
+            terms: Mapping of term (word or phrase) to signed weight
+            name: Lexicon name reported in model info
+        """
+        if not terms:
+            raise ValueError("Lexicon must contain at least one term")
+
+        self.name = name
+        self.terms: Dict[str, float] = {}
+        self.max_ngram = 1
+        for term, weight in terms.items():
+            tokens = tokenize(term)
+            if not tokens:
+                continue
+            key = ' '.join(tokens)
+            self.terms[key] = self.terms.get(key, 0.0) + float(weight)
+            self.max_ngram = max(self.max_ngram, len(tokens))
+
+        if not self.terms:
+            raise ValueError("Lexicon must contain at least one term")
+
+        # Column layout used by the batch path: one row per term,
+        # columns are (positive weight, negative weight)
+        self.term_index = {term: i for i, term in enumerate(self.terms)}
+        signed = np.fromiter(self.terms.values(), dtype=np.float64, count=len(self.terms))
+        self.weights = np.column_stack([np.maximum(signed, 0.0), np.maximum(-signed, 0.0)])
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    @classmethod
+    def from_arrays(cls, terms: List[str], weights: np.ndarray, name: str = 'default') -> 'Lexicon':
+        """
+        Rebuild a compiled lexicon from its saved arrays
+
+        The weights array is used as-is, so a memory-mapped array stays
+        backed by the artifact file instead of being copied.
+
+        Args:
+            terms: Normalized terms in row order
+            weights: Array of shape (len(terms), 2) with (positive, negative) weights
+            name: Lexicon name reported in model info
+
+        Returns:
+            Compiled lexicon
+        """
+        if len(terms) == 0 or weights.shape != (len(terms), 2):
+            raise ValueError("Lexicon weights must have shape (n_terms, 2)")
+
+        lexicon = cls.__new__(cls)
+        lexicon.name = name
+        lexicon.weights = weights
+        lexicon.term_index = {term: i for i, term in enumerate(terms)}
+        lexicon.terms = dict(zip(terms, (weights[:, 0] - weights[:, 1]).tolist()))
+        lexicon.max_ngram = max(term.count(' ') for term in terms) + 1
+        return lexicon
+
+    def to_arrays(self) -> Tuple[List[str], np.ndarray]:
+        """Get (terms, weights) in the layout accepted by from_arrays"""
+        return list(self.term_index), self.weights
+
+    @classmethod
+    def default(cls) -> 'Lexicon':
+        """Build the built-in lexicon"""
+        return cls(DEFAULT_LEXICON, name='default')
+
+    @classmethod
+    def from_file(cls, path: str) -> 'Lexicon':
+        """
+        Load lexicon from file
+
+        Supported formats:
+            - .json: object mapping term to weight
+            - .tsv/.txt: one "term<TAB>weight" per line (AFINN style);
+              blank lines and lines starting with '#' are skipped
+
+        Args:
+            path: Lexicon file path
+
+        Returns:
+            Compiled lexicon
+        """
+        name = os.path.splitext(os.path.basename(path))[0]
+
+        if path.endswith('.json'):
+            with open(path, encoding='utf-8') as f:
+                return cls(json.load(f), name=name)
+
+        terms = {}
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    term, weight = line.rsplit('\t', 1)
+                    terms[term] = float(weight)
+                except ValueError:
+                    raise ValueError(f"Invalid lexicon entry at {path}:{line_number}")
+
+        return cls(terms, name=name)
+
+    def match(self, tokens: List[str]) -> Iterable[str]:
+        """Yield every lexicon term found in the token sequence"""
+        terms = self.terms
+
+        if self.max_ngram == 1:
+            for token in tokens:
+                if token in terms:
+                    yield token
+            return
+
+        n_tokens = len(tokens)
+        for start in range(n_tokens):
+            if tokens[start] in terms:
+                yield tokens[start]
+            for size in range(2, min(self.max_ngram, n_tokens - start) + 1):
+                key = ' '.join(tokens[start:start + size])
+                if key in terms:
+                    yield key
+
+    def score(self, text: str) -> Tuple[float, float]:
+        """
+        Score text against the lexicon in a single pass
+
+        Args:
+            text: Input text
+
+        Returns:
+            Tuple of (positive_score, negative_score), both non-negative
+        """
+        positive = 0.0
+        negative = 0.0
+        terms = self.terms
+
+        for key in self.match(tokenize(text)):
+            weight = terms[key]
+            if weight > 0:
+                positive += weight
+            else:
+                negative -= weight
+
+        return positive, negative
+
+    def transform(self, texts: List[str]) -> sparse.csr_matrix:
+        """
+        Build a sparse document-term matrix for a batch of texts
+
+        Args:
+            texts: Input texts
+
+        Returns:
+            CSR matrix of shape (len(texts), len(lexicon)) with term counts
+        """
+        index = self.term_index
+        indices = []
+        indptr = [0]
+
+        if self.max_ngram == 1:
+            for text in texts:
+                indices.extend([index[token] for token in tokenize(text) if token in index])
+                indptr.append(len(indices))
+        else:
+            for text in texts:
+                indices.extend([index[key] for key in self.match(tokenize(text))])
+                indptr.append(len(indices))
+
+        data = np.ones(len(indices), dtype=np.float64)
+        return sparse.csr_matrix(
+            (data, np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(texts), len(index))
+        )
+
+    def score_batch(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score a batch of texts with one sparse matrix product
+
+        Args:
+            texts: Input texts
+
+        Returns:
+            Tuple of (positive_scores, negative_scores) arrays
+        """
+        scores = self.transform(texts) @ self.weights
+        return scores[:, 0], scores[:, 1]
+
+    def get_info(self) -> Dict:
+        """Get lexicon summary"""
+        return {
+            'name': self.name,
+            'terms': len(self.terms),
+            'max_ngram': self.max_ngram
+        }
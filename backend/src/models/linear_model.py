@@ -0,0 +1,207 @@
+"""
+Linear Sentiment Model
+Linear classifier over hashed text features
+
+The model is a coefficient matrix of shape (n_features, n_classes) plus
+an intercept, applied to HashingVectorizer output with one sparse matrix
+product per batch. Training and serving build their features with the
+same vectorizer configuration, which is saved with the coefficients.
+
+Coefficients can be quantized to float16 (4x smaller than float64) or to
+int8 with one scale factor per class column (8x smaller). Quantized
+weights are kept as stored: small batches upcast only the rows they use,
+large batches upcast the matrix once per call.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from models.hashing_vectorizer import HashingVectorizer
+from models.sentiment_model import LABELS
+
+QUANTIZED_DTYPES = ('float16', 'int8')
+INT8_MAX = 127
+# Quantized scoring gathers coefficient rows while a batch has fewer than
+# coef.size / GATHER_RATIO non-zero features (measured crossover)
+GATHER_RATIO = 5
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    """Row-wise softmax"""
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+class LinearModel:
+    """
+    Multinomial linear model scoring texts with hashed features
+    """
+
+    def __init__(self, vectorizer: HashingVectorizer, coef: np.ndarray, intercept: np.ndarray,
+                 classes: Sequence[str], scales: Optional[np.ndarray] = None,
+                 quantization: Optional[Dict] = None):
+        """
+        Initialize linear model
+
+        Args:
+            vectorizer: Feature extractor the coefficients were trained on
+            coef: Array of shape (n_features, n_classes); used as-is, so a
+                memory-mapped array stays backed by its file
+            intercept: Array of shape (n_classes,)
+            classes: Class label of each column, each one of LABELS
+            scales: Per-class factors applied to int8 coefficients
+            quantization: Export record of a quantized model (dtype and drift)
+        """
+        classes = tuple(classes)
+        unknown = [label for label in classes if label not in LABELS]
+        if unknown:
+            raise ValueError(f"Unknown sentiment labels: {unknown}")
+        if coef.shape != (vectorizer.n_features, len(classes)) or intercept.shape != (len(classes),):
+            raise ValueError("Coefficients must have shape (n_features, n_classes)")
+        if coef.dtype == np.int8 and (scales is None or np.shape(scales) != (len(classes),)):
+            raise ValueError("int8 coefficients need one scale per class")
+
+        self.vectorizer = vectorizer
+        self.coef = coef
+        self.intercept = intercept
+        self.classes = classes
+        self.scales = np.asarray(scales, dtype=np.float64) if scales is not None else None
+        self.quantization = quantization
+        # Maps a column to its index in LABELS
+        self.label_ids = np.array([LABELS.index(label) for label in classes], dtype=np.int8)
+
+    @classmethod
+    def train(cls, texts: List[str], labels: List[str], vectorizer: Optional[HashingVectorizer] = None,
+              C: float = 10.0, max_iter: int = 1000) -> 'LinearModel':
+        """
+        Fit a logistic regression on hashed features
+
+        Args:
+            texts: Training texts
+            labels: Sentiment label of each text (from LABELS)
+            vectorizer: Feature extractor (default HashingVectorizer())
+            C: Inverse regularization strength
+            max_iter: Solver iteration limit
+
+        Returns:
+            Trained model
+        """
+        from sklearn.linear_model import LogisticRegression
+
+        vectorizer = vectorizer or HashingVectorizer()
+        classifier = LogisticRegression(C=C, max_iter=max_iter)
+        classifier.fit(vectorizer.transform(texts), labels)
+
+        coef, intercept = classifier.coef_, classifier.intercept_
+        if len(classifier.classes_) == 2:
+            # Binary models hold one row of weights for the second class;
+            # splitting it in halves gives softmax(logits) == sigmoid(z)
+            coef = np.vstack([-coef[0] / 2, coef[0] / 2])
+            intercept = np.array([-intercept[0] / 2, intercept[0] / 2])
+
+        return cls(
+            vectorizer,
+            np.ascontiguousarray(coef.T, dtype=np.float64),
+            np.asarray(intercept, dtype=np.float64),
+            [str(label) for label in classifier.classes_]
+        )
+
+    def quantize(self, dtype: str) -> 'LinearModel':
+        """
+        Copy of this model with compact coefficients
+
+        Args:
+            dtype: 'float16', or 'int8' with per-class scales mapping the
+                largest absolute weight of each class to 127
+
+        Returns:
+            Quantized model sharing the vectorizer and intercept
+        """
+        if dtype not in QUANTIZED_DTYPES:
+            raise ValueError(f"Unsupported quantization dtype: {dtype}")
+
+        coef = self.coef * self.scales if self.scales is not None else np.asarray(self.coef, dtype=np.float64)
+        if dtype == 'float16':
+            return LinearModel(self.vectorizer, coef.astype(np.float16), self.intercept, self.classes)
+
+        scales = np.abs(coef).max(axis=0) / INT8_MAX
+        scales[scales == 0] = 1.0
+        quantized = np.clip(np.rint(coef / scales), -INT8_MAX, INT8_MAX).astype(np.int8)
+        return LinearModel(self.vectorizer, quantized, self.intercept, self.classes, scales=scales)
+
+    def decision_function(self, texts: List[str]) -> np.ndarray:
+        """Logits of shape (len(texts), n_classes)"""
+        features = self.vectorizer.transform(texts)
+        if self.coef.dtype == np.float64:
+            return features @ self.coef + self.intercept
+
+        # Sparse products need float64 weights. Small batches upcast only
+        # the coefficient rows of their features; large ones touch most
+        # pages anyway and upcast the matrix in one pass, which beats
+        # gathering that many rows
+        if features.nnz * GATHER_RATIO < self.coef.size:
+            rows = sparse.csr_matrix(
+                (features.data, np.arange(features.nnz, dtype=features.indices.dtype), features.indptr),
+                shape=(features.shape[0], features.nnz)
+            )
+            logits = rows @ self.coef[features.indices].astype(np.float64)
+        else:
+            logits = features @ self.coef.astype(np.float64)
+        if self.scales is not None:
+            # Scales are per class column, so they apply to the logits
+            logits *= self.scales
+        return logits + self.intercept
+
+    def score_batch(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score a batch of texts
+
+        Returns:
+            Tuple of (label_ids into LABELS, confidences, class probabilities)
+        """
+        probabilities = softmax(self.decision_function(texts))
+        best = probabilities.argmax(axis=1)
+        confidences = np.round(probabilities[np.arange(len(texts)), best], 4)
+        return self.label_ids[best], confidences, probabilities
+
+    def get_info(self) -> Dict:
+        """Get model summary"""
+        return {
+            'classes': list(self.classes),
+            'vectorizer': self.vectorizer.get_config(),
+            'weights_dtype': str(self.coef.dtype),
+            'weights_bytes': int(self.coef.nbytes),
+            'quantization': self.quantization
+        }
+
+
+def drift_report(reference: LinearModel, candidate: LinearModel, texts: List[str]) -> Dict:
+    """
+    Compare a candidate (e.g. quantized) model against a reference model
+
+    Args:
+        reference: Model taken as ground truth, usually the float64 one
+        candidate: Model to check
+        texts: Validation texts scored by both
+
+    Returns:
+        Dictionary with label changes and probability drift
+    """
+    if not texts:
+        raise ValueError("Drift needs at least one validation text")
+
+    ref_labels, _, ref_probabilities = reference.score_batch(texts)
+    labels, _, probabilities = candidate.score_batch(texts)
+    changed = np.flatnonzero(ref_labels != labels)
+    drift = np.abs(probabilities - ref_probabilities)
+
+    return {
+        'texts': len(texts),
+        'label_changes': int(len(changed)),
+        'changed_indices': changed[:20].tolist(),
+        'label_agreement': round(1.0 - len(changed) / len(texts), 6),
+        'max_probability_drift': float(drift.max()),
+        'mean_probability_drift': float(drift.mean())
+    }
@@ -0,0 +1,277 @@
+"""
+Model Loader
+Loads sentiment model artifacts with memory-mapped, fork-shared weights
+
+Two artifact layouts are supported:
+    - a single joblib file (MODEL_PATH, e.g. models/sentiment_model.pkl)
+      holding a dict with uncompressed numpy arrays, loaded with
+      mmap_mode='r'
+    - a directory holding meta.json plus the arrays as .npy files, loaded
+      through np.load(mmap_mode='r')
+
+Artifacts are of kind 'lexicon' (terms.json and weights.npy) or 'linear'
+(coef.npy and intercept.npy for a LinearModel, with the hashing
+vectorizer configuration in meta.json). Linear coefficients may be
+quantized by export_quantized: float16, or int8 plus scales.npy; the
+drift measured against the float64 model at export is kept in meta.json.
+
+Memory-mapped arrays are backed by the page cache, so every process that
+maps the same file shares one physical copy. Loading the model in the
+gunicorn master (preload_app) lets workers inherit the mapping at fork
+instead of re-reading the file.
+"""
+
+import json
+import logging
+import os
+import threading
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+
+from models.hashing_vectorizer import HashingVectorizer
+from models.lexicon import Lexicon
+from models.linear_model import LinearModel, drift_report
+from models.sentiment_model import SentimentAnalyzer
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT_VERSION = 1
+
+# Process-wide cache of loaded analyzers keyed by (path, mtime). Entries
+# are weak: once nothing serves a version any more (e.g. after a hot
+# swap) it is dropped and its memory-mapped weights are released.
+_loaded_models: 'weakref.WeakValueDictionary[Tuple[str, float], SentimentAnalyzer]' = \
+    weakref.WeakValueDictionary()
+_load_lock = threading.Lock()
+
+
+def save_model(analyzer: SentimentAnalyzer, path: str, version: Optional[str] = None) -> str:
+    """
+    Save analyzer weights as a memory-mappable artifact
+
+    Args:
+        analyzer: Analyzer to export
+        path: Target .pkl/.joblib file, or a directory for the .npy layout
+        version: Version recorded in the artifact (defaults to analyzer.version)
+
+    Returns:
+        Path of the written artifact
+    """
+    meta = {
+        'format': ARTIFACT_FORMAT_VERSION,
+        'model_name': analyzer.model_name,
+        'version': version or analyzer.version
+    }
+    if analyzer.linear_model is not None:
+        model = analyzer.linear_model
+        meta.update(kind='linear', classes=list(model.classes), vectorizer=model.vectorizer.get_config())
+        if model.quantization is not None:
+            meta['quantization'] = model.quantization
+        arrays = {
+            'coef': np.ascontiguousarray(model.coef),
+            'intercept': np.ascontiguousarray(model.intercept, dtype=np.float64)
+        }
+        if model.scales is not None:
+            arrays['scales'] = model.scales
+        json_files = {}
+    else:
+        terms, weights = analyzer.lexicon.to_arrays()
+        meta.update(kind='lexicon', lexicon_name=analyzer.lexicon.name)
+        arrays = {'weights': np.ascontiguousarray(weights, dtype=np.float64)}
+        json_files = {'terms': terms}
+
+    if path.endswith(('.pkl', '.joblib')):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # No compression: compressed arrays cannot be memory-mapped
+        joblib.dump(dict(meta, **json_files, **arrays), path)
+        return path
+
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    for name, content in json_files.items():
+        with open(os.path.join(path, f'{name}.json'), 'w', encoding='utf-8') as f:
+            json.dump(content, f)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), array)
+    return path
+
+
+class QuantizationError(ValueError):
+    """Quantized weights change more labels than allowed"""
+
+    def __init__(self, message: str, report: Dict):
+        super().__init__(message)
+        self.report = report
+
+
+def export_quantized(analyzer: SentimentAnalyzer, path: str, dtype: str, validation_texts: List[str],
+                     max_label_changes: int = 0, version: Optional[str] = None) -> Dict:
+    """
+    Quantize a linear analyzer's coefficients and save the artifact
+
+    Both models score the validation texts first; the artifact is only
+    written when at most max_label_changes labels differ from the float64
+    model, so a quantized model never changes labels without notice.
+
+    Args:
+        analyzer: Analyzer with a float64 linear model
+        path: Target file or directory (as for save_model)
+        dtype: 'float16' or 'int8'
+        validation_texts: Texts used to measure drift
+        max_label_changes: Allowed number of changed labels
+        version: Version recorded in the artifact
+
+    Returns:
+        Drift report, also stored in the artifact metadata
+
+    Raises:
+        QuantizationError: More labels changed than allowed
+    """
+    model = analyzer.linear_model
+    if model is None:
+        raise ValueError("Only linear models can be quantized")
+    if model.quantization is not None:
+        raise ValueError("Model is already quantized; export from the float64 model")
+
+    quantized = model.quantize(dtype)
+    report = drift_report(model, quantized, validation_texts)
+    report.update(
+        dtype=dtype,
+        weights_bytes=int(quantized.coef.nbytes),
+        compression=round(model.coef.nbytes / quantized.coef.nbytes, 2)
+    )
+    if report['label_changes'] > max_label_changes:
+        raise QuantizationError(
+            f"{dtype} weights change {report['label_changes']} of {report['texts']} labels "
+            f"(allowed: {max_label_changes})", report
+        )
+
+    quantized.quantization = report
+    save_model(
+        SentimentAnalyzer(linear_model=quantized, max_batch_size=analyzer.max_batch_size,
+                          model_name=analyzer.model_name, version=version or analyzer.version),
+        path
+    )
+    logger.info(
+        "Exported %s model to %s: %d/%d labels changed, max probability drift %.6f",
+        dtype, path, report['label_changes'], report['texts'], report['max_probability_drift']
+    )
+    return report
+
+
+def _read_artifact(path: str, mmap: bool) -> Dict:
+    """Read artifact contents, memory-mapping the weight arrays"""
+    mmap_mode = 'r' if mmap else None
+
+    if os.path.isdir(path):
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            artifact = json.load(f)
+        for entry in sorted(os.listdir(path)):
+            name, extension = os.path.splitext(entry)
+            if extension == '.npy':
+                artifact[name] = np.load(os.path.join(path, entry), mmap_mode=mmap_mode)
+            elif extension == '.json' and name != 'meta':
+                with open(os.path.join(path, entry), encoding='utf-8') as f:
+                    artifact[name] = json.load(f)
+        return artifact
+
+    artifact = joblib.load(path, mmap_mode=mmap_mode)
+    if not isinstance(artifact, dict):
+        raise ValueError(f"Unsupported model artifact in {path}: {type(artifact).__name__}")
+    return artifact
+
+
+def load_model(path: str, mmap: bool = True, max_batch_size: int = 100) -> SentimentAnalyzer:
+    """
+    Load an analyzer from a model artifact
+
+    Repeated calls for an unchanged file return the already loaded
+    analyzer, so app factories running after a preload do not touch the
+    file again.
+
+    Args:
+        path: Artifact file or directory
+        mmap: Memory-map weight arrays instead of reading them into memory
+        max_batch_size: Batch size limit for the analyzer
+
+    Returns:
+        Loaded SentimentAnalyzer
+    """
+    path = os.path.abspath(path)
+    key = (path, os.path.getmtime(path))
+
+    with _load_lock:
+        analyzer = _loaded_models.get(key)
+        if analyzer is not None:
+            return analyzer
+
+        artifact = _read_artifact(path, mmap)
+        kind = artifact.get('kind')
+        if kind == 'lexicon':
+            lexicon = Lexicon.from_arrays(
+                artifact['terms'],
+                artifact['weights'],
+                name=artifact.get('lexicon_name', 'default')
+            )
+            analyzer = SentimentAnalyzer(lexicon=lexicon, max_batch_size=max_batch_size,
+                                         model_name=artifact.get('model_name', 'SentimentAnalyzer'),
+                                         version=artifact.get('version', '1.0.0'))
+            weights, size = lexicon.weights, f"{len(lexicon)} terms"
+        elif kind == 'linear':
+            model = LinearModel(
+                HashingVectorizer.from_config(artifact['vectorizer']),
+                artifact['coef'],
+                np.asarray(artifact['intercept']),
+                artifact['classes'],
+                scales=artifact.get('scales'),
+                quantization=artifact.get('quantization')
+            )
+            analyzer = SentimentAnalyzer(linear_model=model, max_batch_size=max_batch_size,
+                                         model_name=artifact.get('model_name', 'SentimentAnalyzer'),
+                                         version=artifact.get('version', '1.0.0'))
+            weights, size = model.coef, f"{model.coef.shape[0]} hashed features, {model.coef.dtype}"
+            if model.quantization and model.quantization.get('label_changes'):
+                logger.warning(
+                    "Quantized model %s changed %d of %d validation labels at export",
+                    path, model.quantization['label_changes'], model.quantization['texts']
+                )
+        else:
+            raise ValueError(f"Unsupported model kind: {kind}")
+
+        _loaded_models[key] = analyzer
+        weakref.finalize(analyzer, logger.info, "Unloaded model %s v%s", analyzer.model_name, analyzer.version)
+        logger.info(
+            "Loaded model %s v%s from %s (%s, memory-mapped: %s)",
+            analyzer.model_name, analyzer.version, path, size, isinstance(weights, np.memmap)
+        )
+        return analyzer
+
+
+def load_analyzer(model_path: Optional[str] = None, lexicon_path: Optional[str] = None,
+                  mmap: bool = True, max_batch_size: int = 100) -> SentimentAnalyzer:
+    """
+    Load the configured analyzer
+
+    Uses the model artifact when it exists, otherwise falls back to a
+    lexicon analyzer built from lexicon_path or the built-in terms.
+
+    Args:
+        model_path: Model artifact path (Config.MODEL_PATH)
+        lexicon_path: Lexicon file used when no artifact is present
+        mmap: Memory-map artifact weights
+        max_batch_size: Batch size limit for the analyzer
+
+    Returns:
+        SentimentAnalyzer instance
+    """
+    if model_path and os.path.exists(model_path):
+        return load_model(model_path, mmap=mmap, max_batch_size=max_batch_size)
+
+    if model_path:
+        logger.info("Model artifact %s not found, using lexicon analyzer", model_path)
+
+    return SentimentAnalyzer(lexicon_path=lexicon_path or None, max_batch_size=max_batch_size)
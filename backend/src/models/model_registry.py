@@ -0,0 +1,141 @@
+"""
+Model Registry
+Versioned model artifacts on disk with an active-version pointer
+
+Layout:
+    <root>/<version>/     artifact directory written by save_model
+    <root>/CURRENT        name of the version the service should serve
+
+Versions are published into a temporary directory and renamed into
+place, and CURRENT is replaced atomically, so readers never see a
+partially written artifact or pointer. Every server process watches
+CURRENT, which makes activating a version reach all gunicorn workers.
+"""
+
+import logging
+import os
+import re
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+
+from models.model_loader import load_model, save_model
+from models.sentiment_model import SentimentAnalyzer
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = 'CURRENT'
+VERSION_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+
+
+def version_key(version: str) -> tuple:
+    """Sort key ordering numeric version parts numerically (1.10 > 1.9)"""
+    return tuple((0, int(part), '') if part.isdigit() else (1, 0, part)
+                 for part in re.split(r'[.\-_]', version))
+
+
+class ModelRegistry:
+    """
+    Directory of versioned model artifacts
+    """
+
+    def __init__(self, root: str):
+        """
+        Initialize registry
+
+        Args:
+            root: Registry directory (created if missing)
+        """
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def _check_version(version: str):
+        if not isinstance(version, str) or not VERSION_PATTERN.match(version):
+            raise ValueError(f"Invalid model version: {version!r}")
+
+    def path_for(self, version: str) -> str:
+        """Artifact directory of a version"""
+        self._check_version(version)
+        return os.path.join(self.root, version)
+
+    def list_versions(self) -> List[str]:
+        """Published versions, oldest first"""
+        versions = [
+            name for name in os.listdir(self.root)
+            if VERSION_PATTERN.match(name) and os.path.isfile(os.path.join(self.root, name, 'meta.json'))
+        ]
+        return sorted(versions, key=version_key)
+
+    def latest_version(self) -> Optional[str]:
+        """Highest published version"""
+        versions = self.list_versions()
+        return versions[-1] if versions else None
+
+    def current_version(self) -> Optional[str]:
+        """Version named by CURRENT, or the latest version without a pointer"""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE), encoding='utf-8') as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return self.latest_version()
+        return version or self.latest_version()
+
+    def set_current(self, version: str):
+        """
+        Point CURRENT at a published version
+
+        Raises:
+            ValueError: The version is not published
+        """
+        if version not in self.list_versions():
+            raise ValueError(f"Model version {version} is not in the registry")
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.current-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(version + '\n')
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_FILE))
+        logger.info("Registry %s now points at version %s", self.root, version)
+
+    def publish(self, analyzer: SentimentAnalyzer, version: str, activate: bool = False) -> str:
+        """
+        Add an analyzer to the registry as a new version
+
+        Args:
+            analyzer: Analyzer to save
+            version: Version name (letters, digits, '.', '_', '-')
+            activate: Also point CURRENT at the new version
+
+        Returns:
+            Artifact directory
+
+        Raises:
+            ValueError: The version name is invalid or already published
+        """
+        target = self.path_for(version)
+        if os.path.exists(target):
+            raise ValueError(f"Model version {version} already exists")
+
+        tmp_dir = tempfile.mkdtemp(dir=self.root, prefix='.publish-')
+        try:
+            save_model(analyzer, tmp_dir, version=version)
+            os.rename(tmp_dir, target)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if activate:
+            self.set_current(version)
+        return target
+
+    def load(self, version: str, mmap: bool = True, max_batch_size: int = 100) -> SentimentAnalyzer:
+        """Load a published version (cached per process by load_model)"""
+        return load_model(self.path_for(version), mmap=mmap, max_batch_size=max_batch_size)
+
+    def get_info(self) -> Dict:
+        """Registry contents"""
+        return {
+            'root': self.root,
+            'versions': self.list_versions(),
+            'current': self.current_version()
+        }
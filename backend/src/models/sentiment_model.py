@@ -1,48 +1,140 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from models.lexicon import Lexicon
+
+# Label order used by the array-based scoring path
+LABELS = ("negative", "neutral", "positive")
+
+
 class SentimentAnalyzer:
     """
     Simple sentiment analyzer used for testing
     """
 
-    def __init__(self):
-        self.model_name = "DummySentimentAnalyzer"
-        self.version = "1.0.0"
+    def __init__(self, lexicon: Optional[Lexicon] = None, lexicon_path: Optional[str] = None,
+                 max_batch_size: int = 100, model_name: str = "DummySentimentAnalyzer",
+                 version: str = "1.0.0", linear_model=None):
+        self.model_name = model_name
+        self.version = version
+        self.max_batch_size = max_batch_size
+
+        # A LinearModel (hashed features) replaces the lexicon rules
+        self.linear_model = linear_model
+        if linear_model is not None:
+            self.lexicon = None
+            self.score_names = linear_model.classes
+            return
+
+        # Compile the lexicon once; per-text cost no longer depends on its size
+        if lexicon is None:
+            lexicon = Lexicon.from_file(lexicon_path) if lexicon_path else Lexicon.default()
+        self.lexicon = lexicon
+        self.score_names = ("positive", "negative")
 
     def analyze(self, text: str) -> dict:
         if not text or not isinstance(text, str):
             raise ValueError("Invalid text")
 
-        text_lower = text.lower()
+        if self.linear_model is not None:
+            return self.build_results([text], *self.linear_model.score_batch([text]))[0]
 
-        if any(word in text_lower for word in ["good", "great", "excellent", "happy"]):
+        positive, negative = self.lexicon.score(text)
+
+        if positive > negative:
             sentiment = "positive"
-        elif any(word in text_lower for word in ["bad", "terrible", "sad", "angry"]):
+        elif negative > positive:
             sentiment = "negative"
         else:
             sentiment = "neutral"
 
+        # Laplace-smoothed share of positive evidence
+        positive_share = (positive + 1.0) / (positive + negative + 2.0)
+
         return {
             "text": text,
-            "sentiment": sentiment
+            "sentiment": sentiment,
+            "confidence": round(max(positive_share, 1.0 - positive_share), 4),
+            "scores": {
+                "positive": positive,
+                "negative": negative
+            },
+            "model_version": self.version
         }
 
-    def batch_analyze(self, texts: list) -> list:
+    def score_batch(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score a batch of texts with array operations
+
+        Returns:
+            Tuple of (label_ids into LABELS, confidences, scores) where
+            scores has one column per entry in score_names
+        """
+        if self.linear_model is not None:
+            return self.linear_model.score_batch(texts)
+
+        positive, negative = self.lexicon.score_batch(texts)
+
+        label_ids = np.sign(positive - negative).astype(np.int8) + 1
+        positive_share = (positive + 1.0) / (positive + negative + 2.0)
+        confidences = np.round(np.maximum(positive_share, 1.0 - positive_share), 4)
+
+        return label_ids, confidences, np.column_stack([positive, negative])
+
+    def build_results(self, texts: List[str], label_ids: np.ndarray,
+                      confidences: np.ndarray, scores: np.ndarray) -> list:
+        """Turn scored arrays into per-text result dicts"""
+        score_names = self.score_names
+        version = self.version
+        return [
+            {
+                "text": text,
+                "sentiment": LABELS[label_id],
+                "confidence": confidence,
+                "scores": dict(zip(score_names, row)),
+                "model_version": version
+            }
+            for text, label_id, confidence, row in zip(
+                texts, label_ids.tolist(), confidences.tolist(), scores.tolist()
+            )
+        ]
+
+    def validate_batch(self, texts: list):
+        """Raise ValueError unless texts is a valid batch"""
         if not isinstance(texts, list):
             raise ValueError("Input must be a list")
 
-        if len(texts) > 100:
+        if len(texts) > self.max_batch_size:
             raise ValueError("Too many items")
 
-        results = []
         for text in texts:
-            results.append(self.analyze(text))
+            if not text or not isinstance(text, str):
+                raise ValueError("Invalid text")
+
+    def batch_analyze(self, texts: list, validate: bool = True) -> list:
+        # Callers passing validate=False have already validated the batch
+        if validate:
+            self.validate_batch(texts)
 
-        return results
+        if not texts:
+            return []
+
+        return self.build_results(texts, *self.score_batch(texts))
 
     def get_model_info(self) -> dict:
+        if self.linear_model is not None:
+            return {
+                "model_name": self.model_name,
+                "version": self.version,
+                "type": "linear",
+                "linear": self.linear_model.get_info()
+            }
         return {
             "model_name": self.model_name,
             "version": self.version,
-            "type": "rule-based"
+            "type": "rule-based",
+            "lexicon": self.lexicon.get_info()
         }
 
 
@@ -51,6 +143,5 @@ class SentimentAnalyzer:
         return self.analyze(text)
 
 # Alias used by API routes (batch)
-    def predict_batch(self, texts: list) -> list:
-        return self.batch_analyze(texts)
-
+    def predict_batch(self, texts: list, validate: bool = True) -> list:
+        return self.batch_analyze(texts, validate=validate)
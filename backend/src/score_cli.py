@@ -0,0 +1,293 @@
+"""
+Offline Bulk Scoring CLI
+Scores large CSV/JSONL/Parquet files with a process pool, bypassing the API
+
+Usage:
+    python score_cli.py reviews.csv scored.csv --text-column review --workers 8
+
+Input is read in chunks and each chunk is scored by a worker process
+running its own SentimentAnalyzer. Results are appended to the output in
+input order, and progress is checkpointed after every chunk so an
+interrupted job resumes where it stopped when re-run with the same
+arguments.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.settings import Config
+from models.model_loader import load_analyzer
+from models.sentiment_model import LABELS
+from services.log_pipeline import configure_logging
+
+logger = logging.getLogger(__name__)
+
+INPUT_FORMATS = ('csv', 'jsonl', 'parquet')
+OUTPUT_FORMATS = ('csv', 'jsonl')
+
+# Analyzer owned by each worker process
+_worker_analyzer = None
+
+
+def _detect_format(path: str, allowed: tuple) -> str:
+    """Infer file format from the extension"""
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    fmt = {'ndjson': 'jsonl', 'json': 'jsonl', 'pq': 'parquet'}.get(extension, extension)
+    if fmt not in allowed:
+        raise ValueError(f"Unsupported file format for {path}; expected one of {', '.join(allowed)}")
+    return fmt
+
+
+def iter_input_chunks(path: str, fmt: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Read an input file in chunks
+
+    Args:
+        path: Input file path
+        fmt: One of INPUT_FORMATS
+        chunk_size: Rows per chunk
+
+    Yields:
+        DataFrame chunks
+    """
+    if fmt == 'csv':
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif fmt == 'jsonl':
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    else:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Reading Parquet input requires pyarrow (pip install pyarrow)")
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+def _init_worker(model_path: Optional[str], lexicon_path: Optional[str]):
+    """Load the analyzer once per worker process"""
+    global _worker_analyzer
+    _worker_analyzer = load_analyzer(model_path, lexicon_path=lexicon_path)
+
+
+def score_texts(texts: list) -> Dict:
+    """
+    Score texts with the worker's analyzer
+
+    Returns plain arrays rather than per-row dicts to keep the payload
+    sent back to the parent small.
+    """
+    present = np.array([bool(text) for text in texts])
+    label_ids, confidences, scores = _worker_analyzer.score_batch(texts)
+
+    sentiments = np.array(LABELS, dtype=object)[label_ids]
+    sentiments[~present] = None
+    confidences = np.where(present, confidences, np.nan)
+
+    return {
+        'sentiment': sentiments,
+        'confidence': confidences,
+        'scores': scores,
+        'score_names': _worker_analyzer.score_names
+    }
+
+
+def _build_output(chunk: pd.DataFrame, scored: Dict) -> pd.DataFrame:
+    """Append score columns to an input chunk"""
+    output = chunk.copy()
+    output['sentiment'] = scored['sentiment']
+    output['confidence'] = scored['confidence']
+    for i, name in enumerate(scored['score_names']):
+        output[f'score_{name}'] = scored['scores'][:, i]
+    return output
+
+
+def _write_chunk(output: pd.DataFrame, f, fmt: str, header: bool):
+    """Append a scored chunk to the open output file"""
+    if fmt == 'csv':
+        output.to_csv(f, header=header, index=False)
+    else:
+        output.to_json(f, orient='records', lines=True, force_ascii=False)
+
+
+def _load_progress(progress_path: str, input_path: str, chunk_size: int) -> Dict:
+    """Read the checkpoint of a previous run, if it matches this job"""
+    if not os.path.exists(progress_path):
+        return {'chunks_done': 0, 'rows_done': 0, 'output_bytes': 0}
+
+    with open(progress_path, encoding='utf-8') as f:
+        progress = json.load(f)
+
+    if progress.get('input') != os.path.abspath(input_path) or progress.get('chunk_size') != chunk_size:
+        raise ValueError(
+            f"Progress file {progress_path} belongs to a different job; "
+            "delete it or use the original input and chunk size"
+        )
+    return progress
+
+
+def _save_progress(progress_path: str, progress: Dict):
+    """Atomically replace the checkpoint"""
+    tmp_path = progress_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, progress_path)
+
+
+def run(input_path: str, output_path: str, text_column: str = 'text', chunk_size: int = 10000,
+        workers: int = 1, model_path: Optional[str] = None, lexicon_path: Optional[str] = None,
+        progress_path: Optional[str] = None) -> Dict:
+    """
+    Score an input file into an output file
+
+    Args:
+        input_path: CSV, JSONL or Parquet file
+        output_path: CSV or JSONL file, appended to chunk by chunk
+        text_column: Column holding the text to score
+        chunk_size: Rows per chunk
+        workers: Worker processes (1 scores in this process)
+        model_path: Model artifact path
+        lexicon_path: Lexicon file used when no artifact is present
+        progress_path: Checkpoint file (default: output_path + '.progress.json')
+
+    Returns:
+        Final progress summary
+    """
+    input_format = _detect_format(input_path, INPUT_FORMATS)
+    output_format = _detect_format(output_path, OUTPUT_FORMATS)
+    progress_path = progress_path or output_path + '.progress.json'
+
+    progress = _load_progress(progress_path, input_path, chunk_size)
+    progress.update(input=os.path.abspath(input_path), chunk_size=chunk_size)
+    skip_chunks = progress['chunks_done']
+    if skip_chunks:
+        logger.info("Resuming after %d chunks (%d rows)", skip_chunks, progress['rows_done'])
+
+    # Drop anything written after the last checkpoint
+    if skip_chunks:
+        written = os.path.getsize(output_path) if os.path.exists(output_path) else None
+        if written is None or written < progress['output_bytes']:
+            raise ValueError(
+                f"Output {output_path} is missing or shorter than its checkpoint in {progress_path}; "
+                "restore the output or delete the progress file to start over"
+            )
+    mode = 'r+' if skip_chunks else 'w'
+    output_file = open(output_path, mode, encoding='utf-8', newline='')
+    output_file.seek(progress['output_bytes'])
+    output_file.truncate()
+
+    def pending_chunks():
+        for index, chunk in enumerate(iter_input_chunks(input_path, input_format, chunk_size)):
+            if index < skip_chunks:
+                continue
+            if text_column not in chunk.columns:
+                raise ValueError(f"Input has no column named '{text_column}'")
+            texts = chunk[text_column].fillna('').astype(str).str.strip().tolist()
+            yield chunk, texts
+
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(model_path, lexicon_path)
+        )
+    else:
+        _init_worker(model_path, lexicon_path)
+
+    started = time.perf_counter()
+    rows_this_run = 0
+    try:
+        in_flight = []
+        chunks = pending_chunks()
+
+        while True:
+            # Keep a bounded window of chunks queued so memory stays flat
+            while executor is not None and len(in_flight) < workers * 2:
+                item = next(chunks, None)
+                if item is None:
+                    break
+                chunk, texts = item
+                in_flight.append((chunk, executor.submit(score_texts, texts)))
+
+            if executor is not None:
+                if not in_flight:
+                    break
+                chunk, future = in_flight.pop(0)
+                scored = future.result()
+            else:
+                item = next(chunks, None)
+                if item is None:
+                    break
+                chunk, texts = item
+                scored = score_texts(texts)
+
+            _write_chunk(_build_output(chunk, scored), output_file, output_format,
+                         header=progress['output_bytes'] == 0)
+            output_file.flush()
+            os.fsync(output_file.fileno())
+
+            rows_this_run += len(chunk)
+            progress['chunks_done'] += 1
+            progress['rows_done'] += len(chunk)
+            progress['output_bytes'] = output_file.tell()
+            _save_progress(progress_path, progress)
+    finally:
+        output_file.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    progress['completed'] = True
+    _save_progress(progress_path, progress)
+    logger.info(
+        "Scored %d rows in %.2fs (%.0f rows/s, %d workers)",
+        rows_this_run, elapsed, rows_this_run / elapsed if elapsed else 0.0, workers
+    )
+    return progress
+
+
+def main(argv=None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description='Bulk sentiment scoring for CSV, JSONL and Parquet files')
+    parser.add_argument('input', help='Input file (.csv, .jsonl or .parquet)')
+    parser.add_argument('output', help='Output file (.csv or .jsonl)')
+    parser.add_argument('--text-column', default='text', help='Column holding the text (default: text)')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Rows per chunk (default: 10000)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: CPU count)')
+    parser.add_argument('--model-path', default=Config.MODEL_PATH, help='Model artifact path')
+    parser.add_argument('--lexicon-path', default=Config.LEXICON_PATH, help='Lexicon file')
+    parser.add_argument('--progress-file', help='Checkpoint file (default: <output>.progress.json)')
+    args = parser.parse_args(argv)
+
+    configure_logging(level='INFO', fmt=Config.LOG_FORMAT)
+
+    try:
+        run(
+            args.input,
+            args.output,
+            text_column=args.text_column,
+            chunk_size=args.chunk_size,
+            workers=max(1, args.workers),
+            model_path=args.model_path,
+            lexicon_path=args.lexicon_path,
+            progress_path=args.progress_file
+        )
+    except (ValueError, RuntimeError, FileNotFoundError) as e:
+        logger.error("%s", e)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,14 +5,113 @@ Handles user authentication and authorization with Azure AD integration
 
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple
 import jwt
 import hashlib
 import secrets
 
+from services.user_store import CachedUserStore, MemoryUserStore, decode_cursor, encode_cursor
+
 logger = logging.getLogger(__name__)
 
+class TokenCache:
+    """
+    Bounded cache of verified JWT payloads
+
+    Entries are keyed by a digest of the token and are only returned
+    until the token's own 'exp' claim, so a cached lookup never accepts
+    a token that a full decode would reject as expired. When full, the
+    oldest entry is evicted in O(1).
+    """
+    
+    # Oldest entries checked for expiry on each eviction
+    EXPIRY_SWEEP = 8
+    
+    def __init__(self, max_entries: int = 10000):
+        """
+        Initialize token cache
+        
+        Args:
+            max_entries: Maximum number of cached payloads (0 disables caching)
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(token: str) -> bytes:
+        """Digest used as the cache key"""
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+    
+    def get(self, token: str) -> Optional[Dict]:
+        """Get cached payload for a token if it has not expired"""
+        key = self.make_key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        payload, expires_at = entry
+        if expires_at <= time.time():
+            self._entries.pop(key, None)
+            return None
+        return dict(payload)
+    
+    def put(self, token: str, payload: Dict):
+        """Cache a verified payload until the token expires"""
+        if self.max_entries <= 0 or 'exp' not in payload:
+            return
+        
+        key = self.make_key(token)
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[key] = (dict(payload), float(payload['exp']))
+    
+    def _evict(self):
+        """Drop expired entries among the oldest, then the oldest one (lock held)"""
+        # Tokens share one lifetime, so the oldest entries expire first
+        now = time.time()
+        for _ in range(self.EXPIRY_SWEEP):
+            if not self._entries:
+                return
+            key, (_, expires_at) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[key]
+        
+        while len(self._entries) >= self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate_token(self, token: str):
+        """Remove a single token"""
+        with self._lock:
+            self._entries.pop(self.make_key(token), None)
+    
+    def invalidate_user(self, username: str) -> int:
+        """
+        Remove every cached token issued to a user
+        
+        Returns:
+            Number of removed entries
+        """
+        with self._lock:
+            keys = [key for key, (payload, _) in self._entries.items() if payload.get('sub') == username]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+    
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
 class AuthService:
     """
     Authentication service supporting both JWT and Azure AD
@@ -26,26 +125,40 @@ class AuthService:
         'viewer': ['read']
     }
     
-    def __init__(self):
-        """Initialize authentication service"""
+    # Accounts seeded into an empty store
+    DEFAULT_USERS = [
+        ('admin@university.edu', 'admin123', 'admin', 'Administrator'),
+        ('student@university.edu', 'student123', 'student', 'Student User')
+    ]
+    
+    def __init__(self, token_cache_size: int = 10000, user_store=None, user_cache_size: int = 10000,
+                 user_cache_check_interval: float = 1.0):
+        """
+        Initialize authentication service
+        
+        Args:
+            token_cache_size: Maximum number of verified tokens kept in memory
+            user_store: MemoryUserStore or SQLiteUserStore (in-memory by default)
+            user_cache_size: Maximum number of user records cached per worker
+            user_cache_check_interval: Seconds between checks for user
+                changes made by other workers
+        """
         self.secret_key = os.getenv('JWT_SECRET_KEY', 'dev-secret-key')
         self.algorithm = 'HS256'
         self.access_token_expires = timedelta(hours=1)
         self.refresh_token_expires = timedelta(days=30)
+        self.token_cache = TokenCache(token_cache_size)
         
-        # In-memory user store (for demonstration)
-        self.users = {
-            'admin@university.edu': {
-                'password_hash': self._hash_password('admin123'),
-                'role': 'admin',
-                'name': 'Administrator'
-            },
-            'student@university.edu': {
-                'password_hash': self._hash_password('student123'),
-                'role': 'student',
-                'name': 'Student User'
-            }
-        }
+        self.users = CachedUserStore(
+            user_store if user_store is not None else MemoryUserStore(),
+            max_entries=user_cache_size,
+            check_interval=user_cache_check_interval
+        )
+        # Only an empty store is seeded, so a default account an operator
+        # deleted from a persistent store does not come back on restart
+        if self.users.count() == 0:
+            for username, password, role, name in self.DEFAULT_USERS:
+                self.users.add(username, self._hash_password(password), role, name)
     
     def _hash_password(self, password: str) -> str:
         """Hash password using SHA-256"""
@@ -72,14 +185,14 @@ class AuthService:
         
         user = self.users.get(username)
         if not user or not self._verify_password(password, user['password_hash']):
-            logger.warning(f"Failed login attempt for user: {username}")
+            logger.warning("Failed login attempt for user: %s", username)
             return None
         
         try:
             access_token = self._create_access_token(username, user['role'])
             refresh_token = self._create_refresh_token(username)
             
-            logger.info(f"User logged in successfully: {username}")
+            logger.info("User logged in successfully: %s", username)
             return {
                 'access_token': access_token,
                 'refresh_token': refresh_token,
@@ -92,7 +205,7 @@ class AuthService:
                 }
             }
         except Exception as e:
-            logger.error(f"Error during login: {e}")
+            logger.error("Error during login: %s", e)
             return None
     
     def _create_access_token(self, username: str, role: str) -> str:
@@ -101,8 +214,11 @@ class AuthService:
             'sub': username,
             'role': role,
             'type': 'access',
-            'iat': datetime.utcnow(),
-            'exp': datetime.utcnow() + self.access_token_expires
+            # Sub-second 'iat' so tokens issued right after a user
+            # revocation are not caught by it
+            'iat': time.time(),
+            'exp': datetime.utcnow() + self.access_token_expires,
+            'jti': secrets.token_urlsafe(16)
         }
         return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
     
@@ -111,7 +227,7 @@ class AuthService:
         payload = {
             'sub': username,
             'type': 'refresh',
-            'iat': datetime.utcnow(),
+            'iat': time.time(),
             'exp': datetime.utcnow() + self.refresh_token_expires,
             'jti': secrets.token_urlsafe(16)
         }
@@ -127,15 +243,55 @@ class AuthService:
         Returns:
             Dictionary with token claims or None if invalid
         """
-        try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
-        except jwt.ExpiredSignatureError:
-            logger.warning("Token has expired")
-            return None
-        except jwt.InvalidTokenError as e:
-            logger.warning(f"Invalid token: {e}")
+        payload = self.token_cache.get(token)
+        if payload is None:
+            try:
+                payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            except jwt.ExpiredSignatureError:
+                logger.warning("Token has expired")
+                return None
+            except jwt.InvalidTokenError as e:
+                logger.warning("Invalid token: %s", e)
+                return None
+            self.token_cache.put(token, payload)
+        
+        # Checked on cache hits too; revocations live in the shared user store
+        if self.users.is_revoked(payload):
+            logger.warning("Revoked token for user: %s", payload.get('sub'))
             return None
+        return payload
+    
+    def revoke_token(self, token: str) -> bool:
+        """
+        Deny a token until it expires, in every worker (e.g. on logout)
+        
+        Args:
+            token: JWT token string
+            
+        Returns:
+            True if the token was valid and is now revoked
+        """
+        payload = self.verify_token(token)
+        self.token_cache.invalidate_token(token)
+        if payload is None:
+            return False
+        if payload.get('jti'):
+            self.users.revoke_token(payload['jti'], float(payload['exp']))
+        else:
+            # Tokens issued before jti was added can only be denied per user
+            self.users.revoke_user(payload['sub'], time.time())
+        return True
+    
+    def revoke_user_tokens(self, username: str):
+        """
+        Deny every token issued to a user so far (e.g. after a role change)
+        
+        Args:
+            username: User email
+        """
+        self.users.revoke_user(username, time.time())
+        removed = self.token_cache.invalidate_user(username)
+        logger.info("Revoked tokens for user: %s (%s cached)", username, removed)
     
     def refresh_access_token(self, refresh_token: str) -> Optional[str]:
         """
@@ -177,7 +333,9 @@ class AuthService:
         user = self.users.get(username)
         if not user:
             return None
-        
+        return self._public_info(username, user)
+    
+    def _public_info(self, username: str, user: Dict) -> Dict:
         return {
             'username': username,
             'name': user['name'],
@@ -185,6 +343,24 @@ class AuthService:
             'permissions': self.ROLES.get(user['role'], [])
         }
     
+    def list_users(self, limit: int = 100, cursor: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        """
+        Page through users in username order
+        
+        Args:
+            limit: Maximum users per page
+            cursor: next_cursor of the previous page (None for the first)
+            
+        Returns:
+            Tuple of (user info list, cursor of the next page or None)
+            
+        Raises:
+            ValueError: The cursor is malformed
+        """
+        rows = self.users.list(after=decode_cursor(cursor), limit=limit + 1)
+        next_cursor = encode_cursor(rows[limit - 1][0]) if len(rows) > limit else None
+        return [self._public_info(username, user) for username, user in rows[:limit]], next_cursor
+    
     def register_user(self, username: str, password: str, name: str, role: str = 'student') -> bool:
         """
         Register new user (admin only)
@@ -198,19 +374,41 @@ class AuthService:
         Returns:
             True if registration successful
         """
-        if username in self.users:
-            logger.warning(f"User already exists: {username}")
+        if role not in self.ROLES:
+            logger.warning("Invalid role: %s", role)
             return False
         
-        if role not in self.ROLES:
-            logger.warning(f"Invalid role: {role}")
+        if not self.users.add(username, self._hash_password(password), role, name):
+            logger.warning("User already exists: %s", username)
             return False
         
-        self.users[username] = {
-            'password_hash': self._hash_password(password),
-            'role': role,
-            'name': name
-        }
+        logger.info("New user registered: %s", username)
+        return True
+    
+    def update_user(self, username: str, name: Optional[str] = None, role: Optional[str] = None,
+                    password: Optional[str] = None) -> bool:
+        """
+        Change a user's name, role or password
+        
+        A role or password change revokes every token the user holds,
+        access and refresh alike. The revocation is kept in the user
+        store, so every worker rejects those tokens within the store's
+        check interval.
+        
+        Returns:
+            True if the user exists and the change was stored
+        """
+        if role is not None and role not in self.ROLES:
+            logger.warning("Invalid role: %s", role)
+            return False
+        
+        fields = {'name': name, 'role': role}
+        if password is not None:
+            fields['password_hash'] = self._hash_password(password)
+        if not self.users.update(username, **{key: value for key, value in fields.items() if value is not None}):
+            return False
         
-        logger.info(f"New user registered: {username}")
+        if role is not None or password is not None:
+            self.revoke_user_tokens(username)
+        logger.info("User updated: %s", username)
         return True
@@ -0,0 +1,374 @@
+"""
+HTTP Compression
+gzip/brotli response encoding and request-body decoding as WSGI middleware
+
+Responses are compressed when the client accepts gzip or br (brotli,
+when the optional `brotli` package is installed), the content type is
+textual (JSON, NDJSON, text) and the body is not known to be smaller
+than min_size. Bodies are compressed chunk by chunk as the app produces
+them, so a large or streamed response never exists twice in memory;
+streaming content types (NDJSON, server-sent events) are flushed after
+every chunk so each line reaches the client without waiting for more.
+
+Request bodies sent with Content-Encoding gzip, deflate or br are
+decompressed before the app reads them, up to max_request_size bytes (413
+beyond that, 400 for corrupt data). Streaming uploads (NDJSON) are
+decompressed as the app reads them and have no total limit, like their
+uncompressed form; each read decodes a bounded amount, and the app
+bounds the length of a line.
+"""
+
+import io
+import json
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from werkzeug.exceptions import BadRequest, HTTPException, RequestEntityTooLarge
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised only without brotli
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript',
+                      'application/xml', 'application/problem+json')
+# Content types whose chunks are flushed to the client as they are produced
+STREAMING_TYPES = ('application/x-ndjson', 'text/event-stream')
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map of coding to q-value from an Accept-Encoding header"""
+    codings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding] = quality
+    return codings
+
+
+def choose_encoding(header: str, available: Tuple[str, ...]) -> Optional[str]:
+    """
+    Preferred available coding the client accepts
+
+    Args:
+        header: Accept-Encoding value
+        available: Codings in server preference order
+
+    Returns:
+        Coding name, or None for an uncompressed response
+    """
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = codings.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class _Encoder:
+    """Incremental compressor with a common interface for gzip and brotli"""
+
+    def __init__(self, coding: str, level: int, brotli_quality: int):
+        self.coding = coding
+        if coding == 'br':
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits 31 writes the gzip header and trailer
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.coding == 'br':
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        if self.coding == 'br':
+            return self._compressor.flush()
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.coding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def _decodable(coding: str) -> bool:
+    return coding in ('gzip', 'x-gzip', 'deflate') or (coding == 'br' and brotli is not None)
+
+
+class _DecodedInput(io.RawIOBase):
+    """
+    Request body stream decompressed as the app reads it
+
+    Each read decodes at most one chunk of output (gzip/deflate) or one
+    small piece of input (brotli), so memory does not grow with the body.
+    Raises 400 for corrupt or truncated input and, when max_size is set,
+    413 once more than max_size decoded bytes have been read.
+    """
+
+    def __init__(self, source, coding: str, length: Optional[int], max_size: Optional[int] = None):
+        self.source = source
+        self.coding = coding
+        self.remaining = length
+        self.max_size = max_size
+        self.decoded = 0
+        self._pending = b''
+        if coding == 'br':
+            self._decompressor = brotli.Decompressor()
+            self._errors = (brotli.error,)
+        else:
+            # wbits 47 accepts both gzip and zlib ("deflate") framing
+            self._decompressor = zlib.decompressobj(47)
+            self._errors = (zlib.error,)
+
+    def readable(self):
+        return True
+
+    def _finished(self) -> bool:
+        if self.coding == 'br':
+            return self._decompressor.is_finished()
+        return self._decompressor.eof
+
+    def _fill(self):
+        """Decode the next piece of input into the pending buffer"""
+        while not self._pending:
+            if self.coding != 'br' and self._decompressor.unconsumed_tail:
+                data = self._decompressor.unconsumed_tail
+            else:
+                if self._finished():
+                    return
+                size = READ_CHUNK_SIZE if self.remaining is None else min(READ_CHUNK_SIZE, self.remaining)
+                # brotli cannot cap its output, so it is fed small inputs
+                data = self.source.read(min(size, 4096) if self.coding == 'br' else size) if size else b''
+                if not data:
+                    raise BadRequest('Truncated compressed request body')
+                if self.remaining is not None:
+                    self.remaining -= len(data)
+            try:
+                if self.coding == 'br':
+                    self._pending = self._decompressor.process(data)
+                else:
+                    self._pending = self._decompressor.decompress(data, READ_CHUNK_SIZE)
+            except self._errors:
+                raise BadRequest('Malformed compressed request body')
+            self.decoded += len(self._pending)
+            if self.max_size is not None and self.decoded > self.max_size:
+                raise RequestEntityTooLarge('Decompressed request body is too large')
+
+    def readinto(self, buffer):
+        self._fill()
+        count = min(len(buffer), len(self._pending))
+        buffer[:count] = self._pending[:count]
+        self._pending = self._pending[count:]
+        return count
+
+
+class CompressionMiddleware:
+    """
+    WSGI middleware negotiating response compression and decoding requests
+    """
+
+    def __init__(self, app, min_size: int = 1024, level: int = 6, brotli_quality: int = 4,
+                 max_request_size: int = 16 * 1024 * 1024):
+        """
+        Initialize compression middleware
+
+        Args:
+            app: WSGI application
+            min_size: Bodies with a Content-Length below this are sent as is
+            level: gzip compression level (1-9)
+            brotli_quality: brotli quality (0-11); 4-5 suits dynamic responses
+            max_request_size: Largest decompressed request body accepted
+                (streaming uploads are not limited)
+        """
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.max_request_size = max_request_size
+        self.available = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+        # Statistics
+        self.compressed = 0
+        self.skipped_small = 0
+        self.decompressed_requests = 0
+
+    def _decode_request(self, environ, start_response):
+        """
+        Swap a compressed request body for its decoded bytes
+
+        Streaming uploads (NDJSON for /batch/stream) are decoded lazily as
+        the app reads them, so they are never held in memory whole; other
+        bodies are read whole by the app anyway and are decoded here, where
+        corrupt and oversized input can be answered 400 and 413.
+
+        Returns:
+            None, or an error response body
+        """
+        coding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if not coding or coding == 'identity':
+            return None
+        if not _decodable(coding):
+            return _error(start_response, '415 Unsupported Media Type', f'Unsupported Content-Encoding: {coding}')
+
+        length = environ.pop('CONTENT_LENGTH', '')
+        length = int(length) if length.isdigit() else None
+        del environ['HTTP_CONTENT_ENCODING']
+        self.decompressed_requests += 1
+
+        if environ.get('CONTENT_TYPE', '').split(';')[0].strip().lower().startswith(STREAMING_TYPES):
+            # Unbounded like an uncompressed stream; errors surface in-band
+            environ['wsgi.input'] = io.BufferedReader(
+                _DecodedInput(environ['wsgi.input'], coding, length), READ_CHUNK_SIZE
+            )
+            # Decoded length is unknown; the stream itself marks the end
+            environ['wsgi.input_terminated'] = True
+            return None
+
+        reader = io.BufferedReader(
+            _DecodedInput(environ['wsgi.input'], coding, length, self.max_request_size), READ_CHUNK_SIZE
+        )
+        try:
+            body = reader.read()
+        except HTTPException as e:
+            return _error(start_response, f'{e.code} {e.name}', e.description)
+        environ['wsgi.input'] = io.BytesIO(body)
+        environ['CONTENT_LENGTH'] = str(len(body))
+        return None
+
+    def __call__(self, environ, start_response):
+        error = self._decode_request(environ, start_response)
+        if error is not None:
+            return error
+
+        coding = None
+        if environ.get('REQUEST_METHOD') != 'HEAD':
+            coding = choose_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''), self.available)
+        state = {'encoder': None, 'streaming': False}
+
+        def compressing_start_response(status, headers, exc_info=None):
+            headers = self._negotiate(status, headers, coding, state)
+            return start_response(status, headers, exc_info)
+
+        body = self.app(environ, compressing_start_response)
+        return _CompressedBody(body, state)
+
+    def _negotiate(self, status: str, headers: List[Tuple[str, str]], coding: Optional[str],
+                   state: Dict) -> List[Tuple[str, str]]:
+        """Decide on compression from the response headers and rewrite them"""
+        names = {name.lower(): value for name, value in headers}
+        content_type = names.get('content-type', '').split(';')[0].strip().lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES) or 'content-encoding' in names \
+                or status[:3] in ('204', '304') or status[0] not in '23':
+            return headers
+
+        headers = list(headers)
+        vary = names.get('vary')
+        if vary is None:
+            headers.append(('Vary', 'Accept-Encoding'))
+        elif 'accept-encoding' not in vary.lower():
+            headers = [(name, f'{value}, Accept-Encoding' if name.lower() == 'vary' else value)
+                       for name, value in headers]
+
+        length = names.get('content-length')
+        if coding is None:
+            return headers
+        if length is not None and length.isdigit() and int(length) < self.min_size:
+            self.skipped_small += 1
+            return headers
+
+        state['encoder'] = _Encoder(coding, self.level, self.brotli_quality)
+        state['streaming'] = content_type.startswith(STREAMING_TYPES)
+        self.compressed += 1
+        headers = [(name, value) for name, value in headers if name.lower() != 'content-length']
+        headers.append(('Content-Encoding', coding))
+        return headers
+
+    def get_stats(self) -> Dict:
+        """Get compression counters for this process"""
+        return {
+            'encodings': list(self.available),
+            'min_size': self.min_size,
+            'compressed_responses': self.compressed,
+            'skipped_small': self.skipped_small,
+            'decompressed_requests': self.decompressed_requests
+        }
+
+
+class _CompressedBody:
+    """
+    Response body compressed chunk by chunk as it is iterated
+    """
+
+    def __init__(self, body, state: Dict):
+        self.body = body
+        self.state = state
+
+    def __iter__(self):
+        encoder = self.state['encoder']
+        iterator = iter(self.body)
+        if encoder is None:
+            # start_response may not have run yet for generator bodies
+            for chunk in iterator:
+                encoder = self.state['encoder']
+                if encoder is not None:
+                    yield from self._compress(encoder, chunk, iterator)
+                    return
+                yield chunk
+            return
+        yield from self._compress(encoder, None, iterator)
+
+    def _compress(self, encoder: _Encoder, first: Optional[bytes], iterator):
+        streaming = self.state['streaming']
+        chunks = iterator if first is None else _prepend(first, iterator)
+        for chunk in chunks:
+            data = encoder.compress(chunk)
+            if streaming:
+                data += encoder.flush()
+            if data:
+                yield data
+        yield encoder.finish()
+
+    def close(self):
+        if hasattr(self.body, 'close'):
+            self.body.close()
+
+
+def _prepend(first, iterator):
+    yield first
+    yield from iterator
+
+
+def _error(start_response, status: str, message: str) -> List[bytes]:
+    # Same shape as the app's error handlers
+    body = json.dumps({'error': status.split(' ', 1)[1], 'message': message}).encode('utf-8')
+    start_response(status, [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))])
+    return [body]
+
+
+def init_app(app, min_size: int = 1024, level: int = 6, brotli_quality: int = 4,
+             max_request_size: int = 16 * 1024 * 1024) -> CompressionMiddleware:
+    """
+    Install compression on an app
+
+    Returns:
+        CompressionMiddleware, also attached as app.compression
+    """
+    middleware = CompressionMiddleware(app.wsgi_app, min_size=min_size, level=level,
+                                       brotli_quality=brotli_quality, max_request_size=max_request_size)
+    app.compression = middleware
+    app.wsgi_app = middleware
+    return middleware
@@ -0,0 +1,286 @@
+"""
+Inference Executor
+Runs batch scoring inline, on a thread pool or on a process pool
+
+With the process backend, large batches are split into shards scored in
+parallel by worker processes that each hold a copy of the analyzer, so
+CPU-bound Python models use more than one core per server worker. Texts
+are sent to the workers as one UTF-8 buffer plus offsets in shared
+memory, and workers write label ids, confidences and scores straight
+into a shared output buffer; only shard boundaries are pickled.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('inline', 'thread', 'process')
+
+# Analyzer held by each process-pool worker
+_worker_analyzer = None
+
+
+def _init_worker(analyzer):
+    """Keep the analyzer in the worker process"""
+    global _worker_analyzer
+    _worker_analyzer = analyzer
+
+
+def _output_views(buffer, count: int, score_columns: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Label id, confidence and score arrays laid out in an output buffer"""
+    confidences = np.ndarray((count,), dtype=np.float64, buffer=buffer)
+    scores = np.ndarray((count, score_columns), dtype=np.float64, buffer=buffer, offset=8 * count)
+    label_ids = np.ndarray((count,), dtype=np.int8, buffer=buffer, offset=8 * count * (1 + score_columns))
+    return label_ids, confidences, scores
+
+
+def _score_shard(input_name: str, output_name: str, count: int, score_columns: int, start: int, end: int):
+    """Score texts[start:end] from shared memory into the shared output buffer"""
+    input_shm = shared_memory.SharedMemory(name=input_name)
+    output_shm = shared_memory.SharedMemory(name=output_name)
+    try:
+        offsets = np.ndarray((count + 1,), dtype=np.int64, buffer=input_shm.buf)
+        data = input_shm.buf[8 * (count + 1):]
+        bounds = offsets[start:end + 1].tolist()
+        texts = [bytes(data[a:b]).decode('utf-8') for a, b in zip(bounds, bounds[1:])]
+        del data
+
+        label_ids, confidences, scores = _worker_analyzer.score_batch(texts)
+        out_labels, out_confidences, out_scores = _output_views(output_shm.buf, count, score_columns)
+        out_labels[start:end] = label_ids
+        out_confidences[start:end] = confidences
+        out_scores[start:end] = scores
+        del out_labels, out_confidences, out_scores, offsets
+    finally:
+        input_shm.close()
+        output_shm.close()
+
+
+class InferenceExecutor:
+    """
+    Executes predict_batch for an analyzer on the configured backend
+
+    Batches of up to shard_size texts are always scored inline, since
+    dispatch overhead outweighs the gain; larger batches are split into
+    shard_size pieces and scored concurrently. Pools are created on first
+    use in each process, so a preloaded app gets its own pool per
+    server worker. Each call reads the analyzer once and uses it
+    throughout, and a process pool only scores for the analyzer its
+    workers were started with.
+    """
+
+    def __init__(self, analyzer, backend: str = 'inline', workers: Optional[int] = None,
+                 shard_size: int = 50, start_method: str = 'forkserver'):
+        """
+        Initialize inference executor
+
+        Args:
+            analyzer: SentimentAnalyzer providing score_batch and build_results
+                (may be set later with set_analyzer)
+            backend: 'inline', 'thread' or 'process'
+            workers: Pool size (defaults to the number of CPUs)
+            shard_size: Texts per shard sent to the pool
+            start_method: multiprocessing start method for the process backend
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+
+        self.analyzer = analyzer
+        self.backend = backend
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_size = max(1, shard_size)
+        self.start_method = start_method
+
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        self._pool_analyzer = None
+
+        # Statistics
+        self.batches = 0
+        self.parallel_batches = 0
+        self.shards = 0
+        self.pool_restarts = 0
+
+    @property
+    def version(self) -> str:
+        return self.analyzer.version
+
+    def _get_pool(self, analyzer):
+        """
+        Pool for the current process and analyzer, created on first use
+
+        Returns:
+            The pool, or None if analyzer has been swapped out meanwhile
+        """
+        if self._pool_pid == os.getpid() and self._pool_analyzer is analyzer:
+            return self._pool
+
+        with self._lock:
+            if self._pool_pid != os.getpid() or self._pool_analyzer is not analyzer:
+                if analyzer is not self.analyzer:
+                    return None
+                if self.backend == 'thread':
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='inference')
+                else:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context(self.start_method),
+                        initializer=_init_worker,
+                        initargs=(analyzer,)
+                    )
+                self._pool_pid = os.getpid()
+                self._pool_analyzer = analyzer
+            return self._pool
+
+    def set_analyzer(self, analyzer):
+        """
+        Serve a different analyzer
+
+        Process workers hold a copy of the analyzer, so the current pool
+        is retired (queued shards still finish) and a new one starts on
+        the next parallel batch.
+        """
+        with self._lock:
+            pool = self._pool if self._pool_pid == os.getpid() else None
+            self.analyzer = analyzer
+            self._pool = None
+            self._pool_pid = None
+            self._pool_analyzer = None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    def _shard_bounds(self, count: int) -> List[Tuple[int, int]]:
+        return [(start, min(start + self.shard_size, count)) for start in range(0, count, self.shard_size)]
+
+    def _score_threads(self, texts: List[str], analyzer) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Score shards on the thread pool and concatenate them in order"""
+        pool = self._get_pool(analyzer)
+        if pool is None:
+            return analyzer.score_batch(texts)
+        futures = [pool.submit(analyzer.score_batch, texts[start:end])
+                   for start, end in self._shard_bounds(len(texts))]
+        parts = [future.result() for future in futures]
+        return tuple(np.concatenate([part[i] for part in parts]) for i in range(3))
+
+    def _score_processes(self, texts: List[str], analyzer) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Score shards on the process pool through shared memory"""
+        pool = self._get_pool(analyzer)
+        if pool is None:
+            return analyzer.score_batch(texts)
+
+        count = len(texts)
+        score_columns = len(analyzer.score_names)
+        encoded = [text.encode('utf-8') for text in texts]
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum([len(item) for item in encoded], out=offsets[1:])
+
+        input_shm = shared_memory.SharedMemory(create=True, size=8 * (count + 1) + max(int(offsets[-1]), 1))
+        output_shm = shared_memory.SharedMemory(create=True, size=count * (8 + 8 * score_columns + 1))
+        try:
+            input_shm.buf[:8 * (count + 1)] = offsets.tobytes()
+            input_shm.buf[8 * (count + 1):8 * (count + 1) + int(offsets[-1])] = b''.join(encoded)
+
+            futures = [
+                pool.submit(_score_shard, input_shm.name, output_shm.name, count, score_columns, start, end)
+                for start, end in self._shard_bounds(count)
+            ]
+            for future in futures:
+                future.result()
+
+            label_ids, confidences, scores = _output_views(output_shm.buf, count, score_columns)
+            result = (label_ids.copy(), confidences.copy(), scores.copy())
+            del label_ids, confidences, scores
+            return result
+        finally:
+            input_shm.close()
+            input_shm.unlink()
+            output_shm.close()
+            output_shm.unlink()
+
+    def score_batch(self, texts: List[str], analyzer=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score a batch of texts on the configured backend
+
+        Args:
+            texts: Texts to score
+            analyzer: Analyzer to score with (defaults to the current one)
+
+        Returns:
+            Same arrays as SentimentAnalyzer.score_batch, in input order
+        """
+        analyzer = analyzer or self.analyzer
+        self.batches += 1
+        if self.backend == 'inline' or len(texts) <= self.shard_size:
+            return analyzer.score_batch(texts)
+
+        self.parallel_batches += 1
+        self.shards += len(self._shard_bounds(len(texts)))
+        if self.backend == 'thread':
+            return self._score_threads(texts, analyzer)
+
+        try:
+            return self._score_processes(texts, analyzer)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool next time
+            # and serve this batch inline
+            logger.exception("Inference process pool broke; restarting it")
+            with self._lock:
+                self._pool = None
+                self._pool_pid = None
+                self._pool_analyzer = None
+                self.pool_restarts += 1
+            return analyzer.score_batch(texts)
+
+    def predict_batch(self, texts: List[str], validate: bool = True, analyzer=None) -> List[Dict]:
+        """
+        Predict sentiment for a batch of texts
+
+        Validates like SentimentAnalyzer.batch_analyze (unless validate is
+        False) and returns the same result dicts. A request holding an
+        analyzer that has since been swapped out is scored inline with it.
+        """
+        current = self.analyzer
+        if analyzer is not None and analyzer is not current:
+            return analyzer.predict_batch(texts, validate=validate)
+        if validate:
+            current.validate_batch(texts)
+        if not texts:
+            return []
+        return current.build_results(texts, *self.score_batch(texts, current))
+
+    def predict(self, text: str) -> Dict:
+        """Predict sentiment for a single text (always inline)"""
+        return self.analyzer.predict(text)
+
+    def get_model_info(self) -> Dict:
+        return self.analyzer.get_model_info()
+
+    def shutdown(self):
+        """Stop the pool owned by this process"""
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=True)
+            self._pool = None
+            self._pool_pid = None
+
+    def get_stats(self) -> Dict:
+        """Get executor statistics"""
+        return {
+            'backend': self.backend,
+            'workers': self.workers,
+            'shard_size': self.shard_size,
+            'batches': self.batches,
+            'parallel_batches': self.parallel_batches,
+            'shards': self.shards,
+            'pool_restarts': self.pool_restarts
+        }
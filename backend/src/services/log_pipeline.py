@@ -0,0 +1,299 @@
+"""
+Log Pipeline
+Queued, sampled, structured logging that keeps I/O off request threads
+
+Request threads only put records on a bounded in-memory queue; a
+background listener thread formats and writes them. Repeated messages
+are sampled per call site: the first LOG_SAMPLE_BURST records with the
+same logger, level and message template in a LOG_SAMPLE_WINDOW pass,
+the rest are counted and reported once on the next record that passes
+("... [10431 similar suppressed]"). Errors are never sampled. When the
+queue is full, records are dropped and counted rather than blocking the
+request.
+
+Records can be written as JSON lines carrying the request ID, which
+init_app takes from the X-Request-ID header (or generates) and echoes in
+the response.
+
+Call sites should use lazy %-style arguments (logger.warning("... %s",
+value)) so that sampled-out and disabled records are never formatted
+and so that records of one call site share their message template.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from flask import g, has_request_context, request
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current request ID ('-' outside requests) to records"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = g.get('request_id', '-') if has_request_context() else '-'
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets a burst of each repeated message through per time window
+
+    Records are grouped by (logger, level, message template), so lazy
+    %-style calls with different arguments count as one message.
+    """
+
+    def __init__(self, burst: int = 10, window: float = 60.0, max_level: int = logging.WARNING):
+        """
+        Initialize sampling filter
+
+        Args:
+            burst: Records of one message passed per window (0 disables sampling)
+            window: Window length in seconds
+            max_level: Highest level that is sampled
+        """
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.max_level = max_level
+        # key -> [window start, records in window, suppressed since last pass]
+        self._windows: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record):
+        if not self.burst or record.levelno > self.max_level:
+            return True
+
+        key = (record.name, record.levelno, record.msg if isinstance(record.msg, str) else type(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None:
+                if len(self._windows) >= 10000:
+                    self._windows.clear()
+                state = self._windows[key] = [now, 0, 0]
+            elif now - state[0] >= self.window:
+                state[0], state[1] = now, 0
+
+            state[1] += 1
+            if state[1] > self.burst:
+                state[2] += 1
+                self.suppressed += 1
+                return False
+            repeats, state[2] = state[2], 0
+
+        if repeats:
+            record.suppressed = repeats
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+            'pid': record.process,
+            'thread': record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain-text formatter that notes suppressed repeats"""
+
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        return f'{text} [{suppressed} similar suppressed]' if suppressed else text
+
+
+class _Listener(logging.handlers.QueueListener):
+    """Queue listener whose stop gives up on a writer that is stuck"""
+
+    def enqueue_sentinel(self):
+        try:
+            self.queue.put(self._sentinel, timeout=5)
+        except queue.Full:
+            pass
+
+    def stop(self):
+        if self._thread is not None:
+            self.enqueue_sentinel()
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """
+    Non-blocking queue handler with a per-process writer thread
+
+    Threads do not survive fork, so a process that inherited this handler
+    (a gunicorn worker of a preloaded app) starts its own listener on its
+    first record.
+    """
+
+    def __init__(self, target: logging.Handler, max_size: int = 10000):
+        """
+        Initialize queue handler
+
+        Args:
+            target: Handler that writes records (runs on the listener thread)
+            max_size: Queued records before new ones are dropped
+        """
+        super().__init__(queue.Queue(max_size))
+        self.target = target
+        self.max_size = max_size
+        self.listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.max_size)
+            self.listener = _Listener(self.queue, self.target, respect_handler_level=True)
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # The queue never leaves this process, so the record is passed as
+        # is and message formatting happens on the listener thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def flush(self):
+        """Wait until queued records are written"""
+        if self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + 5
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.target.flush()
+
+    def close(self):
+        if self._pid == os.getpid() and self.listener is not None:
+            self.listener.stop()
+            self._pid = None
+        super().close()
+
+
+def configure_logging(level: str = 'INFO', json_format: bool = False, queue_size: int = 10000,
+                      sample_burst: int = 10, sample_window: float = 60.0,
+                      fmt: Optional[str] = None, stream=None) -> QueueLogHandler:
+    """
+    Route root logging through the queued pipeline
+
+    Replaces handlers installed by an earlier call, so app factories may
+    call it repeatedly.
+
+    Args:
+        level: Root log level
+        json_format: Write JSON lines instead of fmt text
+        queue_size: Records buffered before dropping
+        sample_burst: Records per repeated message and window (0 disables sampling)
+        sample_window: Sampling window in seconds
+        fmt: Text format (Config.LOG_FORMAT)
+        stream: Output stream (default sys.stderr)
+
+    Returns:
+        Installed QueueLogHandler
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueLogHandler):
+            root.removeHandler(handler)
+            handler.close()
+        elif type(handler) is logging.StreamHandler:
+            # basicConfig's synchronous handler
+            root.removeHandler(handler)
+
+    target = logging.StreamHandler(stream or sys.stderr)
+    if json_format:
+        target.setFormatter(JsonFormatter())
+    else:
+        target.setFormatter(TextFormatter(fmt or '%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    handler = QueueLogHandler(target, max_size=queue_size)
+    # Both filters run on the calling thread, before the record is queued
+    handler.addFilter(SamplingFilter(sample_burst, sample_window))
+    handler.addFilter(RequestIdFilter())
+    root.addHandler(handler)
+    root.setLevel(level)
+    return handler
+
+
+def get_stats() -> Dict:
+    """Get pipeline counters for this process"""
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueLogHandler):
+            sampling = next(f for f in handler.filters if isinstance(f, SamplingFilter))
+            return {
+                'queued': handler.queue.qsize(),
+                'dropped': handler.dropped,
+                'suppressed': sampling.suppressed
+            }
+    return {'enabled': False}
+
+
+def init_app(app):
+    """Assign each request an ID, exposed to logs and echoed in the response"""
+
+    @app.before_request
+    def assign_request_id():
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        # Accept a caller's ID only if it is short and printable
+        g.request_id = incoming if 0 < len(incoming) <= 128 and incoming.isprintable() else uuid.uuid4().hex
+
+    @app.after_request
+    def echo_request_id(response):
+        request_id = g.get('request_id')
+        if request_id is not None:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
+
+
+@atexit.register
+def _flush_on_exit():
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueLogHandler):
+            handler.close()
@@ -0,0 +1,143 @@
+"""
+Metrics Service
+Prometheus request, stage and batch-size metrics
+
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py does) so
+each worker writes its samples to a shared directory and /metrics
+aggregates all workers, instead of reporting whichever worker answered
+the scrape.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 100, 250, 500, 1000)
+
+REQUEST_LATENCY = Histogram(
+    'sentiment_request_duration_seconds',
+    'Request latency by route',
+    ['method', 'route'],
+    buckets=LATENCY_BUCKETS
+)
+REQUESTS_TOTAL = Counter(
+    'sentiment_requests_total',
+    'Requests by route and status code',
+    ['method', 'route', 'status']
+)
+STAGE_LATENCY = Histogram(
+    'sentiment_request_stage_duration_seconds',
+    'Time spent in each request stage (auth, validation, inference, serialization)',
+    ['route', 'stage'],
+    buckets=STAGE_BUCKETS
+)
+BATCH_SIZE = Histogram(
+    'sentiment_batch_size',
+    'Number of texts per scoring call',
+    ['source'],
+    buckets=BATCH_SIZE_BUCKETS
+)
+COALESCED = Counter(
+    'sentiment_coalesced_predictions_total',
+    'Texts answered with the result of another scoring call (in_flight or batch duplicate)',
+    ['source']
+)
+
+
+def _route_label() -> str:
+    """Route template of the current request (bounded label cardinality)"""
+    if not has_request_context():
+        return 'none'
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+@contextmanager
+def observe_stage(stage: str):
+    """Time a block of the current request as a named stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(_route_label(), stage).observe(time.perf_counter() - started)
+
+
+def timed_iter(stage: str, iterator):
+    """
+    Time the production of a streamed body as one stage observation
+
+    Only time spent producing items is counted, not time the server
+    spends writing them to the client. Must run inside the request
+    context (wrap the response generator with stream_with_context).
+    """
+    elapsed = 0.0
+    iterator = iter(iterator)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            break
+        finally:
+            elapsed += time.perf_counter() - started
+        yield item
+    STAGE_LATENCY.labels(_route_label(), stage).observe(elapsed)
+
+
+def observe_batch_size(source: str, size: int):
+    """Record the size of a scoring call"""
+    BATCH_SIZE.labels(source).observe(size)
+
+
+def observe_coalesced(source: str, count: int):
+    """Record texts that reused another call's result"""
+    if count:
+        COALESCED.labels(source).inc(count)
+
+
+def render_metrics() -> Response:
+    """Render all metrics in the Prometheus text format"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    """Register request timing hooks and the /metrics endpoint"""
+    # Record response encoding by the configured JSON provider as the
+    # serialization stage
+    encode_response = app.json.response
+
+    def timed_response(*args, **kwargs):
+        with observe_stage('serialization'):
+            return encode_response(*args, **kwargs)
+
+    app.json.response = timed_response
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            route = _route_label()
+            REQUEST_LATENCY.labels(request.method, route).observe(time.perf_counter() - started)
+            REQUESTS_TOTAL.labels(request.method, route, str(response.status_code)).inc()
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus scrape endpoint"""
+        return render_metrics()
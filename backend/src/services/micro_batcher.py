@@ -0,0 +1,151 @@
+"""
+Micro-Batching Scheduler
+Groups concurrent single-text predictions into predict_batch calls
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Collects concurrent single-text requests and flushes them as one batch
+
+    Callers block on their own future while a background thread drains
+    the queue. A batch is flushed as soon as it holds max_batch_size
+    items or max_wait_ms has passed since its first item arrived, so a
+    lone request waits at most max_wait_ms.
+    """
+
+    def __init__(self, predict_batch: Callable[[List[str]], List[Dict]],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 result_timeout: float = 30.0):
+        """
+        Initialize micro-batcher
+
+        Args:
+            predict_batch: Function scoring a list of texts
+            max_batch_size: Flush once this many requests are queued
+            max_wait_ms: Flush once the oldest queued request waited this long
+            result_timeout: Seconds a caller waits for its result
+        """
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.result_timeout = result_timeout
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+
+        # Statistics
+        self.batches = 0
+        self.items = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.batch_size_counts: Dict[int, int] = {}
+
+    def _ensure_started(self):
+        """Start the flush thread in the current process"""
+        # Threads do not survive fork, so a preloaded app starts its own
+        # flusher in each worker on first use
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a text for the next batch
+
+        Args:
+            text: Input text
+
+        Returns:
+            Future resolving to the prediction result
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return future
+
+    def predict(self, text: str) -> Dict:
+        """Predict a single text through the batch queue"""
+        return self.submit(text).result(timeout=self.result_timeout)
+
+    def _collect(self) -> list:
+        """Block for the first item, then gather more until size or time limit"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        # Take whatever else is already waiting without extending the deadline
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Flush loop"""
+        while True:
+            batch = self._collect()
+            texts = [text for text, _, _ in batch]
+            started = time.perf_counter()
+
+            # Record before resolving so callers see their batch counted
+            size = len(batch)
+            self.batches += 1
+            self.items += size
+            self.total_wait += sum(started - queued_at for _, _, queued_at in batch)
+            self.batch_size_counts[size] = self.batch_size_counts.get(size, 0) + 1
+
+            try:
+                results = self.predict_batch(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+
+    def get_stats(self) -> Dict:
+        """Get queue and batch size statistics"""
+        return {
+            'enabled': True,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue_depth': self.max_queue_depth,
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'avg_queue_wait_ms': round(self.total_wait / self.items * 1000.0, 3) if self.items else 0.0,
+            'batch_sizes': dict(sorted(self.batch_size_counts.items()))
+        }
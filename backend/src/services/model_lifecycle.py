@@ -0,0 +1,352 @@
+"""
+Model Lifecycle
+Staged model startup: load, warm up, then report ready
+
+The app starts answering /health immediately while the model loads in a
+background thread. A warmup corpus is then run through the scoring path
+so lazy imports, memory-mapped weights and executor pools are paid for
+before traffic arrives. /ready returns 200 only once warmup finished.
+
+With a model registry, later versions are hot-swapped the same way:
+loaded and warmed up next to the serving model, then installed with a
+single reference swap. Requests in flight keep the analyzer they started
+with, and the old version is unloaded once the last of them finishes.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from models.model_registry import ModelRegistry
+from services.prediction_service import PredictionService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WARMUP_TEXTS = [
+    "This product is great, I am very happy with it!",
+    "Terrible service, the delivery was awful and I am sad.",
+    "It was okay, nothing special.",
+    "Excellent quality and good value, would buy again.",
+    "Bad experience overall, not good at all.",
+    "The package arrived on Tuesday."
+]
+
+PENDING = 'pending'
+LOADING = 'loading'
+WARMING = 'warming'
+READY = 'ready'
+FAILED = 'failed'
+
+
+def load_warmup_corpus(path: Optional[str]) -> List[str]:
+    """
+    Read warmup texts, one per line
+
+    Args:
+        path: Corpus file, or None for the built-in texts
+
+    Returns:
+        Non-empty lines of the file, or DEFAULT_WARMUP_TEXTS
+    """
+    if not path:
+        return list(DEFAULT_WARMUP_TEXTS)
+
+    try:
+        with open(path, encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+    except OSError as e:
+        logger.warning("Cannot read warmup corpus %s (%s), using built-in texts", path, e)
+        return list(DEFAULT_WARMUP_TEXTS)
+
+    return texts or list(DEFAULT_WARMUP_TEXTS)
+
+
+class ModelLifecycle:
+    """
+    Loads the model into a PredictionService and tracks readiness
+
+    States move from pending through loading and warming to ready, or
+    to failed if loading or warmup raises.
+    """
+
+    def __init__(self, prediction_service: PredictionService, load_model: Callable,
+                 warmup_texts: Optional[List[str]] = None, warmup_batch_size: int = 100,
+                 on_loaded: Optional[Callable] = None, import_seconds: Optional[float] = None,
+                 registry: Optional[ModelRegistry] = None, load_version: Optional[Callable] = None,
+                 watch_interval: float = 0.0):
+        """
+        Initialize model lifecycle
+
+        Args:
+            prediction_service: Service that receives the loaded analyzer
+            load_model: Function returning the analyzer to serve
+            warmup_texts: Texts scored before reporting ready (None scores
+                a single built-in text)
+            warmup_batch_size: Texts per warmup predict_batch call
+            on_loaded: Called with the analyzer once it is loaded
+            import_seconds: Application import time, reported with the timings
+            registry: Model registry that versions are swapped in from
+            load_version: Function loading a registry version (defaults to
+                registry.load)
+            watch_interval: Seconds between checks of the registry's
+                CURRENT pointer (0 disables the watcher)
+        """
+        self.prediction_service = prediction_service
+        self.load_model = load_model
+        self.warmup_texts = warmup_texts
+        self.warmup_batch_size = warmup_batch_size
+        self.on_loaded = on_loaded
+        self.registry = registry
+        self.load_version = load_version or (registry.load if registry is not None else None)
+        self.watch_interval = watch_interval
+
+        self.state = PENDING
+        self.error: Optional[str] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._watcher_pid = None
+        self._stopped = threading.Event()
+        self._swap_lock = threading.Lock()
+        # Versions whose swap failed; the watcher does not retry them
+        self._failed_versions = set()
+
+        # Hot-swap state
+        self.swap_state = 'idle'
+        self.swap_target: Optional[str] = None
+        self.swap_error: Optional[str] = None
+        self.swaps = 0
+        self.last_swap_seconds: Optional[float] = None
+
+        # Timings in seconds
+        self.created = time.perf_counter()
+        self.import_seconds = import_seconds
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.time_to_first_prediction: Optional[float] = None
+        self.warmup_items = 0
+
+    def start(self, background: bool = True):
+        """
+        Load and warm up the model
+
+        Args:
+            background: Run in a daemon thread instead of blocking
+        """
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.state = LOADING
+            if background:
+                self._thread = threading.Thread(target=self._run, name='model-loader', daemon=True)
+                self._thread.start()
+                self._start_watcher()
+                return
+        self._run()
+        self._start_watcher()
+
+    def ensure_started(self):
+        """Restart background threads in a forked child"""
+        # Threads do not survive fork: a worker forked mid-load would
+        # otherwise never become ready, and would never watch the registry
+        if self._watcher_pid != os.getpid():
+            self._start_watcher()
+        if self._pid == os.getpid() or self._ready.is_set():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.state = LOADING
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='model-loader', daemon=True)
+            self._thread.start()
+
+    def _start_watcher(self):
+        """Start the registry watcher in the current process"""
+        if self.registry is None or self.watch_interval <= 0:
+            return
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            threading.Thread(target=self._watch, name='model-watcher', daemon=True).start()
+
+    def _watch(self):
+        """Swap to the registry's CURRENT version whenever it changes"""
+        while not self._stopped.wait(self.watch_interval):
+            if not self._ready.is_set():
+                continue
+            try:
+                target = self.registry.current_version()
+                if target and target != self.prediction_service.model_version \
+                        and target not in self._failed_versions:
+                    self._swap(target)
+            except Exception:
+                logger.exception("Model registry watcher failed")
+
+    def stop(self):
+        """Stop watching the registry"""
+        self._stopped.set()
+
+    def activate(self, version: Optional[str] = None, background: bool = True) -> bool:
+        """
+        Hot-swap to a registry version
+
+        Loads and warms up the version in this process, then points the
+        registry's CURRENT at it, so other server processes follow through
+        their watchers. CURRENT is only moved once the version is known to
+        load and predict; a failed swap leaves it and the serving model
+        unchanged.
+
+        Args:
+            version: Version to serve (defaults to the latest published)
+            background: Load and warm up in a thread instead of blocking
+
+        Returns:
+            False if another swap is already in progress
+
+        Raises:
+            ValueError: No registry is configured or the version is unknown
+        """
+        if self.registry is None:
+            raise ValueError("No model registry configured")
+        version = version or self.registry.latest_version()
+        if version is None or version not in self.registry.list_versions():
+            raise ValueError(f"Model version {version} is not in the registry")
+        # Held from here until the swap ends, so a concurrent activation
+        # is refused instead of moving CURRENT under this one
+        if not self._swap_lock.acquire(blocking=False):
+            return False
+
+        # An explicit activation retries a version that failed before
+        self._failed_versions.discard(version)
+        if not background:
+            self._swap_locked(version, publish=True)
+            return True
+        try:
+            threading.Thread(target=self._swap_locked, args=(version, True), name='model-swap', daemon=True).start()
+        except Exception:
+            self._swap_lock.release()
+            raise
+        return True
+
+    def _swap(self, version: str):
+        """Swap to a version unless another swap is running (watcher)"""
+        if self._swap_lock.acquire(blocking=False):
+            self._swap_locked(version)
+
+    def _swap_locked(self, version: str, publish: bool = False):
+        """
+        Load, warm up and install a registry version (releases _swap_lock)
+
+        Args:
+            version: Version to serve
+            publish: Point the registry's CURRENT at the version once it
+                has loaded and warmed up
+        """
+        try:
+            if version == self.prediction_service.model_version:
+                if publish:
+                    self.registry.set_current(version)
+                return
+
+            self.swap_target = version
+            self.swap_error = None
+            self.swap_state = LOADING
+            started = time.perf_counter()
+            candidate = self.load_version(version)
+
+            # Warm the new model while the old one keeps serving
+            self.swap_state = WARMING
+            self.prediction_service.warmup(
+                self.warmup_texts or DEFAULT_WARMUP_TEXTS[:1], self.warmup_batch_size, analyzer=candidate
+            )
+
+            if publish:
+                self.registry.set_current(version)
+            previous = self.prediction_service.model_version
+            # Bookkeeping first: whoever sees the new version being served
+            # also sees the swap counted and the app pointing at it
+            if self.on_loaded is not None:
+                self.on_loaded(candidate)
+            self.swaps += 1
+            self.last_swap_seconds = time.perf_counter() - started
+            self.swap_state = 'idle'
+            self.prediction_service.set_analyzer(candidate)
+            logger.info("Swapped model %s -> %s in %.3fs", previous, version, self.last_swap_seconds)
+        except Exception as e:
+            self.swap_state = FAILED
+            self.swap_error = str(e)
+            self._failed_versions.add(version)
+            logger.exception("Model swap to %s failed; still serving %s", version,
+                             self.prediction_service.model_version)
+        finally:
+            self._swap_lock.release()
+
+    def _run(self):
+        try:
+            started = time.perf_counter()
+            analyzer = self.load_model()
+            self.prediction_service.set_analyzer(analyzer)
+            if self.on_loaded is not None:
+                self.on_loaded(analyzer)
+            self.load_seconds = time.perf_counter() - started
+            logger.info("Model %s v%s loaded in %.3fs", analyzer.model_name, analyzer.version, self.load_seconds)
+
+            self.state = WARMING
+            started = time.perf_counter()
+            # Without a warmup corpus, one text still confirms the model predicts
+            texts = self.warmup_texts or DEFAULT_WARMUP_TEXTS[:1]
+            self.warmup_items = self.prediction_service.warmup(texts, self.warmup_batch_size)
+            self.warmup_seconds = time.perf_counter() - started
+            self.time_to_first_prediction = time.perf_counter() - self.created
+
+            self.state = READY
+            self._ready.set()
+            logger.info(
+                "Model ready: import %s, load %.3fs, warmup %.3fs (%d texts), first prediction %.3fs after startup",
+                f"{self.import_seconds:.3f}s" if self.import_seconds is not None else 'n/a',
+                self.load_seconds, self.warmup_seconds, self.warmup_items, self.time_to_first_prediction
+            )
+        except Exception as e:
+            self.state = FAILED
+            self.error = str(e)
+            logger.exception("Model startup failed")
+
+    def is_ready(self) -> bool:
+        """Whether the model is loaded and warmed up"""
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until ready; returns False on timeout"""
+        return self._ready.wait(timeout)
+
+    def get_status(self) -> Dict:
+        """Get state and startup timings"""
+        def rounded(value):
+            return round(value, 4) if value is not None else None
+
+        status = {
+            'status': self.state,
+            'version': self.prediction_service.model_version,
+            'import_seconds': rounded(self.import_seconds),
+            'load_seconds': rounded(self.load_seconds),
+            'warmup_seconds': rounded(self.warmup_seconds),
+            'warmup_items': self.warmup_items,
+            'time_to_first_prediction_seconds': rounded(self.time_to_first_prediction)
+        }
+        if self.error is not None:
+            status['error'] = self.error
+        if self.registry is not None:
+            status['swap'] = {
+                'state': self.swap_state,
+                'target': self.swap_target,
+                'error': self.swap_error,
+                'swaps': self.swaps,
+                'last_swap_seconds': rounded(self.last_swap_seconds)
+            }
+        return status
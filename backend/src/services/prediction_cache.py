@@ -0,0 +1,200 @@
+"""
+Prediction Cache
+Bounded LRU/TTL cache of sentiment predictions keyed by normalized text
+"""
+
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from utils.validators import normalize_text
+
+# Approximate bookkeeping cost of one entry (key, OrderedDict node, tuple)
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def _estimate_size(value) -> int:
+    """Approximate memory used by a cached result"""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            sys.getsizeof(k) + _estimate_size(v) for k, v in value.items()
+        )
+    return sys.getsizeof(value)
+
+
+class PredictionCache:
+    """
+    Prediction cache with a fixed memory budget
+
+    Entries are keyed by a digest of the normalized text and evicted in
+    least-recently-used order once either the entry or byte budget is
+    exceeded. The input text is not stored; results are returned with
+    the caller's text. The cache empties itself when the model version
+    it is asked about changes.
+    """
+
+    def __init__(self, max_entries: int = 50000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: Optional[float] = None):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Maximum number of cached predictions
+            max_bytes: Approximate memory budget for cached predictions
+            ttl_seconds: Entry lifetime, or None to keep entries until evicted
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds or None
+
+        self._entries: 'OrderedDict[bytes, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._model_version = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(text: str, normalized: bool = False) -> bytes:
+        """
+        Digest of the normalized text
+
+        Args:
+            text: Input text
+            normalized: Text is already normalized (skip normalize_text)
+        """
+        if not normalized:
+            text = normalize_text(text)
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+    def _check_version(self, model_version: str):
+        """Drop every entry when the model version changes (lock held)"""
+        if model_version != self._model_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._model_version = model_version
+
+    def get_many(self, texts: List[str], model_version: str,
+                 keys: Optional[List[bytes]] = None) -> List[Optional[Dict]]:
+        """
+        Look up a batch of texts
+
+        Args:
+            texts: Input texts
+            model_version: Version of the model that would serve the misses
+            keys: Precomputed make_key digests aligned with texts
+
+        Returns:
+            List aligned with texts holding a result or None for each miss
+        """
+        if keys is None:
+            keys = [self.make_key(text) for text in texts]
+        now = time.monotonic()
+        results = []
+
+        with self._lock:
+            self._check_version(model_version)
+            entries = self._entries
+
+            for text, key in zip(texts, keys):
+                entry = entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+
+                result, size, expires_at = entry
+                if expires_at is not None and expires_at <= now:
+                    del entries[key]
+                    self._bytes -= size
+                    self.expirations += 1
+                    self.misses += 1
+                    results.append(None)
+                    continue
+
+                entries.move_to_end(key)
+                self.hits += 1
+                results.append(dict(result, text=text))
+
+        return results
+
+    def put_many(self, texts: List[str], results: List[Dict], model_version: str,
+                 keys: Optional[List[bytes]] = None):
+        """
+        Store predictions for a batch of texts
+
+        Args:
+            texts: Input texts
+            results: Predictions aligned with texts
+            model_version: Version of the model that produced the results
+            keys: Precomputed make_key digests aligned with texts
+        """
+        if keys is None:
+            keys = [self.make_key(text) for text in texts]
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        items = []
+        for key, result in zip(keys, results):
+            result = {k: v for k, v in result.items() if k != 'text'}
+            items.append((key, result, _estimate_size(result) + ENTRY_OVERHEAD_BYTES))
+
+        with self._lock:
+            # Results from another version than the one lookups switched the
+            # cache to (requests in flight during a model swap) are not stored
+            if self._model_version is not None and model_version != self._model_version:
+                return
+            self._check_version(model_version)
+            entries = self._entries
+
+            for key, result, size in items:
+                previous = entries.pop(key, None)
+                if previous is not None:
+                    self._bytes -= previous[1]
+                entries[key] = (result, size, expires_at)
+                self._bytes += size
+
+            while entries and (len(entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, size, _) = entries.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+
+    def get(self, text: str, model_version: str) -> Optional[Dict]:
+        """Look up a single text"""
+        return self.get_many([text], model_version)[0]
+
+    def put(self, text: str, result: Dict, model_version: str):
+        """Store a single prediction"""
+        self.put_many([text], [result], model_version)
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict:
+        """Get cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'model_version': self._model_version
+            }
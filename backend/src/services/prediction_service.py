@@ -0,0 +1,291 @@
+"""
+Prediction Service
+Serves sentiment predictions for the API through the prediction cache
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+from services.inference_executor import InferenceExecutor
+from services.metrics import observe_batch_size, observe_coalesced
+from services.micro_batcher import MicroBatcher
+from services.prediction_cache import PredictionCache
+from services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+class ModelNotReadyError(RuntimeError):
+    """Raised when a prediction is requested before a model is loaded"""
+
+class PredictionService:
+    """
+    Front end for the sentiment analyzer used by the API routes
+
+    Looks predictions up in the cache first and sends only the misses
+    to the analyzer. Duplicate texts within a batch are scored once, and
+    with single-flight enabled a miss that another request is already
+    scoring waits for that result instead of being scored again. When
+    micro-batching is enabled, single-text misses from concurrent
+    requests are grouped into one predict_batch call.
+    """
+
+    def __init__(self, analyzer, cache: Optional[PredictionCache] = None,
+                 micro_batching: Optional[Dict] = None, executor: Optional[InferenceExecutor] = None,
+                 single_flight: Optional[SingleFlight] = None):
+        """
+        Initialize prediction service
+
+        Args:
+            analyzer: SentimentAnalyzer serving the predictions, or None
+                until set_analyzer is called
+            cache: Prediction cache, or None to disable caching
+            micro_batching: MicroBatcher options (max_batch_size, max_wait_ms),
+                or None to score single texts inline
+            executor: InferenceExecutor running batch scoring, or None to
+                call the analyzer directly
+            single_flight: SingleFlight coalescing identical in-flight
+                misses, or None to score every miss
+        """
+        self.analyzer = analyzer
+        self.cache = cache
+        self.executor = executor
+        self.single_flight = single_flight
+        self.batch_duplicates = 0
+        self.batcher = None
+        if micro_batching is not None:
+            self.batcher = MicroBatcher(self._predict_uncached_batch, **micro_batching)
+
+    def is_loaded(self) -> bool:
+        """Whether an analyzer is available to serve predictions"""
+        return self.analyzer is not None
+
+    def set_analyzer(self, analyzer):
+        """
+        Serve predictions from a newly loaded analyzer
+
+        Args:
+            analyzer: SentimentAnalyzer to serve
+        """
+        if self.executor is not None:
+            self.executor.set_analyzer(analyzer)
+        self.analyzer = analyzer
+
+    def _require_analyzer(self):
+        """Current analyzer, or ModelNotReadyError while none is loaded"""
+        analyzer = self.analyzer
+        if analyzer is None:
+            raise ModelNotReadyError("Model is not loaded yet")
+        return analyzer
+
+    def warmup(self, texts: List[str], batch_size: int = 100, analyzer=None) -> int:
+        """
+        Run texts through the scoring path without touching the cache
+
+        Exercises lazy imports, memory-mapped weights and executor pools
+        so the first real request does not pay for them.
+
+        Args:
+            texts: Warmup corpus
+            batch_size: Texts per predict_batch call
+            analyzer: Analyzer to warm up instead of the serving one (a
+                model about to be swapped in)
+
+        Returns:
+            Number of texts scored
+        """
+        analyzer = analyzer or self._require_analyzer()
+        batch_size = max(1, min(batch_size, analyzer.max_batch_size))
+        texts = [text for text in texts if isinstance(text, str) and text.strip()]
+
+        for start in range(0, len(texts), batch_size):
+            self._score_batch(texts[start:start + batch_size], analyzer=analyzer)
+        if texts:
+            analyzer.predict(texts[0])
+        return len(texts)
+
+    def _score_batch(self, texts: List[str], validate: bool = True, analyzer=None) -> List[Dict]:
+        """
+        Score a batch on the inference executor when one is configured
+
+        A request passes the analyzer it started with, so a request in
+        flight during a model swap finishes on the old model.
+        """
+        analyzer = analyzer or self._require_analyzer()
+        if self.executor is not None:
+            return self.executor.predict_batch(texts, validate=validate, analyzer=analyzer)
+        return analyzer.predict_batch(texts, validate=validate)
+
+    def _predict_uncached_batch(self, texts: List[str]) -> List[Dict]:
+        """Score a micro-batch with the current analyzer"""
+        observe_batch_size('micro_batch', len(texts))
+        return self._score_batch(texts)
+
+    def _predict_uncached(self, text: str, analyzer) -> Dict:
+        """Score a single text, through the micro-batcher when enabled"""
+        if self.batcher is not None:
+            return self.batcher.predict(text)
+        return analyzer.predict(text)
+
+    def predict(self, text: str, normalized: bool = False) -> Dict:
+        """
+        Predict sentiment for a single text
+
+        Args:
+            text: Input text
+            normalized: Text was already normalized by the validators
+
+        Returns:
+            Prediction result
+        """
+        analyzer = self._require_analyzer()
+        if not isinstance(text, str) or not text:
+            return analyzer.predict(text)
+
+        if self.cache is None and self.single_flight is None:
+            return self._predict_uncached(text, analyzer)
+
+        version = analyzer.version
+        key = PredictionCache.make_key(text, normalized)
+        if self.cache is not None:
+            result = self.cache.get_many([text], version, keys=[key])[0]
+            if result is not None:
+                return result
+
+        def compute():
+            result = self._predict_uncached(text, analyzer)
+            if self.cache is not None:
+                # A micro-batch may be flushed by a newer model than this request saw
+                self.cache.put_many([text], [result], result.get('model_version', version), keys=[key])
+            return result
+
+        if self.single_flight is None:
+            return compute()
+        led, followed = self.single_flight.join([(version, key)])
+        if led:
+            return self._lead([(version, key)], compute)[0]
+        observe_coalesced('in_flight', 1)
+        return dict(self.single_flight.wait(followed[0][1]), text=text)
+
+    def _lead(self, flight_keys: List, compute):
+        """Run compute for claimed single-flight keys and publish its results"""
+        try:
+            results = compute()
+        except BaseException as e:
+            self.single_flight.fail(flight_keys, e)
+            raise
+        results = results if isinstance(results, list) else [results]
+        self.single_flight.resolve(flight_keys, results)
+        return results
+
+    def predict_batch(self, texts: List[str], normalized: bool = False) -> List[Dict]:
+        """
+        Predict sentiment for a batch of texts
+
+        Identical texts (after normalization) are scored once and their
+        result is copied to every position. The batch is looked up in the
+        cache at once; only the misses reach the analyzer, in a single
+        predict_batch call.
+
+        Args:
+            texts: Input texts
+            normalized: Texts come from utils.validators.validate_batch, so
+                they are known valid and normalized and are passed to the
+                model without being checked again
+
+        Returns:
+            Prediction results in input order
+        """
+        analyzer = self._require_analyzer()
+        if normalized:
+            if not texts:
+                return []
+        elif not isinstance(texts, list) or len(texts) > analyzer.max_batch_size or \
+                not all(isinstance(text, str) and text for text in texts):
+            # The analyzer reports what is wrong with the batch
+            return self._score_batch(texts, analyzer=analyzer)
+
+        # Keys are computed once and reused for deduplication, the cache
+        # and single-flight
+        slots, unique_positions, unique_keys = [], [], []
+        first_slot = {}
+        for position, text in enumerate(texts):
+            key = PredictionCache.make_key(text, normalized)
+            slot = first_slot.get(key)
+            if slot is None:
+                slot = first_slot[key] = len(unique_positions)
+                unique_positions.append(position)
+                unique_keys.append(key)
+            slots.append(slot)
+
+        duplicates = len(texts) - len(unique_positions)
+        if not duplicates:
+            return self._predict_unique(texts, unique_keys, normalized, analyzer)
+
+        self.batch_duplicates += duplicates
+        observe_coalesced('batch', duplicates)
+        unique_results = self._predict_unique([texts[i] for i in unique_positions], unique_keys,
+                                              normalized, analyzer)
+        return [
+            unique_results[slot] if unique_positions[slot] == position
+            else dict(unique_results[slot], text=texts[position])
+            for position, slot in enumerate(slots)
+        ]
+
+    def _predict_unique(self, texts: List[str], keys: List[bytes], normalized: bool, analyzer) -> List[Dict]:
+        """Score distinct texts through the cache and single-flight"""
+        version = analyzer.version
+        if self.cache is not None:
+            results = self.cache.get_many(texts, version, keys=keys)
+        else:
+            results = [None] * len(texts)
+        miss_positions = [i for i, result in enumerate(results) if result is None]
+        if not miss_positions:
+            return results
+
+        def score(positions):
+            miss_texts = [texts[i] for i in positions]
+            miss_results = self._score_batch(miss_texts, validate=not normalized, analyzer=analyzer)
+            if self.cache is not None:
+                self.cache.put_many(miss_texts, miss_results, version, keys=[keys[i] for i in positions])
+            return miss_results
+
+        if self.single_flight is None:
+            led, followed = miss_positions, []
+            led_results = score(led)
+        else:
+            flight_keys = [(version, keys[i]) for i in miss_positions]
+            claimed, followed = self.single_flight.join(flight_keys)
+            led = [miss_positions[j] for j in claimed]
+            followed = [(miss_positions[j], future) for j, future in followed]
+            # Our own misses are published before waiting on anyone else's,
+            # so two batches leading each other's texts cannot deadlock
+            led_results = self._lead([flight_keys[j] for j in claimed], lambda: score(led)) if led else []
+            observe_coalesced('in_flight', len(followed))
+
+        for position, result in zip(led, led_results):
+            results[position] = result
+        for position, future in followed:
+            results[position] = dict(self.single_flight.wait(future), text=texts[position])
+        return results
+
+    def get_model_info(self) -> Dict:
+        """Get information about the serving model"""
+        return self._require_analyzer().get_model_info()
+
+    @property
+    def model_version(self) -> Optional[str]:
+        """Version of the model currently serving new requests"""
+        analyzer = self.analyzer
+        return analyzer.version if analyzer is not None else None
+
+    def get_stats(self) -> Dict:
+        """Get prediction statistics"""
+        return {
+            'cache': self.cache.get_stats() if self.cache is not None else {'enabled': False},
+            'micro_batching': self.batcher.get_stats() if self.batcher is not None else {'enabled': False},
+            'executor': self.executor.get_stats() if self.executor is not None else {'backend': 'inline'},
+            'single_flight': dict(
+                self.single_flight.get_stats() if self.single_flight is not None else {'enabled': False},
+                batch_duplicates=self.batch_duplicates
+            )
+        }
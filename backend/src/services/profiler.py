@@ -0,0 +1,268 @@
+"""
+Request Profiler
+Opt-in cProfile capture of individual requests
+
+One in PROFILE_SAMPLE_RATE requests, and any request an admin sends with
+an "X-Profile: 1" header, runs under cProfile while the app handles it
+and while each chunk of the response body is produced (streamed bodies
+included), on whichever thread does that work. Each
+capture is written as a .prof file (readable with pstats or snakeviz)
+plus a .json sidecar recording the route, status, model version and
+duration. The directory is a ring: the oldest captures are deleted once
+PROFILE_MAX_FILES is exceeded. Requests that are not profiled only pay
+for a header lookup and a counter increment.
+"""
+
+import cProfile
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+ENVIRON_KEY = 'sentiment.profile'
+NAME_PATTERN = re.compile(r'^[0-9]+-[0-9]+-[0-9]+$')
+
+
+class RequestProfiler:
+    """
+    WSGI middleware profiling sampled or admin-requested requests
+    """
+
+    def __init__(self, app, directory: str, sample_rate: int = 0, max_files: int = 50,
+                 allow_header: bool = True):
+        """
+        Initialize request profiler
+
+        Args:
+            app: Flask app (auth_service verifies X-Profile requests)
+            directory: Where profiles are written
+            sample_rate: Profile one in this many requests (0 disables sampling)
+            max_files: Number of profiles kept
+            allow_header: Profile requests from admins sending X-Profile: 1
+        """
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_files = max(1, max_files)
+        self.allow_header = allow_header
+        self._counter = itertools.count(1)
+        self._sequence = itertools.count(1)
+        # cProfile can only run one profile at a time in a process on
+        # newer Pythons; concurrent candidates are skipped
+        self._active = threading.Lock()
+
+        # Statistics
+        self.profiled = 0
+        self.skipped = 0
+
+    def _requested_by_admin(self, environ) -> bool:
+        authorization = environ.get('HTTP_AUTHORIZATION', '')
+        if not authorization.startswith('Bearer '):
+            return False
+        payload = self.app.auth_service.verify_token(authorization[len('Bearer '):])
+        return bool(payload) and payload.get('role') == 'admin'
+
+    def _reason(self, environ) -> Optional[str]:
+        """Why this request should be profiled, or None"""
+        if self.allow_header and environ.get(PROFILE_HEADER) == '1' and self._requested_by_admin(environ):
+            return 'requested'
+        if self.sample_rate and next(self._counter) % self.sample_rate == 0:
+            return 'sampled'
+        return None
+
+    def __call__(self, environ, start_response):
+        reason = self._reason(environ) if self.sample_rate or PROFILE_HEADER in environ else None
+        if reason is None:
+            return self.wsgi_app(environ, start_response)
+
+        if not self._active.acquire(blocking=False):
+            self.skipped += 1
+            return self.wsgi_app(environ, start_response)
+
+        name = f'{int(time.time() * 1000)}-{os.getpid()}-{next(self._sequence)}'
+        capture = {'name': name, 'reason': reason, 'status': None}
+        environ[ENVIRON_KEY] = capture
+
+        def profiled_start_response(status, headers, exc_info=None):
+            capture['status'] = int(status.split(' ', 1)[0])
+            headers = list(headers) + [('X-Profile-Id', name)]
+            return start_response(status, headers, exc_info)
+
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            # Fails if another profiler (e.g. a debugger) owns this thread
+            profile.enable()
+        except (RuntimeError, ValueError):
+            self._active.release()
+            self.skipped += 1
+            environ.pop(ENVIRON_KEY)
+            return self.wsgi_app(environ, start_response)
+        try:
+            body = self.wsgi_app(environ, profiled_start_response)
+        except BaseException:
+            self._active.release()
+            raise
+        finally:
+            # The profile hook is per thread and the body may be iterated
+            # on another one (asgi.py); each body step is profiled on the
+            # thread that runs it
+            profile.disable()
+        return _ProfiledBody(self, body, profile, capture, environ, started)
+
+    def _save(self, profile: cProfile.Profile, capture: Dict):
+        """Write a capture and trim the ring"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            base = os.path.join(self.directory, capture['name'])
+            profile.dump_stats(base + '.prof.tmp')
+            os.replace(base + '.prof.tmp', base + '.prof')
+            with open(base + '.json.tmp', 'w', encoding='utf-8') as f:
+                json.dump(capture, f)
+            os.replace(base + '.json.tmp', base + '.json')
+            self.profiled += 1
+            self._trim()
+        except OSError as e:
+            logger.warning("Could not save request profile: %s", e)
+
+    def _names(self) -> List[str]:
+        """Saved profile names, oldest first"""
+        try:
+            entries = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        names = [entry[:-len('.json')] for entry in entries
+                 if entry.endswith('.json') and NAME_PATTERN.match(entry[:-len('.json')])]
+        return sorted(names, key=lambda name: tuple(int(part) for part in name.split('-')))
+
+    def _trim(self):
+        names = self._names()
+        for name in names[:max(0, len(names) - self.max_files)]:
+            for suffix in ('.prof', '.json'):
+                try:
+                    os.remove(os.path.join(self.directory, name + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def list_profiles(self) -> List[Dict]:
+        """Metadata of saved profiles, newest first"""
+        profiles = []
+        for name in reversed(self._names()):
+            try:
+                with open(os.path.join(self.directory, name + '.json'), encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def profile_path(self, name: str) -> Optional[str]:
+        """Path of a saved .prof file, or None if there is no such profile"""
+        if not NAME_PATTERN.match(name):
+            return None
+        path = os.path.join(self.directory, name + '.prof')
+        return path if os.path.isfile(path) else None
+
+    def get_stats(self) -> Dict:
+        """Get profiler configuration and counters for this process"""
+        return {
+            'sample_rate': self.sample_rate,
+            'allow_header': self.allow_header,
+            'max_files': self.max_files,
+            'profiled': self.profiled,
+            'skipped': self.skipped
+        }
+
+
+class _ProfiledBody:
+    """
+    Response body that is profiled while it is produced
+
+    Profiling is enabled around each step of the body on the thread
+    taking it and disabled before the chunk is handed back, so the hook
+    never stays installed on a thread once control leaves the app.
+    """
+
+    def __init__(self, profiler, body, profile, capture, environ, started):
+        self.profiler = profiler
+        self.body = body
+        self.profile = profile
+        self.capture = capture
+        self.environ = environ
+        self.started = started
+        self.finished = False
+
+    def _profiled(self, function, *args):
+        try:
+            self.profile.enable()
+        except (RuntimeError, ValueError):
+            # Another profiler owns this thread; run the step unprofiled
+            return function(*args)
+        try:
+            return function(*args)
+        finally:
+            self.profile.disable()
+
+    def __iter__(self):
+        try:
+            iterator = self._profiled(iter, self.body)
+            while True:
+                try:
+                    chunk = self._profiled(next, iterator)
+                except StopIteration:
+                    return
+                yield chunk
+        finally:
+            self._finish()
+
+    def close(self):
+        try:
+            if hasattr(self.body, 'close'):
+                self._profiled(self.body.close)
+        finally:
+            self._finish()
+
+    def _finish(self):
+        if self.finished:
+            return
+        self.finished = True
+        self.profiler._active.release()
+        self.capture['duration_ms'] = round((time.perf_counter() - self.started) * 1000, 3)
+        self.capture['method'] = self.environ.get('REQUEST_METHOD')
+        self.capture['path'] = self.environ.get('PATH_INFO')
+        self.profiler._save(self.profile, self.capture)
+
+
+def init_app(app, directory: str, sample_rate: int = 0, max_files: int = 50, allow_header: bool = True):
+    """
+    Install the request profiler on an app
+
+    The after_request hook tags captures with the matched route and the
+    model version that served the request.
+
+    Returns:
+        RequestProfiler, also attached as app.profiler
+    """
+    profiler = RequestProfiler(app, directory, sample_rate=sample_rate, max_files=max_files,
+                               allow_header=allow_header)
+    app.profiler = profiler
+    app.wsgi_app = profiler
+
+    @app.after_request
+    def tag_profile(response):
+        capture = request.environ.get(ENVIRON_KEY)
+        if capture is not None:
+            capture['route'] = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            capture['model_version'] = app.prediction_service.model_version
+        return response
+
+    return profiler
@@ -0,0 +1,231 @@
+"""
+Rate Limiter
+Per-user token buckets shared by all worker processes
+
+Each (role, user) pair has a bucket holding up to `capacity` tokens that
+refills at `rate` tokens per second; a request costs one token per text
+it scores. Bucket state lives in a memory-mapped file so every gunicorn
+worker sees the same buckets, with POSIX record locks on the touched
+slots for cross-process exclusion. Without a shared file (or on
+platforms without fcntl) buckets are kept per process instead.
+"""
+
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# File layout: header, then groups of GROUP_SIZE slots of (key, tokens, updated)
+HEADER = struct.Struct('<4sII')
+MAGIC = b'SRLB'
+LAYOUT_VERSION = 1
+SLOT = struct.Struct('<Qdd')
+GROUP_SIZE = 8
+GROUP = struct.Struct('<' + 'Qdd' * GROUP_SIZE)
+
+
+def parse_limit(value: str) -> Tuple[float, float]:
+    """
+    Parse a "capacity/refill_per_second" limit such as "500/50"
+
+    Returns:
+        Tuple of (capacity, refill rate per second)
+    """
+    capacity, _, rate = str(value).partition('/')
+    capacity, rate = float(capacity), float(rate or capacity)
+    if capacity <= 0 or rate <= 0:
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    return capacity, rate
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, rate: float) -> float:
+    """Bucket level after refilling since the last update"""
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+def _take(tokens: float, cost: float, rate: float) -> Tuple[float, float]:
+    """
+    Try to take cost tokens
+
+    Returns:
+        Tuple of (remaining tokens, seconds until cost is available; 0
+        when the tokens were taken)
+    """
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+
+class LocalBucketStore:
+    """Per-process bucket store (stand-in when no shared file is configured)"""
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._buckets: 'OrderedDict[int, list]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: int, capacity: float, rate: float, cost: float, now: float) -> float:
+        """Take cost tokens from a bucket; returns the wait in seconds (0 if admitted)"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            tokens = capacity if bucket is None else _refill(bucket[0], bucket[1], now, capacity, rate)
+            tokens, retry_after = _take(tokens, cost, rate)
+            self._buckets[key] = [tokens, now]
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+
+class SharedBucketStore:
+    """
+    Bucket store in a memory-mapped file shared between processes
+
+    The file is a set-associative table: a key hashes to a group of
+    GROUP_SIZE slots and only that group is locked while it is updated.
+    When a group is full, its least recently updated bucket is reused;
+    an idle bucket has refilled anyway, so this only forgets usage of
+    long-idle users.
+    """
+
+    def __init__(self, path: str, groups: int = 1024):
+        """
+        Open or create the shared table
+
+        Args:
+            path: Backing file (preferably on tmpfs, e.g. /dev/shm)
+            groups: Number of slot groups (GROUP_SIZE buckets each)
+        """
+        if fcntl is None:
+            raise RuntimeError("Shared rate limiting needs fcntl (POSIX)")
+
+        self.path = path
+        self.groups = groups
+        self.size = HEADER.size + groups * GROUP.size
+        self._lock = threading.Lock()
+
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self.fd, fcntl.LOCK_EX)
+        try:
+            header = os.pread(self.fd, HEADER.size, 0)
+            if os.fstat(self.fd).st_size != self.size or \
+                    header != HEADER.pack(MAGIC, LAYOUT_VERSION, groups):
+                os.ftruncate(self.fd, 0)
+                os.ftruncate(self.fd, self.size)
+                os.pwrite(self.fd, HEADER.pack(MAGIC, LAYOUT_VERSION, groups), 0)
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN)
+
+        # MAP_SHARED mappings survive fork, so preloaded workers share it
+        self.mm = mmap.mmap(self.fd, self.size)
+
+    def consume(self, key: int, capacity: float, rate: float, cost: float, now: float) -> float:
+        """Take cost tokens from a bucket; returns the wait in seconds (0 if admitted)"""
+        offset = HEADER.size + (key % self.groups) * GROUP.size
+
+        # Record locks exclude other processes but not other threads
+        with self._lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, GROUP.size, offset)
+            try:
+                values = GROUP.unpack_from(self.mm, offset)
+                slot = None
+                victim, victim_updated = 0, math.inf
+                for i in range(GROUP_SIZE):
+                    slot_key, _, updated = values[3 * i:3 * i + 3]
+                    if slot_key == key:
+                        slot = i
+                        break
+                    if slot_key == 0:
+                        updated = -math.inf
+                    if updated < victim_updated:
+                        victim, victim_updated = i, updated
+
+                if slot is None:
+                    slot, tokens = victim, capacity
+                else:
+                    tokens = _refill(values[3 * slot + 1], values[3 * slot + 2], now, capacity, rate)
+
+                tokens, retry_after = _take(tokens, cost, rate)
+                SLOT.pack_into(self.mm, offset + slot * SLOT.size, key, tokens, now)
+                return retry_after
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, GROUP.size, offset)
+
+
+class RateLimiter:
+    """
+    Admission control by role-based token buckets
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], store=None):
+        """
+        Initialize rate limiter
+
+        Args:
+            limits: Role -> (capacity, refill per second); unknown roles get
+                the smallest configured limit
+            store: SharedBucketStore or LocalBucketStore (local by default)
+        """
+        if not limits:
+            raise ValueError("At least one rate limit is required")
+        self.limits = dict(limits)
+        self.fallback_limit = min(self.limits.values())
+        self.store = store or LocalBucketStore()
+
+        # Per-process counters
+        self.admitted = 0
+        self.limited = 0
+
+    @staticmethod
+    def _key(subject: str, role: str) -> int:
+        digest = hashlib.blake2b(f'{role}:{subject}'.encode('utf-8'), digest_size=8).digest()
+        # 0 marks an empty slot in the shared table
+        return int.from_bytes(digest, 'little') or 1
+
+    def acquire(self, subject: str, role: Optional[str], cost: float = 1.0) -> float:
+        """
+        Charge a request to the caller's bucket
+
+        Costs above the bucket capacity are charged as a full bucket, so
+        the largest allowed batch is still admitted after a full refill.
+
+        Args:
+            subject: JWT subject (username)
+            role: JWT role
+            cost: Tokens the request needs (texts to score)
+
+        Returns:
+            0 when admitted, otherwise seconds until it would be admitted
+        """
+        capacity, rate = self.limits.get(role, self.fallback_limit)
+        retry_after = self.store.consume(
+            self._key(subject, role), capacity, rate, min(float(cost), capacity), time.time()
+        )
+        if retry_after:
+            self.limited += 1
+        else:
+            self.admitted += 1
+        return retry_after
+
+    def get_stats(self) -> Dict:
+        """Get limiter configuration and counters for this process"""
+        return {
+            'backend': 'shared' if isinstance(self.store, SharedBucketStore) else 'local',
+            'limits': {role: {'capacity': capacity, 'refill_per_second': rate}
+                       for role, (capacity, rate) in self.limits.items()},
+            'admitted': self.admitted,
+            'limited': self.limited
+        }
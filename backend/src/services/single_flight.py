@@ -0,0 +1,89 @@
+"""
+Single-Flight Coalescing
+Shares one in-flight computation between identical concurrent requests
+
+The first caller for a key becomes its leader and computes the result;
+callers arriving with the same key before the leader finishes wait for
+the leader's result (or exception) instead of repeating the work. Keys
+are dropped as soon as their result is published, so this is not a
+cache: it only removes duplicate work that overlaps in time. Calls are
+coalesced within one process (the threads of a worker).
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Dict, Hashable, List, Tuple
+
+
+class SingleFlight:
+    """
+    Registry of in-flight calls keyed by request identity
+    """
+
+    def __init__(self, timeout: float = 30.0):
+        """
+        Initialize single-flight registry
+
+        Args:
+            timeout: Seconds a follower waits for the leader's result
+        """
+        self.timeout = timeout
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.leaders = 0
+        self.coalesced = 0
+
+    def join(self, keys: List[Hashable]) -> Tuple[List[int], List[Tuple[int, Future]]]:
+        """
+        Claim keys or join the calls already running for them
+
+        Every claimed key must be settled with resolve() or fail().
+
+        Args:
+            keys: Distinct keys
+
+        Returns:
+            Tuple of (positions this caller leads, (position, future) pairs
+            for keys another caller is computing)
+        """
+        led, followed = [], []
+        with self._lock:
+            for position, key in enumerate(keys):
+                future = self._calls.get(key)
+                if future is None:
+                    self._calls[key] = Future()
+                    led.append(position)
+                else:
+                    followed.append((position, future))
+            self.leaders += len(led)
+            self.coalesced += len(followed)
+        return led, followed
+
+    def resolve(self, keys: List[Hashable], results: List):
+        """Publish the results of claimed keys to their followers"""
+        with self._lock:
+            futures = [self._calls.pop(key) for key in keys]
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+    def fail(self, keys: List[Hashable], error: BaseException):
+        """Publish an exception to the followers of claimed keys"""
+        with self._lock:
+            futures = [self._calls.pop(key) for key in keys]
+        for future in futures:
+            future.set_exception(error)
+
+    def wait(self, future: Future):
+        """Result of a joined call (re-raises the leader's exception)"""
+        return future.result(timeout=self.timeout)
+
+    def get_stats(self) -> Dict:
+        """Get coalescing statistics for this process"""
+        return {
+            'enabled': True,
+            'in_flight': len(self._calls),
+            'leaders': self.leaders,
+            'coalesced': self.coalesced
+        }
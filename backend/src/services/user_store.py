@@ -0,0 +1,469 @@
+"""
+User Store
+Pluggable user record backends for the authentication service
+
+MemoryUserStore keeps users in a dict in the current process.
+SQLiteUserStore keeps them in a database file shared by every gunicorn
+worker, looked up by the username primary key through a small pool of
+connections. CachedUserStore wraps either one with a per-worker cache of
+hot records that is cleared whenever the store changes, including
+changes made by other workers.
+
+The stores also hold token revocations (revoked token IDs and per-user
+not-before times), so a logout or role change made through one worker
+is enforced by all of them.
+"""
+
+import base64
+import bisect
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+USER_FIELDS = ('password_hash', 'role', 'name')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL,
+    role TEXT NOT NULL,
+    name TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS user_store_meta (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    generation INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO user_store_meta (id, generation) VALUES (0, 0);
+
+CREATE TRIGGER IF NOT EXISTS users_inserted AFTER INSERT ON users
+BEGIN UPDATE user_store_meta SET generation = generation + 1; END;
+CREATE TRIGGER IF NOT EXISTS users_updated AFTER UPDATE ON users
+BEGIN UPDATE user_store_meta SET generation = generation + 1; END;
+CREATE TRIGGER IF NOT EXISTS users_deleted AFTER DELETE ON users
+BEGIN UPDATE user_store_meta SET generation = generation + 1; END;
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS token_cutoffs (
+    username TEXT PRIMARY KEY,
+    not_before REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS revoked_tokens_inserted AFTER INSERT ON revoked_tokens
+BEGIN UPDATE user_store_meta SET generation = generation + 1; END;
+CREATE TRIGGER IF NOT EXISTS token_cutoffs_inserted AFTER INSERT ON token_cutoffs
+BEGIN UPDATE user_store_meta SET generation = generation + 1; END;
+CREATE TRIGGER IF NOT EXISTS token_cutoffs_updated AFTER UPDATE ON token_cutoffs
+BEGIN UPDATE user_store_meta SET generation = generation + 1; END;
+"""
+
+
+def encode_cursor(username: str) -> str:
+    """Opaque pagination cursor for the last username of a page"""
+    return base64.urlsafe_b64encode(username.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[str]:
+    """
+    Username a pagination cursor points after
+
+    Raises:
+        ValueError: The cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return base64.b64decode(padded, altchars=b'-_', validate=True).decode('utf-8')
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+
+class MemoryUserStore:
+    """
+    Users held in a dict in this process
+
+    Changes are not seen by other workers; use SQLiteUserStore when the
+    app runs in more than one process.
+    """
+
+    def __init__(self):
+        self._users: Dict[str, Dict] = {}
+        self._usernames: List[str] = []
+        self._revoked: Dict[str, float] = {}
+        self._cutoffs: Dict[str, float] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[Dict]:
+        """User record (password_hash, role, name), or None"""
+        user = self._users.get(username)
+        return dict(user) if user is not None else None
+
+    def add(self, username: str, password_hash: str, role: str, name: str) -> bool:
+        """Insert a user; returns False if the username exists"""
+        with self._lock:
+            if username in self._users:
+                return False
+            self._users[username] = {'password_hash': password_hash, 'role': role, 'name': name}
+            bisect.insort(self._usernames, username)
+            self._generation += 1
+            return True
+
+    def update(self, username: str, **fields) -> bool:
+        """Change fields of a user; returns False if the user does not exist"""
+        with self._lock:
+            user = self._users.get(username)
+            if user is None:
+                return False
+            user.update((key, value) for key, value in fields.items() if key in USER_FIELDS)
+            self._generation += 1
+            return True
+
+    def list(self, after: Optional[str] = None, limit: int = 100) -> List[Tuple[str, Dict]]:
+        """Users ordered by username, starting after the given one"""
+        start = bisect.bisect_right(self._usernames, after) if after is not None else 0
+        return [(username, dict(self._users[username])) for username in self._usernames[start:start + limit]]
+
+    def count(self) -> int:
+        return len(self._users)
+
+    def revoke_token(self, jti: str, expires_at: float):
+        """Deny a token ID until it expires (expired entries are pruned)"""
+        with self._lock:
+            now = time.time()
+            self._revoked = {key: exp for key, exp in self._revoked.items() if exp > now}
+            self._revoked[jti] = expires_at
+            self._generation += 1
+
+    def revoke_user(self, username: str, not_before: float):
+        """Deny a user's tokens issued at or before not_before"""
+        with self._lock:
+            self._cutoffs[username] = max(not_before, self._cutoffs.get(username, 0.0))
+            self._generation += 1
+
+    def revocations(self) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """Unexpired revoked token IDs and per-user not-before times"""
+        now = time.time()
+        return {jti: exp for jti, exp in self._revoked.items() if exp > now}, dict(self._cutoffs)
+
+    def generation(self) -> int:
+        """Counter that changes whenever a user or revocation is added or changed"""
+        return self._generation
+
+
+class SQLiteUserStore:
+    """
+    Users in a SQLite database shared between processes
+
+    Lookups and pages use the username primary key (a WITHOUT ROWID
+    table, so rows are stored in username order). Triggers bump a
+    generation counter on every change, which lets per-worker caches
+    notice writes made by other processes.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4, timeout: float = 5.0):
+        """
+        Open or create the database
+
+        Args:
+            path: Database file
+            pool_size: Idle connections kept per process
+            timeout: Seconds to wait for another writer's lock
+        """
+        self.path = path
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self._pool = None
+        self._pool_pid = None
+        self._inherited = []
+        self._lock = threading.Lock()
+
+        with self.connection() as conn:
+            # WAL lets workers read while another one writes
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                               isolation_level=None)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _get_pool(self) -> queue.LifoQueue:
+        """Idle connections of the current process"""
+        if self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool_pid != os.getpid():
+                    # SQLite connections must not be used or closed across
+                    # fork; keep inherited ones referenced and open new ones
+                    if self._pool is not None:
+                        self._inherited.append(self._pool)
+                    self._pool = queue.LifoQueue()
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection (opened on demand)"""
+        pool = self._get_pool()
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if pool is self._pool and pool.qsize() < self.pool_size:
+                pool.put(conn)
+            else:
+                conn.close()
+
+    def get(self, username: str) -> Optional[Dict]:
+        """User record (password_hash, role, name), or None"""
+        with self.connection() as conn:
+            row = conn.execute(
+                'SELECT password_hash, role, name FROM users WHERE username = ?', (username,)
+            ).fetchone()
+        return dict(zip(USER_FIELDS, row)) if row is not None else None
+
+    def add(self, username: str, password_hash: str, role: str, name: str) -> bool:
+        """Insert a user; returns False if the username exists"""
+        with self.connection() as conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO users (username, password_hash, role, name) VALUES (?, ?, ?, ?)',
+                (username, password_hash, role, name)
+            )
+        return cursor.rowcount == 1
+
+    def add_many(self, users: List[Tuple[str, str, str, str]]) -> int:
+        """
+        Insert (username, password_hash, role, name) rows in one transaction
+
+        Returns:
+            Number of inserted users (existing usernames are skipped)
+        """
+        with self.connection() as conn:
+            conn.execute('BEGIN')
+            try:
+                cursor = conn.executemany(
+                    'INSERT OR IGNORE INTO users (username, password_hash, role, name) VALUES (?, ?, ?, ?)',
+                    users
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return cursor.rowcount
+
+    def update(self, username: str, **fields) -> bool:
+        """Change fields of a user; returns False if the user does not exist"""
+        fields = {key: value for key, value in fields.items() if key in USER_FIELDS}
+        if not fields:
+            return self.get(username) is not None
+        assignments = ', '.join(f'{key} = ?' for key in fields)
+        with self.connection() as conn:
+            cursor = conn.execute(
+                f'UPDATE users SET {assignments} WHERE username = ?', (*fields.values(), username)
+            )
+        return cursor.rowcount == 1
+
+    def list(self, after: Optional[str] = None, limit: int = 100) -> List[Tuple[str, Dict]]:
+        """Users ordered by username, starting after the given one"""
+        with self.connection() as conn:
+            rows = conn.execute(
+                'SELECT username, password_hash, role, name FROM users WHERE username > ? '
+                'ORDER BY username LIMIT ?', (after if after is not None else '', limit)
+            ).fetchall()
+        return [(row[0], dict(zip(USER_FIELDS, row[1:]))) for row in rows]
+
+    def count(self) -> int:
+        with self.connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def revoke_token(self, jti: str, expires_at: float):
+        """Deny a token ID until it expires (expired entries are pruned)"""
+        with self.connection() as conn:
+            conn.execute('DELETE FROM revoked_tokens WHERE expires_at <= ?', (time.time(),))
+            conn.execute('INSERT OR IGNORE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)',
+                         (jti, expires_at))
+
+    def revoke_user(self, username: str, not_before: float):
+        """Deny a user's tokens issued at or before not_before"""
+        with self.connection() as conn:
+            conn.execute(
+                'INSERT INTO token_cutoffs (username, not_before) VALUES (?, ?) '
+                'ON CONFLICT (username) DO UPDATE SET not_before = MAX(not_before, excluded.not_before)',
+                (username, not_before)
+            )
+
+    def revocations(self) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """Unexpired revoked token IDs and per-user not-before times"""
+        with self.connection() as conn:
+            revoked = conn.execute(
+                'SELECT jti, expires_at FROM revoked_tokens WHERE expires_at > ?', (time.time(),)
+            ).fetchall()
+            cutoffs = conn.execute('SELECT username, not_before FROM token_cutoffs').fetchall()
+        return dict(revoked), dict(cutoffs)
+
+    def generation(self) -> int:
+        """Counter bumped by every change to users or revocations"""
+        with self.connection() as conn:
+            return conn.execute('SELECT generation FROM user_store_meta WHERE id = 0').fetchone()[0]
+
+
+class CachedUserStore:
+    """
+    Per-worker cache of user records in front of a store
+
+    Writes through this wrapper clear the cache at once. Writes by other
+    processes are noticed by polling the store's generation counter at
+    most every check_interval seconds, which bounds how long a changed
+    record or a revocation made elsewhere can go unnoticed. Revocations
+    are cached as one snapshot, reloaded after any change.
+    """
+
+    def __init__(self, store, max_entries: int = 10000, check_interval: float = 1.0):
+        """
+        Initialize user cache
+
+        Args:
+            store: MemoryUserStore or SQLiteUserStore
+            max_entries: Maximum number of cached records (0 disables caching)
+            check_interval: Seconds between generation checks
+        """
+        self.store = store
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self._entries: Dict[str, Dict] = {}
+        self._revocations: Optional[Tuple[Dict[str, float], Dict[str, float]]] = None
+        self._lock = threading.Lock()
+        self._generation = store.generation()
+        self._checked = time.monotonic()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_generation(self):
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        generation = self.store.generation()
+        if generation != self._generation:
+            self._generation = generation
+            self.clear()
+
+    def clear(self):
+        """Remove all cached records"""
+        with self._lock:
+            self._entries.clear()
+            self._revocations = None
+            self.invalidations += 1
+
+    def get(self, username: str) -> Optional[Dict]:
+        """User record, from the cache when possible"""
+        self._check_generation()
+        user = self._entries.get(username)
+        if user is not None:
+            self.hits += 1
+            return dict(user)
+
+        self.misses += 1
+        invalidations = self.invalidations
+        user = self.store.get(username)
+        if user is not None and self.max_entries > 0:
+            with self._lock:
+                # A change landed while reading; the record may be stale
+                if invalidations != self.invalidations:
+                    return user
+                if len(self._entries) >= self.max_entries:
+                    # Dicts keep insertion order: drop the oldest entry
+                    self._entries.pop(next(iter(self._entries)), None)
+                self._entries[username] = dict(user)
+        return user
+
+    def _changed(self):
+        self._generation = self.store.generation()
+        self.clear()
+
+    def add(self, username: str, password_hash: str, role: str, name: str) -> bool:
+        added = self.store.add(username, password_hash, role, name)
+        if added:
+            self._changed()
+        return added
+
+    def update(self, username: str, **fields) -> bool:
+        updated = self.store.update(username, **fields)
+        if updated:
+            self._changed()
+        return updated
+
+    def revoke_token(self, jti: str, expires_at: float):
+        self.store.revoke_token(jti, expires_at)
+        self._changed()
+
+    def revoke_user(self, username: str, not_before: float):
+        self.store.revoke_user(username, not_before)
+        self._changed()
+
+    def is_revoked(self, payload: Dict) -> bool:
+        """
+        Check a decoded token payload against the store's revocations
+
+        Args:
+            payload: Claims with 'sub', 'iat' and usually 'jti'
+
+        Returns:
+            True if the token's ID was revoked or it was issued before
+            its user's not-before time
+        """
+        self._check_generation()
+        revocations = self._revocations
+        if revocations is None:
+            invalidations = self.invalidations
+            revocations = self.store.revocations()
+            with self._lock:
+                # Keep the snapshot only if no change landed while reading
+                if invalidations == self.invalidations:
+                    self._revocations = revocations
+        revoked, cutoffs = revocations
+        if payload.get('jti') in revoked:
+            return True
+        not_before = cutoffs.get(payload.get('sub'))
+        return not_before is not None and float(payload.get('iat', 0)) <= not_before
+
+    def list(self, after: Optional[str] = None, limit: int = 100) -> List[Tuple[str, Dict]]:
+        # Pages are read from the store and never cached
+        return self.store.list(after, limit)
+
+    def count(self) -> int:
+        return self.store.count()
+
+    def generation(self) -> int:
+        return self.store.generation()
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics for this process"""
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.store).__name__,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'invalidations': self.invalidations
+        }
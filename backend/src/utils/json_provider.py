@@ -0,0 +1,125 @@
+"""
+JSON Provider
+Compact, fast JSON encoding for API responses
+
+Uses orjson when it is installed and falls back to the standard library
+encoder with compact separators otherwise.
+"""
+
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date
+from typing import Any, Dict, Iterator, List
+
+from flask import Response
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+# Dates go through default() so both encoders write them the way Flask does
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+) if orjson else 0
+
+
+def default(o: Any) -> Any:
+    """
+    Encode types the JSON encoders do not handle, as Flask's provider does
+
+    Args:
+        o: Object the encoder could not serialize
+
+    Returns:
+        A JSON-serializable replacement
+    """
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Encode an object as compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=ORJSON_OPTIONS)
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def constant_response(app, obj: Any, status: int = 200):
+    """
+    Encode a response body once at startup
+
+    Args:
+        app: Flask application whose JSON provider encodes the body
+        obj: Response data
+        status: HTTP status code
+
+    Returns:
+        Function building a response from the pre-encoded body
+    """
+    body = app.json.dumps(obj).encode('utf-8')
+
+    def build() -> Response:
+        return app.response_class(body, status=status, mimetype='application/json')
+
+    return build
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    Flask JSON provider producing compact output with orjson
+
+    Also encodes large arrays incrementally, so big batch results are
+    written in pieces instead of as one large string.
+    """
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize data as JSON text"""
+        return dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        """Deserialize JSON text or bytes"""
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        """Serialize data into a compact application/json response"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
+
+    def iter_encode_object(self, obj: Dict, list_key: str, items: List, chunk_items: int = 64) -> Iterator[bytes]:
+        """
+        Encode an object holding one large list incrementally
+
+        Yields the JSON text of obj with items added as its last field,
+        encoding chunk_items entries at a time. The joined output decodes
+        to the same object as encoding everything at once.
+
+        Args:
+            obj: Object fields other than the list
+            list_key: Key under which the list is placed
+            items: List to encode incrementally
+            chunk_items: Entries encoded per piece
+        """
+        head = dumps_bytes(obj)[:-1]
+        yield head + (b',' if len(obj) else b'') + dumps_bytes(list_key) + b':['
+
+        for start in range(0, len(items), chunk_items):
+            piece = dumps_bytes(items[start:start + chunk_items])[1:-1]
+            yield piece if start == 0 else b',' + piece
+
+        yield b']}'
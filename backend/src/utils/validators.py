@@ -4,7 +4,9 @@ Utility functions for validating API inputs
 """
 
 import re
-from typing import Any, Tuple
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+EMPTY_TEXT_ERROR = "Text must be a non-empty string"
 
 def validate_input(data: Any, required_fields: list) -> Tuple[bool, str]:
     """
@@ -62,6 +64,21 @@ def validate_text_length(text: str, min_length: int = 1, max_length: int = 5000)
     
     return True, ""
 
+def normalize_text(text: str) -> str:
+    """
+    Normalize input text
+    
+    Strips leading/trailing whitespace and collapses whitespace runs to a
+    single space (same result as sanitize_text, without a regex pass).
+    
+    Args:
+        text: Text to normalize
+        
+    Returns:
+        Normalized text
+    """
+    return ' '.join(text.split())
+
 def sanitize_text(text: str) -> str:
     """
     Sanitize input text
@@ -72,10 +89,78 @@ def sanitize_text(text: str) -> str:
     Returns:
         Sanitized text
     """
-    # Remove leading/trailing whitespace
-    text = text.strip()
+    return normalize_text(text)
+
+def check_text(text: Any, max_length: int = 5000) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Validate and normalize one text
+    
+    Args:
+        text: Input value
+        max_length: Maximum normalized length
+        
+    Returns:
+        Tuple of (normalized text or None, error message or None)
+    """
+    if not isinstance(text, str):
+        return None, EMPTY_TEXT_ERROR
+    
+    normalized = ' '.join(text.split())
+    if not normalized:
+        return None, EMPTY_TEXT_ERROR
+    
+    if len(normalized) > max_length:
+        return None, f"Text exceeds maximum length of {max_length} characters"
+    
+    return normalized, None
+
+class BatchValidation(NamedTuple):
+    """Outcome of validate_batch"""
+    texts: List[str]
+    positions: List[int]
+    errors: List[Tuple[int, str]]
+
+def validate_batch(texts: Any, max_items: int = 100, max_length: int = 5000,
+                   partial: bool = False) -> BatchValidation:
+    """
+    Validate, normalize and length-check a batch in one pass
+    
+    Args:
+        texts: Input value, expected to be a list of strings
+        max_items: Maximum number of texts
+        max_length: Maximum normalized length per text
+        partial: Collect per-item errors instead of rejecting the batch
+        
+    Returns:
+        BatchValidation with the normalized valid texts, their input
+        positions and (index, message) for each invalid item
+        
+    Raises:
+        ValueError: The batch itself is invalid, or (unless partial) any
+            item is invalid
+    """
+    if not isinstance(texts, list):
+        raise ValueError("texts must be an array")
+    
+    if len(texts) == 0:
+        raise ValueError("texts array cannot be empty")
+    
+    if len(texts) > max_items:
+        raise ValueError(f"Maximum {max_items} texts per request")
     
-    # Remove multiple consecutive spaces
-    text = re.sub(r'\s+', ' ', text)
+    valid = []
+    positions = []
+    errors = []
+    for index, text in enumerate(texts):
+        normalized, error = check_text(text, max_length)
+        if error is None:
+            valid.append(normalized)
+            positions.append(index)
+        elif partial:
+            errors.append((index, error))
+        elif error is EMPTY_TEXT_ERROR:
+            raise ValueError("All texts must be non-empty strings")
+        else:
+            raise ValueError(f"Text at index {index}: {error}")
     
-    return text
+    return BatchValidation(valid, positions, errors)
@@ -4,15 +4,34 @@ Tests API functionality and authentication
 """
 
 import unittest
+import dataclasses
+import decimal
+import gzip
 import json
+import pstats
 import sys
 import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from unittest import mock
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
+from werkzeug.test import EnvironBuilder
+
 from src.app import create_app
 from config.settings import TestingConfig
+from models.lexicon import Lexicon
+from models.model_registry import ModelRegistry
+from models.sentiment_model import SentimentAnalyzer
+from services import compression
+from utils import json_provider
 
 class TestAPIEndpoints(unittest.TestCase):
     """Test cases for API endpoints"""
@@ -42,6 +61,39 @@ class TestAPIEndpoints(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json['status'], 'healthy')
     
+    def test_request_id_header(self):
+        """Test responses echo the caller's request ID or carry a generated one"""
+        response = self.client.get('/health', headers={'X-Request-ID': 'trace-42'})
+        self.assertEqual(response.headers['X-Request-ID'], 'trace-42')
+        
+        generated = self.client.get('/health').headers['X-Request-ID']
+        self.assertEqual(len(generated), 32)
+        self.assertNotEqual(self.client.get('/health').headers['X-Request-ID'], generated)
+    
+    def test_json_provider_types(self):
+        """Test both encoders write non-JSON types the way Flask does"""
+        @dataclasses.dataclass
+        class Point:
+            x: int
+        
+        data = {
+            'when': datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            'amount': decimal.Decimal('1.50'),
+            'id': uuid.UUID(int=1),
+            'point': Point(3)
+        }
+        expected = {
+            'when': 'Tue, 02 Jan 2024 03:04:05 GMT',
+            'amount': '1.50',
+            'id': '00000000-0000-0000-0000-000000000001',
+            'point': {'x': 3}
+        }
+        self.assertEqual(json.loads(self.app.json.dumps(data)), expected)
+        with mock.patch.object(json_provider, 'orjson', None):
+            self.assertEqual(json.loads(self.app.json.dumps(data)), expected)
+        with self.assertRaises(TypeError):
+            self.app.json.dumps({'value': object()})
+    
     def test_root_endpoint(self):
         """Test root endpoint"""
         response = self.client.get('/')
@@ -154,6 +206,131 @@ class TestAPIEndpoints(unittest.TestCase):
         
         self.assertEqual(response.status_code, 400)
     
+    def test_batch_invalid_item_rejects_batch(self):
+        """Test one invalid text fails the batch by default"""
+        response = self.client.post(
+            '/api/v1/batch',
+            json={'texts': ['Great!', '   ', 'x' * 5001]},
+            headers=self.auth_headers
+        )
+        
+        self.assertEqual(response.status_code, 400)
+    
+    def test_batch_partial_mode(self):
+        """Test partial mode scores valid texts and reports invalid ones"""
+        response = self.client.post(
+            '/api/v1/batch',
+            json={'texts': ['Great!', '   ', 42, '  Terrible   day ', 'x' * 5001], 'partial': True},
+            headers=self.auth_headers
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json['data']
+        self.assertEqual(response.json['count'], 5)
+        self.assertEqual(response.json['error_count'], 3)
+        self.assertEqual(data[0]['sentiment'], 'positive')
+        self.assertEqual(data[1], {'index': 1, 'error': 'Text must be a non-empty string'})
+        self.assertEqual(data[2]['index'], 2)
+        self.assertEqual(data[3]['text'], 'Terrible   day')
+        self.assertIn('maximum length', data[4]['error'])
+    
+    def test_batch_large_result_encoding(self):
+        """Test large batch results are encoded incrementally and compactly"""
+        texts = ['Great!', 'Terrible!', 'Okay.'] * 20
+        response = self.client.post(
+            '/api/v1/batch',
+            json={'texts': texts},
+            headers=self.auth_headers
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertNotIn(b'\n', response.data)
+        body = json.loads(response.data)
+        self.assertEqual(body['count'], 60)
+        self.assertEqual([item['text'] for item in body['data']], texts)
+        self.assertEqual(body['data'][1]['sentiment'], 'negative')
+    
+    def test_constant_responses_are_compact(self):
+        """Test pre-encoded constant responses"""
+        response = self.client.get('/health')
+        
+        self.assertEqual(response.data, b'{"status":"healthy","version":"1.0.0"}')
+        self.assertEqual(response.mimetype, 'application/json')
+    
+    def test_batch_stream_success(self):
+        """Test streaming NDJSON batch analysis beyond the batch limit"""
+        lines = [json.dumps('Great!' if i % 2 else 'Terrible!') for i in range(250)]
+        lines.append(json.dumps({'id': 'last', 'text': 'Okay.'}))
+        response = self.client.post(
+            '/api/v1/batch/stream',
+            data='\n'.join(lines) + '\n',
+            content_type='application/x-ndjson',
+            headers=self.auth_headers
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        results = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual(len(results), 251)
+        self.assertEqual(results[0]['sentiment'], 'negative')
+        self.assertEqual(results[1]['sentiment'], 'positive')
+        self.assertEqual(results[250], dict(results[250], index=250, id='last', sentiment='neutral'))
+    
+    def test_results_echo_input_text(self):
+        """Test results echo the stripped input while the model sees it normalized"""
+        single = self.client.post('/api/v1/analyze', json={'text': ' Great \n day '}, headers=self.auth_headers)
+        self.assertEqual(single.json['data']['text'], 'Great \n day')
+        
+        batch = self.client.post('/api/v1/batch', json={'texts': ['Great day', ' Great  day']},
+                                 headers=self.auth_headers)
+        self.assertEqual([item['text'] for item in batch.json['data']], ['Great day', 'Great  day'])
+        self.assertEqual(batch.json['data'][0]['scores'], batch.json['data'][1]['scores'])
+        
+        stream = self.client.post(
+            '/api/v1/batch/stream',
+            data='"Great   day"\n{"text": "Great day "}\n',
+            content_type='application/x-ndjson',
+            headers=self.auth_headers
+        )
+        results = [json.loads(line) for line in stream.data.decode().splitlines()]
+        self.assertEqual([item['text'] for item in results], ['Great   day', 'Great day'])
+        # The cached result of the normalized text is not modified
+        again = self.client.post('/api/v1/analyze', json={'text': 'Great day'}, headers=self.auth_headers)
+        self.assertEqual(again.json['data']['text'], 'Great day')
+    
+    def test_batch_stream_invalid_lines(self):
+        """Test invalid NDJSON lines get per-line errors"""
+        response = self.client.post(
+            '/api/v1/batch/stream',
+            data='"Great!"\nnot json\n{"text": ""}\n',
+            content_type='application/x-ndjson',
+            headers=self.auth_headers
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        results = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual(results[0]['sentiment'], 'positive')
+        self.assertEqual(results[1], {'index': 1, 'error': 'Invalid JSON'})
+        self.assertIn('error', results[2])
+    
+    def test_batch_stream_oversized_line(self):
+        """Test a line longer than any valid item is skipped with an error"""
+        self.app.config['MAX_TEXT_LENGTH'] = 100
+        response = self.client.post(
+            '/api/v1/batch/stream',
+            data='"Great!"\n"' + 'x' * 5000 + '"\n"Terrible!"\n' + 'y' * 5000,
+            content_type='application/x-ndjson',
+            headers=self.auth_headers
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        results = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[1], {'index': 1, 'error': 'Line too long'})
+        self.assertEqual(results[2]['sentiment'], 'negative')
+        self.assertEqual(results[3], {'index': 3, 'error': 'Line too long'})
+    
     def test_model_info_endpoint(self):
         """Test model info endpoint"""
         response = self.client.get(
@@ -165,6 +342,81 @@ class TestAPIEndpoints(unittest.TestCase):
         self.assertTrue(response.json['success'])
         self.assertIn('data', response.json)
     
+    def test_ready_endpoint(self):
+        """Test readiness probe once the model is warmed up"""
+        response = self.client.get('/ready')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['status'], 'ready')
+        self.assertIn('load_seconds', response.json)
+
+    def test_model_not_loaded(self):
+        """Test prediction endpoints answer 503 while the model loads"""
+        self.app.prediction_service.analyzer = None
+        
+        response = self.client.post(
+            '/api/v1/analyze',
+            json={'text': 'Great!'},
+            headers=self.auth_headers
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+    def test_admin_stats_reports_cache(self):
+        """Test admin stats include prediction cache counters"""
+        login_response = self.client.post(
+            '/api/v1/auth/login',
+            json={'username': 'admin@university.edu', 'password': 'admin123'}
+        )
+        admin_headers = {'Authorization': f"Bearer {login_response.json['access_token']}"}
+        
+        for _ in range(2):
+            self.client.post('/api/v1/analyze', json={'text': 'Great!'}, headers=self.auth_headers)
+        
+        response = self.client.get('/api/v1/admin/stats', headers=admin_headers)
+        
+        self.assertEqual(response.status_code, 200)
+        cache_stats = response.json['data']['predictions']['cache']
+        self.assertEqual(cache_stats['hits'], 1)
+        self.assertEqual(cache_stats['misses'], 1)
+        self.assertIn('evictions', cache_stats)
+    
+    def test_admin_users_pagination(self):
+        """Test the user listing is paged with a cursor"""
+        login_response = self.client.post(
+            '/api/v1/auth/login',
+            json={'username': 'admin@university.edu', 'password': 'admin123'}
+        )
+        admin_headers = {'Authorization': f"Bearer {login_response.json['access_token']}"}
+        
+        first = self.client.get('/api/v1/admin/users?limit=1', headers=admin_headers)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([user['username'] for user in first.json['data']], ['admin@university.edu'])
+        
+        second = self.client.get(f"/api/v1/admin/users?limit=1&cursor={first.json['next_cursor']}",
+                                 headers=admin_headers)
+        self.assertEqual([user['username'] for user in second.json['data']], ['student@university.edu'])
+        self.assertIsNone(second.json['next_cursor'])
+        
+        response = self.client.get('/api/v1/admin/users?cursor=%25%25', headers=admin_headers)
+        self.assertEqual(response.status_code, 400)
+    
+    def test_metrics_endpoint(self):
+        """Test Prometheus metrics include route, stage and batch metrics"""
+        self.client.post('/api/v1/analyze', json={'text': 'Great!'}, headers=self.auth_headers)
+        self.client.post('/api/v1/batch', json={'texts': ['Great!', 'Okay.']}, headers=self.auth_headers)
+        
+        response = self.client.get('/metrics')
+        body = response.data.decode()
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/plain', response.content_type)
+        self.assertIn('sentiment_request_duration_seconds_bucket{', body)
+        self.assertIn('route="/api/v1/analyze"', body)
+        for stage in ('auth', 'validation', 'inference', 'serialization'):
+            self.assertIn(f'stage="{stage}"', body)
+        self.assertIn('sentiment_batch_size_bucket{le="2.0",source="batch"}', body)
+        self.assertIn('status="200"', body)
+    
     def test_get_user_info(self):
         """Test get user info endpoint"""
         response = self.client.get(
@@ -176,6 +428,51 @@ class TestAPIEndpoints(unittest.TestCase):
         self.assertIn('username', response.json)
         self.assertIn('role', response.json)
     
+    def test_logout_revokes_tokens(self):
+        """Test a logged-out access token and its refresh token are rejected"""
+        login = self.client.post(
+            '/api/v1/auth/login',
+            json={'username': 'student@university.edu', 'password': 'student123'}
+        ).json
+        headers = {'Authorization': f"Bearer {login['access_token']}"}
+        self.assertEqual(self.client.get('/api/v1/auth/user', headers=headers).status_code, 200)
+        
+        response = self.client.post('/api/v1/auth/logout', json={'refresh_token': login['refresh_token']},
+                                    headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/auth/user', headers=headers).status_code, 401)
+        refresh = self.client.post('/api/v1/auth/refresh', json={'refresh_token': login['refresh_token']})
+        self.assertEqual(refresh.status_code, 401)
+        # Other sessions of the user are unaffected
+        self.assertEqual(self.client.get('/api/v1/auth/user', headers=self.auth_headers).status_code, 200)
+    
+    def test_admin_role_change_revokes_tokens(self):
+        """Test changing a user's role rejects tokens carrying the old role"""
+        admin_token = self.client.post(
+            '/api/v1/auth/login',
+            json={'username': 'admin@university.edu', 'password': 'admin123'}
+        ).json['access_token']
+        admin_headers = {'Authorization': f'Bearer {admin_token}'}
+        
+        forbidden = self.client.post('/api/v1/admin/users/admin@university.edu/revoke', headers=self.auth_headers)
+        self.assertEqual(forbidden.status_code, 403)
+        
+        response = self.client.patch('/api/v1/admin/users/student@university.edu', json={'role': 'viewer'},
+                                     headers=admin_headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['data']['role'], 'viewer')
+        self.assertEqual(self.client.get('/api/v1/auth/user', headers=self.auth_headers).status_code, 401)
+        
+        missing = self.client.post('/api/v1/admin/users/nobody@university.edu/revoke', headers=admin_headers)
+        self.assertEqual(missing.status_code, 404)
+        invalid = self.client.patch('/api/v1/admin/users/student@university.edu', json={'role': 'root'},
+                                    headers=admin_headers)
+        self.assertEqual(invalid.status_code, 400)
+        
+        revoked = self.client.post('/api/v1/admin/users/admin@university.edu/revoke', headers=admin_headers)
+        self.assertEqual(revoked.status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/auth/user', headers=admin_headers).status_code, 401)
+    
     def test_refresh_token(self):
         """Test token refresh endpoint"""
         # First get refresh token
@@ -194,5 +491,374 @@ class TestAPIEndpoints(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn('access_token', response.json)
 
+class TestModelHotSwap(unittest.TestCase):
+    """Test cases for registry-backed model hot-swapping"""
+    
+    def setUp(self):
+        """Create a registry holding version 1.0.0 and an app serving it"""
+        self.registry_dir = tempfile.mkdtemp()
+        self.registry = ModelRegistry(self.registry_dir)
+        self.registry.publish(SentimentAnalyzer(), '1.0.0')
+        
+        class RegistryConfig(TestingConfig):
+            MODEL_REGISTRY_PATH = self.registry_dir
+            MODEL_REGISTRY_WATCH_INTERVAL = 0
+        
+        self.app = create_app(RegistryConfig)
+        self.client = self.app.test_client()
+        token = self.client.post(
+            '/api/v1/auth/login',
+            json={'username': 'admin@university.edu', 'password': 'admin123'}
+        ).json['access_token']
+        self.auth_headers = {'Authorization': f'Bearer {token}'}
+    
+    def tearDown(self):
+        """Remove the registry"""
+        shutil.rmtree(self.registry_dir)
+    
+    def analyze(self, text):
+        return self.client.post('/api/v1/analyze', json={'text': text}, headers=self.auth_headers)
+    
+    def test_activate_swaps_version(self):
+        """Test activating a new version changes the serving model"""
+        response = self.analyze('great')
+        self.assertEqual(response.json['data']['model_version'], '1.0.0')
+        self.assertEqual(response.headers['X-Model-Version'], '1.0.0')
+        
+        self.registry.publish(SentimentAnalyzer(lexicon=Lexicon({'great': -1.0})), '2.0.0')
+        response = self.client.post('/api/v1/admin/models/activate', json={'version': '2.0.0'},
+                                    headers=self.auth_headers)
+        self.assertEqual(response.status_code, 202)
+        
+        deadline = time.time() + 5
+        while self.app.prediction_service.model_version != '2.0.0' and time.time() < deadline:
+            time.sleep(0.01)
+        
+        response = self.analyze('great')
+        self.assertEqual(response.json['data']['model_version'], '2.0.0')
+        self.assertEqual(response.json['data']['sentiment'], 'negative')
+        self.assertEqual(self.registry.current_version(), '2.0.0')
+        
+        info = self.client.get('/api/v1/model/info', headers=self.auth_headers)
+        self.assertEqual(info.headers['X-Model-Version'], '2.0.0')
+        status = self.client.get('/api/v1/admin/models', headers=self.auth_headers).json['data']
+        self.assertEqual(status['status']['swap']['swaps'], 1)
+        self.assertIs(self.app.sentiment_analyzer, self.app.prediction_service.analyzer)
+    
+    def test_activate_unknown_version(self):
+        """Test activating a version missing from the registry fails"""
+        response = self.client.post('/api/v1/admin/models/activate', json={'version': '9.9.9'},
+                                    headers=self.auth_headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.analyze('great').json['data']['model_version'], '1.0.0')
+
+class TestRateLimiting(unittest.TestCase):
+    """Test cases for per-user rate limiting"""
+    
+    def setUp(self):
+        """Create an app with small student buckets shared through a file"""
+        self.tmp_dir = tempfile.mkdtemp()
+        
+        class RateLimitedConfig(TestingConfig):
+            RATE_LIMIT_ENABLED = True
+            RATE_LIMITS = {'admin': '1000/100', 'student': '5/0.001', 'viewer': '1/0.001'}
+            RATE_LIMIT_PATH = os.path.join(self.tmp_dir, 'buckets')
+            STREAM_CHUNK_SIZE = 2
+        
+        self.app = create_app(RateLimitedConfig)
+        self.client = self.app.test_client()
+        self.headers = {}
+        for role, username, password in (('student', 'student@university.edu', 'student123'),
+                                         ('admin', 'admin@university.edu', 'admin123')):
+            token = self.client.post(
+                '/api/v1/auth/login',
+                json={'username': username, 'password': password}
+            ).json['access_token']
+            self.headers[role] = {'Authorization': f'Bearer {token}'}
+    
+    def tearDown(self):
+        """Remove the bucket file"""
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_batch_weighted_by_items(self):
+        """Test batch items draw down the bucket and the next call is refused"""
+        response = self.client.post('/api/v1/batch', json={'texts': ['a', 'b', 'c', 'd']},
+                                    headers=self.headers['student'])
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.post('/api/v1/batch', json={'texts': ['a', 'b']},
+                                    headers=self.headers['student'])
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response.headers['Retry-After']), 1)
+        
+        # One token is left for a single text
+        response = self.client.post('/api/v1/analyze', json={'text': 'good'}, headers=self.headers['student'])
+        self.assertEqual(response.status_code, 200)
+    
+    def test_limited_before_inference(self):
+        """Test a limited request never reaches the prediction service"""
+        self.client.post('/api/v1/batch', json={'texts': ['x'] * 5}, headers=self.headers['student'])
+        predictions = self.app.prediction_service.get_stats()
+        
+        response = self.client.post('/api/v1/analyze', json={'text': 'new text'}, headers=self.headers['student'])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.app.prediction_service.get_stats(), predictions)
+    
+    def test_roles_have_separate_limits(self):
+        """Test an admin is unaffected by a drained student bucket"""
+        self.client.post('/api/v1/batch', json={'texts': ['x'] * 5}, headers=self.headers['student'])
+        response = self.client.post('/api/v1/batch', json={'texts': ['x'] * 50}, headers=self.headers['admin'])
+        self.assertEqual(response.status_code, 200)
+        
+        stats = self.client.get('/api/v1/admin/stats', headers=self.headers['admin']).json['data']
+        self.assertEqual(stats['rate_limit']['backend'], 'shared')
+    
+    def test_stream_ends_when_limited(self):
+        """Test the stream stops with a rate-limit line once the bucket is empty"""
+        body = '\n'.join(json.dumps(text) for text in ['a', 'b', 'c', 'd', 'e', 'f', 'g']) + '\n'
+        response = self.client.post('/api/v1/batch/stream', data=body,
+                                    content_type='application/x-ndjson', headers=self.headers['student'])
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        
+        # Chunks of two: 1 (less the admission token) + 2 drain four of the five tokens
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(all('sentiment' in line for line in lines[:4]))
+        self.assertEqual(lines[4]['index'], 4)
+        self.assertEqual(lines[4]['error'], 'Rate limit exceeded')
+    
+    def test_stream_costs_one_token_per_text(self):
+        """Test the admission token counts toward the stream's texts"""
+        body = '\n'.join(json.dumps(text) for text in ['a', 'b', 'c', 'd', 'e']) + '\n'
+        response = self.client.post('/api/v1/batch/stream', data=body,
+                                    content_type='application/x-ndjson', headers=self.headers['student'])
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(all('sentiment' in line for line in lines))
+        response = self.client.post('/api/v1/analyze', json={'text': 'good'}, headers=self.headers['student'])
+        self.assertEqual(response.status_code, 429)
+
+class TestRequestProfiling(unittest.TestCase):
+    """Test cases for sampled and requested request profiles"""
+    
+    def setUp(self):
+        """Create an app keeping up to three profiles in a temp ring"""
+        self.tmp_dir = tempfile.mkdtemp()
+        
+        class ProfilingConfig(TestingConfig):
+            PROFILE_DIR = self.tmp_dir
+            PROFILE_MAX_FILES = 3
+        
+        self.app = create_app(ProfilingConfig)
+        self.client = self.app.test_client()
+        self.headers = {}
+        for role, username, password in (('student', 'student@university.edu', 'student123'),
+                                         ('admin', 'admin@university.edu', 'admin123')):
+            token = self.client.post(
+                '/api/v1/auth/login',
+                json={'username': username, 'password': password}
+            ).json['access_token']
+            self.headers[role] = {'Authorization': f'Bearer {token}'}
+    
+    def tearDown(self):
+        """Remove saved profiles"""
+        shutil.rmtree(self.tmp_dir)
+    
+    def analyze(self, headers):
+        response = self.client.post('/api/v1/analyze', json={'text': 'Great!'}, headers=headers)
+        # Profiles are saved once the body has been sent
+        response.get_data()
+        return response
+    
+    def test_admin_requested_profile(self):
+        """Test X-Profile from an admin captures a downloadable profile"""
+        self.assertNotIn('X-Profile-Id', self.analyze({**self.headers['student'], 'X-Profile': '1'}).headers)
+        
+        response = self.analyze({**self.headers['admin'], 'X-Profile': '1'})
+        name = response.headers['X-Profile-Id']
+        
+        profiles = self.client.get('/api/v1/admin/profiles', headers=self.headers['admin']).json['data']
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0]['name'], name)
+        self.assertEqual(profiles[0]['route'], '/api/v1/analyze')
+        self.assertEqual(profiles[0]['status'], 200)
+        self.assertEqual(profiles[0]['reason'], 'requested')
+        self.assertEqual(profiles[0]['model_version'], '1.0.0')
+        
+        download = self.client.get(f'/api/v1/admin/profiles/{name}', headers=self.headers['admin'])
+        self.assertEqual(download.status_code, 200)
+        path = os.path.join(self.tmp_dir, 'downloaded.prof')
+        with open(path, 'wb') as f:
+            f.write(download.data)
+        self.assertGreater(pstats.Stats(path).total_calls, 0)
+        
+        missing = self.client.get('/api/v1/admin/profiles/../secret', headers=self.headers['admin'])
+        self.assertEqual(missing.status_code, 404)
+        forbidden = self.client.get('/api/v1/admin/profiles', headers=self.headers['student'])
+        self.assertEqual(forbidden.status_code, 403)
+    
+    def test_body_consumed_on_another_thread(self):
+        """Test no profile hook is left on the thread that called the app"""
+        self.app.profiler.sample_rate = 1
+        environ = EnvironBuilder('/api/v1/analyze', method='POST', json={'text': 'Great!'},
+                                 headers=self.headers['student']).get_environ()
+        result = {}
+        
+        def call_app():
+            result['body'] = self.app.wsgi_app(environ, lambda status, headers, exc_info=None: None)
+            result['hook'] = sys.getprofile()
+        
+        caller = threading.Thread(target=call_app)
+        caller.start()
+        caller.join()
+        body = b''.join(result['body'])
+        result['body'].close()
+        
+        self.assertIsNone(result['hook'])
+        self.assertIsNone(sys.getprofile())
+        self.assertIn(b'sentiment', body)
+        self.assertEqual(self.app.profiler.profiled, 1)
+        name = self.app.profiler.list_profiles()[0]['name']
+        self.assertGreater(pstats.Stats(self.app.profiler.profile_path(name)).total_calls, 0)
+    
+    def test_sampling_keeps_a_bounded_ring(self):
+        """Test one in N requests is profiled and old profiles are dropped"""
+        self.app.profiler.sample_rate = 2
+        for _ in range(10):
+            self.analyze(self.headers['student'])
+        
+        self.assertEqual(self.app.profiler.profiled, 5)
+        profiles = self.app.profiler.list_profiles()
+        self.assertEqual(len(profiles), 3)
+        self.assertTrue(all(profile['reason'] == 'sampled' for profile in profiles))
+        self.assertEqual(len(os.listdir(self.tmp_dir)), 6)
+
+class TestCompression(unittest.TestCase):
+    """Test cases for negotiated response and request compression"""
+    
+    def setUp(self):
+        """Set up test client"""
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+        token = self.client.post(
+            '/api/v1/auth/login',
+            json={'username': 'student@university.edu', 'password': 'student123'}
+        ).json['access_token']
+        self.headers = {'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip'}
+        self.texts = [f'This product is great, review number {i}!' for i in range(40)]
+    
+    def test_accept_encoding_negotiation(self):
+        """Test q-values, wildcards and server preference pick the coding"""
+        self.assertEqual(compression.choose_encoding('gzip, deflate', ('br', 'gzip')), 'gzip')
+        self.assertEqual(compression.choose_encoding('gzip;q=0.5, br', ('br', 'gzip')), 'br')
+        self.assertEqual(compression.choose_encoding('br, gzip', ('br', 'gzip')), 'br')
+        self.assertEqual(compression.choose_encoding('*', ('gzip',)), 'gzip')
+        self.assertIsNone(compression.choose_encoding('gzip;q=0', ('gzip',)))
+        self.assertIsNone(compression.choose_encoding('identity', ('br', 'gzip')))
+        self.assertIsNone(compression.choose_encoding('', ('gzip',)))
+    
+    def test_large_response_is_gzipped(self):
+        """Test a large batch response is compressed and decodes to the same JSON"""
+        response = self.client.post('/api/v1/batch', json={'texts': self.texts}, headers=self.headers)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertNotIn('Content-Length', response.headers)
+        body = gzip.decompress(response.data)
+        self.assertLess(len(response.data), len(body) / 3)
+        data = json.loads(body)['data']
+        self.assertEqual([item['text'] for item in data], self.texts)
+    
+    def test_small_and_unaccepted_responses_are_not_compressed(self):
+        """Test bodies below the minimum size and clients without gzip get identity"""
+        response = self.client.get('/health', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(response.json['status'], 'healthy')
+        
+        headers = {**self.headers, 'Accept-Encoding': 'identity'}
+        response = self.client.post('/api/v1/batch', json={'texts': self.texts}, headers=headers)
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(len(response.json['data']), 40)
+        self.assertGreater(self.app.compression.get_stats()['skipped_small'], 0)
+    
+    def test_stream_chunks_decode_as_they_arrive(self):
+        """Test each NDJSON chunk is flushed so it decodes without the rest"""
+        self.app.config['STREAM_CHUNK_SIZE'] = 10
+        body = ''.join(json.dumps(text) + '\n' for text in self.texts)
+        response = self.client.post('/api/v1/batch/stream', data=body, headers=self.headers,
+                                    content_type='application/x-ndjson')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        
+        decoder = zlib.decompressobj(31)
+        chunks = [decoder.decompress(chunk) for chunk in response.response if chunk]
+        response.close()
+        # Every non-empty chunk ends on a line boundary
+        self.assertTrue(all(chunk.endswith(b'\n') for chunk in chunks if chunk))
+        lines = b''.join(chunks).splitlines()
+        self.assertEqual([json.loads(line)['index'] for line in lines], list(range(40)))
+    
+    def test_compressed_request_body(self):
+        """Test gzip request bodies are decoded, and bad ones rejected"""
+        payload = gzip.compress(json.dumps({'texts': self.texts}).encode('utf-8'))
+        headers = {**self.headers, 'Content-Encoding': 'gzip'}
+        response = self.client.post('/api/v1/batch', data=payload, headers=headers, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(gzip.decompress(response.data))['data']), 40)
+        
+        corrupt = self.client.post('/api/v1/batch', data=b'not gzip', headers=headers,
+                                   content_type='application/json')
+        self.assertEqual(corrupt.status_code, 400)
+        truncated = self.client.post('/api/v1/batch', data=payload[:-20], headers=headers,
+                                     content_type='application/json')
+        self.assertEqual(truncated.status_code, 400)
+        unsupported = self.client.post('/api/v1/batch', data=payload, content_type='application/json',
+                                       headers={**headers, 'Content-Encoding': 'compress'})
+        self.assertEqual(unsupported.status_code, 415)
+        
+        self.app.compression.max_request_size = 1000
+        bomb = gzip.compress(b' ' * 100000)
+        too_large = self.client.post('/api/v1/batch', data=bomb, headers=headers, content_type='application/json')
+        self.assertEqual(too_large.status_code, 413)
+    
+    def test_compressed_stream_upload(self):
+        """Test a gzip NDJSON upload is decoded while it is streamed"""
+        body = ''.join(json.dumps(text) + '\n' for text in self.texts).encode('utf-8')
+        headers = {**self.headers, 'Content-Encoding': 'gzip', 'Accept-Encoding': 'identity'}
+        response = self.client.post('/api/v1/batch/stream', data=gzip.compress(body), headers=headers,
+                                    content_type='application/x-ndjson')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(len(lines), 40)
+        self.assertTrue(all('error' not in json.loads(line) for line in lines))
+    
+    def test_compressed_stream_has_no_total_limit(self):
+        """Test a stream upload decodes past the request-size limit and reports bad input in-band"""
+        self.app.compression.max_request_size = 1000
+        self.app.config['STREAM_CHUNK_SIZE'] = 50
+        body = ''.join(json.dumps(f'{text} {i}') + '\n' for i in range(50) for text in self.texts).encode('utf-8')
+        self.assertGreater(len(body), 20 * self.app.compression.max_request_size)
+        headers = {**self.headers, 'Content-Encoding': 'gzip', 'Accept-Encoding': 'identity'}
+        response = self.client.post('/api/v1/batch/stream', data=gzip.compress(body), headers=headers,
+                                    content_type='application/x-ndjson')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(len(lines), 2000)
+        self.assertTrue(all('sentiment' in line for line in lines))
+        
+        truncated = self.client.post('/api/v1/batch/stream', data=gzip.compress(body)[:5000], headers=headers,
+                                     content_type='application/x-ndjson')
+        lines = [json.loads(line) for line in truncated.get_data(as_text=True).splitlines()]
+        self.assertEqual(truncated.status_code, 200)
+        self.assertEqual(lines[-1], {'error': 'Truncated compressed request body'})
+        self.assertTrue(all('sentiment' in line for line in lines[:-1]))
+    
+    @unittest.skipUnless(compression.brotli, 'brotli is not installed')
+    def test_brotli_preferred_when_available(self):
+        """Test br is chosen over gzip and round-trips"""
+        headers = {**self.headers, 'Accept-Encoding': 'gzip, br'}
+        response = self.client.post('/api/v1/batch', json={'texts': self.texts}, headers=headers)
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(len(json.loads(compression.brotli.decompress(response.data))['data']), 40)
+
 if __name__ == '__main__':
     unittest.main()
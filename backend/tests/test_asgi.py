@@ -0,0 +1,131 @@
+"""
+Tests for the ASGI entry point
+Drives the ASGI app with in-memory receive/send callables
+"""
+
+import unittest
+import asyncio
+import json
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.asgi import create_asgi_app, build_environ
+from src.config.settings import TestingConfig
+
+def call(app, method, path, body=b'', headers=None, chunk_size=None):
+    """Run one request through the ASGI app and collect the response"""
+    raw_headers = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    raw_headers.append((b'content-length', str(len(body)).encode()))
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': path, 'query_string': query.encode(), 'root_path': '',
+        'headers': raw_headers, 'client': ('127.0.0.1', 50000), 'server': ('testserver', 80)
+    }
+
+    chunk_size = chunk_size or max(len(body), 1)
+    pieces = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b'']
+    messages = [
+        {'type': 'http.request', 'body': piece, 'more_body': i < len(pieces) - 1}
+        for i, piece in enumerate(pieces)
+    ]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+
+    start = sent[0]
+    body = b''.join(message.get('body', b'') for message in sent[1:])
+    return start['status'], dict(start['headers']), body
+
+class TestASGI(unittest.TestCase):
+    """Test cases for the ASGI adapter"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Create the ASGI app once"""
+        cls.app = create_asgi_app(TestingConfig)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the executor threads"""
+        cls.app.executor.shutdown(wait=True)
+
+    def get_token(self):
+        """Log in through the ASGI app"""
+        status, _, body = call(
+            self.app, 'POST', '/api/v1/auth/login',
+            body=json.dumps({'username': 'student@university.edu', 'password': 'student123'}).encode(),
+            headers={'Content-Type': 'application/json'}
+        )
+        self.assertEqual(status, 200)
+        return json.loads(body)['access_token']
+
+    def test_health(self):
+        """Test a simple GET is served"""
+        status, headers, body = call(self.app, 'GET', '/health')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'], b'application/json')
+        self.assertEqual(json.loads(body)['status'], 'healthy')
+
+    def test_analyze_matches_wsgi(self):
+        """Test /analyze returns the same result as the WSGI app"""
+        token = self.get_token()
+        payload = json.dumps({'text': 'This is great!'}).encode()
+        headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'}
+
+        status, _, body = call(self.app, 'POST', '/api/v1/analyze', body=payload, headers=headers)
+        expected = self.app.wsgi_app.test_client().post('/api/v1/analyze', data=payload, headers=headers)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['data'], expected.json['data'])
+
+    def test_missing_auth(self):
+        """Test Flask error handling is preserved"""
+        status, _, _ = call(self.app, 'POST', '/api/v1/analyze', body=b'{"text": "hi"}',
+                            headers={'Content-Type': 'application/json'})
+        self.assertEqual(status, 401)
+
+    def test_streamed_request_and_response(self):
+        """Test a body above the buffer limit and a streamed response"""
+        token = self.get_token()
+        lines = ''.join(json.dumps({'text': f'good day {i}'}) + '\n' for i in range(250))
+        app = create_asgi_app(TestingConfig)
+        app.buffer_body_bytes = 1024
+
+        status, _, body = call(
+            app, 'POST', '/api/v1/batch/stream', body=lines.encode(), chunk_size=500,
+            headers={'Content-Type': 'application/x-ndjson', 'Authorization': f'Bearer {token}'}
+        )
+        app.executor.shutdown(wait=True)
+
+        self.assertEqual(status, 200)
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(records), 250)
+        self.assertEqual([record['index'] for record in records], list(range(250)))
+        self.assertEqual(records[0]['sentiment'], 'positive')
+
+    def test_build_environ(self):
+        """Test scope translation into a WSGI environ"""
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/api/v1/café', 'query_string': b'a=1',
+            'root_path': '', 'headers': [(b'x-forwarded-for', b'1.2.3.4'), (b'accept', b'a'), (b'accept', b'b')]
+        }
+        environ = build_environ(scope, None, None)
+        self.assertEqual(environ['PATH_INFO'], '/api/v1/café'.encode('utf-8').decode('latin-1'))
+        self.assertEqual(environ['QUERY_STRING'], 'a=1')
+        self.assertEqual(environ['HTTP_X_FORWARDED_FOR'], '1.2.3.4')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'a,b')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+"""
+Unit tests for the authentication service
+Tests token verification, the verified-token cache and user stores
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from services.auth_service import AuthService, TokenCache
+from services.user_store import MemoryUserStore, SQLiteUserStore
+
+class TestTokenVerification(unittest.TestCase):
+    """Test cases for AuthService.verify_token caching"""
+
+    def setUp(self):
+        """Set up auth service and a token"""
+        self.auth_service = AuthService()
+        self.token = self.auth_service.login('student@university.edu', 'student123')['access_token']
+
+    def test_cached_verification_skips_decode(self):
+        """Test a verified token is served from the cache"""
+        first = self.auth_service.verify_token(self.token)
+
+        with mock.patch('services.auth_service.jwt.decode') as decode:
+            second = self.auth_service.verify_token(self.token)
+
+        decode.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertEqual(second['sub'], 'student@university.edu')
+
+    def test_cached_token_expires(self):
+        """Test cached payloads are not returned after the token expires"""
+        self.auth_service.access_token_expires = timedelta(seconds=1)
+        token = self.auth_service._create_access_token('student@university.edu', 'student')
+        self.assertIsNotNone(self.auth_service.verify_token(token))
+
+        with mock.patch('services.auth_service.time.time', return_value=time.time() + 5):
+            self.assertIsNone(self.auth_service.token_cache.get(token))
+
+    def test_invalid_token_not_cached(self):
+        """Test invalid tokens are rejected and never cached"""
+        self.assertIsNone(self.auth_service.verify_token('not-a-token'))
+        self.assertEqual(len(self.auth_service.token_cache), 0)
+
+    def test_revoke_user_tokens(self):
+        """Test revocation removes a user's cached tokens and denies them"""
+        self.auth_service.verify_token(self.token)
+        self.auth_service.revoke_user_tokens('student@university.edu')
+
+        self.assertIsNone(self.auth_service.token_cache.get(self.token))
+        self.assertIsNone(self.auth_service.verify_token(self.token))
+        # Tokens issued after the revocation are accepted at once
+        fresh = self.auth_service.login('student@university.edu', 'student123')['access_token']
+        self.assertEqual(self.auth_service.verify_token(fresh)['sub'], 'student@university.edu')
+
+    def test_role_change_denies_old_tokens(self):
+        """Test a token carrying the old role is rejected after a role change"""
+        self.assertEqual(self.auth_service.verify_token(self.token)['role'], 'student')
+        self.assertTrue(self.auth_service.update_user('student@university.edu', role='viewer'))
+
+        self.assertIsNone(self.auth_service.verify_token(self.token))
+        fresh = self.auth_service.login('student@university.edu', 'student123')['access_token']
+        self.assertEqual(self.auth_service.verify_token(fresh)['role'], 'viewer')
+
+    def test_revoke_single_token(self):
+        """Test a revoked token stays rejected while other tokens still work"""
+        other = self.auth_service.login('student@university.edu', 'student123')['access_token']
+        self.assertTrue(self.auth_service.revoke_token(self.token))
+
+        self.assertIsNone(self.auth_service.verify_token(self.token))
+        self.assertIsNotNone(self.auth_service.verify_token(other))
+        self.assertFalse(self.auth_service.revoke_token('not-a-token'))
+
+    def test_cache_is_bounded(self):
+        """Test the cache never exceeds its size limit"""
+        cache = TokenCache(max_entries=3)
+        exp = time.time() + 60
+        for i in range(10):
+            cache.put(f'token-{i}', {'sub': 'user', 'exp': exp})
+
+        self.assertEqual(len(cache), 3)
+        self.assertIsNotNone(cache.get('token-9'))
+        self.assertIsNone(cache.get('token-0'))
+
+    def test_full_cache_drops_expired_entries_first(self):
+        """Test eviction removes expired oldest entries before live ones"""
+        cache = TokenCache(max_entries=3)
+        cache.put('expired', {'sub': 'user', 'exp': time.time() - 1})
+        cache.put('live-1', {'sub': 'user', 'exp': time.time() + 60})
+        cache.put('live-2', {'sub': 'user', 'exp': time.time() + 60})
+        cache.put('live-3', {'sub': 'user', 'exp': time.time() + 60})
+
+        self.assertEqual(len(cache), 3)
+        self.assertIsNotNone(cache.get('live-1'))
+
+class TestUserStore(unittest.TestCase):
+    """Test cases for the user store backends and the per-worker cache"""
+
+    def setUp(self):
+        """Create a SQLite user database"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.db_path = os.path.join(self.tmp_dir, 'users.db')
+
+    def test_sqlite_login_and_register(self):
+        """Test default users are seeded and registered users can log in"""
+        auth_service = AuthService(user_store=SQLiteUserStore(self.db_path))
+        self.assertIsNotNone(auth_service.login('admin@university.edu', 'admin123'))
+        self.assertTrue(auth_service.register_user('new@university.edu', 'secret', 'New User', 'viewer'))
+        self.assertFalse(auth_service.register_user('new@university.edu', 'secret', 'New User'))
+
+        # Another worker opening the same database sees the user
+        other = AuthService(user_store=SQLiteUserStore(self.db_path))
+        self.assertEqual(other.login('new@university.edu', 'secret')['user']['role'], 'viewer')
+
+    def test_revocations_shared_between_workers(self):
+        """Test a logout or role change in one worker is enforced by another"""
+        first = AuthService(user_store=SQLiteUserStore(self.db_path), user_cache_check_interval=0)
+        second = AuthService(user_store=SQLiteUserStore(self.db_path), user_cache_check_interval=0)
+        tokens = first.login('student@university.edu', 'student123')
+        other = first.login('student@university.edu', 'student123')['access_token']
+        # Cached in the second worker before the revocation
+        self.assertIsNotNone(second.verify_token(tokens['access_token']))
+
+        self.assertTrue(first.revoke_token(tokens['access_token']))
+        self.assertIsNone(second.verify_token(tokens['access_token']))
+        self.assertIsNotNone(second.verify_token(other))
+
+        first.update_user('student@university.edu', password='changed')
+        self.assertIsNone(second.verify_token(other))
+        # A stolen refresh token no longer mints access tokens
+        self.assertIsNone(second.refresh_access_token(tokens['refresh_token']))
+        fresh = second.login('student@university.edu', 'changed')
+        self.assertIsNotNone(first.verify_token(fresh['access_token']))
+        self.assertIsNotNone(first.refresh_access_token(fresh['refresh_token']))
+
+    def test_deleted_default_user_is_not_reseeded(self):
+        """Test default accounts are only seeded into an empty store"""
+        AuthService(user_store=SQLiteUserStore(self.db_path))
+        store = SQLiteUserStore(self.db_path)
+        with store.connection() as conn:
+            conn.execute('DELETE FROM users WHERE username = ?', ('admin@university.edu',))
+
+        restarted = AuthService(user_store=SQLiteUserStore(self.db_path))
+        self.assertIsNone(restarted.login('admin@university.edu', 'admin123'))
+        self.assertEqual(restarted.users.count(), 1)
+
+    def test_cache_cleared_by_other_worker(self):
+        """Test a change made by another worker reaches the cached record"""
+        first = AuthService(user_store=SQLiteUserStore(self.db_path), user_cache_check_interval=0)
+        second = AuthService(user_store=SQLiteUserStore(self.db_path), user_cache_check_interval=0)
+        self.assertEqual(first.get_user_info('student@university.edu')['role'], 'student')
+        self.assertEqual(first.get_user_info('student@university.edu')['role'], 'student')
+        self.assertEqual(first.users.get_stats()['hits'], 1)
+
+        second.update_user('student@university.edu', role='viewer')
+        self.assertEqual(first.get_user_info('student@university.edu')['role'], 'viewer')
+
+    def test_cursor_pagination(self):
+        """Test pages cover every user once, in order, for both backends"""
+        for store in (MemoryUserStore(), SQLiteUserStore(self.db_path)):
+            auth_service = AuthService(user_store=store)
+            for i in range(25):
+                auth_service.register_user(f'user{i:03d}@university.edu', 'pw', f'User {i}')
+
+            usernames, cursor = [], None
+            while True:
+                page, cursor = auth_service.list_users(limit=10, cursor=cursor)
+                usernames.extend(user['username'] for user in page)
+                if cursor is None:
+                    break
+            self.assertEqual(usernames, sorted(usernames))
+            self.assertEqual(len(usernames), 27)
+
+        with self.assertRaises(ValueError):
+            auth_service.list_users(cursor='%%%')
+
+    def test_bulk_insert(self):
+        """Test bulk inserts skip existing usernames"""
+        store = SQLiteUserStore(self.db_path)
+        rows = [(f'user{i}@university.edu', 'hash', 'student', 'User') for i in range(1000)]
+        self.assertEqual(store.add_many(rows), 1000)
+        self.assertEqual(store.add_many(rows[:10]), 0)
+        self.assertEqual(store.count(), 1000)
+
+if __name__ == '__main__':
+    unittest.main()
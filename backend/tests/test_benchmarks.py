@@ -0,0 +1,102 @@
+"""
+Tests for the benchmark suite
+Tests baseline comparison, regression gating and the HTTP load generator
+"""
+
+import unittest
+import sys
+import os
+import threading
+from unittest import mock
+
+# Add benchmarks to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+import load_test
+import run_benchmarks
+
+class TestBenchmarkCompare(unittest.TestCase):
+    """Test cases for baseline comparison"""
+
+    def setUp(self):
+        """Set up a baseline report"""
+        self.baseline = {'results': {
+            'model.analyze[short]': {'ops_per_sec': 1000.0},
+            'http.analyze': {'ops_per_sec': 100.0}
+        }}
+
+    def test_regression_past_threshold_fails(self):
+        """Test a slowdown beyond the threshold is reported"""
+        report = {'results': {
+            'model.analyze[short]': {'ops_per_sec': 100.0},
+            'http.analyze': {'ops_per_sec': 95.0}
+        }}
+        regressions = run_benchmarks.compare(report, self.baseline, threshold=0.25)
+
+        self.assertEqual(regressions, ['model.analyze[short]'])
+
+    def test_new_benchmarks_are_ignored(self):
+        """Test benchmarks missing from the baseline do not fail"""
+        report = {'results': {'model.batch_analyze[100]': {'ops_per_sec': 1.0}}}
+        self.assertEqual(run_benchmarks.compare(report, self.baseline, threshold=0.25), [])
+
+    def test_measure_reports_throughput(self):
+        """Test measure returns positive throughput per unit"""
+        result = run_benchmarks.measure(lambda: sum(range(100)), units=10, min_time=0.001, repeat=2)
+
+        self.assertGreater(result['ops_per_sec'], 0)
+        self.assertGreater(result['mean_us'], 0)
+
+    def test_filter_skips_other_fixtures(self):
+        """Test only the selected benchmarks build their fixtures"""
+        with mock.patch.object(run_benchmarks, 'AuthService', side_effect=AssertionError('auth fixture built')), \
+                mock.patch.object(run_benchmarks, 'HashingVectorizer', side_effect=AssertionError('vectorizer built')):
+            report = run_benchmarks.run_benchmarks('model.analyze[short]', min_time=0.001, repeat=1)
+
+        self.assertEqual(list(report['results']), ['model.analyze[short]'])
+
+class TestLoadTest(unittest.TestCase):
+    """Test cases for the load generator"""
+
+    def test_parse_mix(self):
+        """Test endpoint weights are parsed and unknown endpoints rejected"""
+        self.assertEqual(load_test.parse_mix('analyze=3, batch=1'), {'analyze': 3.0, 'batch': 1.0})
+        with self.assertRaises(ValueError):
+            load_test.parse_mix('analyze=1,predict=1')
+
+    def test_summarize_splits_errors(self):
+        """Test only 2xx responses count towards throughput and percentiles"""
+        samples = [('analyze', 0.010, '200')] * 98 + [('analyze', 0.500, '200'), ('batch', 0.001, '429')]
+        report = load_test.summarize(samples, elapsed=2.0, rate=50, max_lag=0.0)
+
+        self.assertEqual(report['endpoints']['analyze']['throughput_rps'], 49.5)
+        self.assertEqual(report['endpoints']['analyze']['p50_ms'], 10.0)
+        self.assertEqual(report['endpoints']['analyze']['max_ms'], 500.0)
+        self.assertEqual(report['endpoints']['batch']['errors'], {'429': 1})
+        self.assertIsNone(report['endpoints']['batch']['p99_ms'])
+        self.assertEqual(report['overall']['requests'], 100)
+
+    def test_run_against_server(self):
+        """Test a short run logs in and replays the mix against a live server"""
+        from werkzeug.serving import make_server
+        from app import create_app
+        from config.settings import TestingConfig
+
+        server = make_server('127.0.0.1', 0, create_app(TestingConfig), threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.shutdown)
+        url = f'http://127.0.0.1:{server.server_port}'
+
+        token = load_test.login(url, 'student@university.edu', 'student123')
+        factory = load_test.RequestFactory(batch_size=5, text_words=8, repeat_ratio=0.5)
+        generator = load_test.LoadGenerator(url, token, factory, concurrency=4, timeout=10)
+        report = generator.run(rate=100, duration=0.3, mix=load_test.parse_mix(load_test.DEFAULT_MIX))
+
+        self.assertEqual(report['overall']['requests'], 30)
+        self.assertEqual(report['overall']['ok'], 30)
+        self.assertGreater(report['overall']['p99_ms'], 0)
+        self.assertIn('analyze', report['endpoints'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Tests for the log pipeline
+Tests sampling of repeated messages, JSON lines and the non-blocking queue
+"""
+
+import unittest
+import io
+import json
+import logging
+import sys
+import os
+import threading
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flask import Flask, g
+
+from services import log_pipeline
+from services.log_pipeline import QueueLogHandler, SamplingFilter, configure_logging
+
+class TestLogPipeline(unittest.TestCase):
+    """Test cases for queued, sampled logging"""
+
+    def setUp(self):
+        """Route root logging to a buffer"""
+        self.stream = io.StringIO()
+        self.logger = logging.getLogger('tests.log_pipeline')
+        self.addCleanup(configure_logging)
+
+    def configure(self, **kwargs):
+        handler = configure_logging(stream=self.stream, fmt='%(levelname)s %(message)s', **kwargs)
+        return handler
+
+    def lines(self, handler):
+        handler.flush()
+        return self.stream.getvalue().splitlines()
+
+    def test_repeated_messages_are_sampled(self):
+        """Test repeats past the burst are counted and reported once"""
+        handler = self.configure(sample_burst=3, sample_window=60)
+        sampling = next(f for f in handler.filters if isinstance(f, SamplingFilter))
+
+        for i in range(10):
+            self.logger.warning("Invalid token: %s", i)
+        self.logger.warning("Token has expired")
+        self.assertEqual(self.lines(handler), [
+            'WARNING Invalid token: 0', 'WARNING Invalid token: 1', 'WARNING Invalid token: 2',
+            'WARNING Token has expired'
+        ])
+
+        sampling.window = 0
+        self.logger.warning("Invalid token: %s", 'next')
+        self.assertEqual(self.lines(handler)[-1], 'WARNING Invalid token: next [7 similar suppressed]')
+        self.assertEqual(log_pipeline.get_stats()['suppressed'], 7)
+
+    def test_errors_are_not_sampled(self):
+        """Test error records always pass"""
+        handler = self.configure(sample_burst=1)
+        for _ in range(5):
+            self.logger.error("Batch analysis error: %s", 'boom')
+        self.assertEqual(len(self.lines(handler)), 5)
+
+    def test_json_lines_carry_request_id(self):
+        """Test JSON output includes the request ID and extra fields"""
+        handler = self.configure(json_format=True)
+        app = Flask(__name__)
+        with app.test_request_context('/'):
+            g.request_id = 'abc123'
+            self.logger.info("Scored %d texts", 5, extra={'route': '/batch'})
+        self.logger.info("Outside a request")
+
+        first, second = [json.loads(line) for line in self.lines(handler)]
+        self.assertEqual(first['message'], 'Scored 5 texts')
+        self.assertEqual(first['request_id'], 'abc123')
+        self.assertEqual(first['route'], '/batch')
+        self.assertEqual(first['level'], 'INFO')
+        self.assertEqual(second['request_id'], '-')
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test a stalled writer never blocks the logging thread"""
+        release = threading.Event()
+
+        class StalledHandler(logging.Handler):
+            def emit(self, record):
+                release.wait(5)
+
+        handler = QueueLogHandler(StalledHandler(), max_size=2)
+        self.addCleanup(handler.close)
+        self.addCleanup(release.set)
+        record = logging.LogRecord('test', logging.INFO, __file__, 0, 'message', (), None)
+
+        started = time.perf_counter()
+        for _ in range(20):
+            handler.handle(record)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertGreaterEqual(handler.dropped, 17)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,542 @@
+"""
+Unit tests for the prediction service
+Tests prediction caching in front of the analyzer
+"""
+
+import unittest
+import sys
+import os
+import time
+import threading
+import shutil
+import tempfile
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models.sentiment_model import SentimentAnalyzer
+from services.prediction_cache import PredictionCache
+from services.prediction_service import PredictionService, ModelNotReadyError
+from services.model_lifecycle import ModelLifecycle
+from models.model_registry import ModelRegistry
+from services.micro_batcher import MicroBatcher
+from services.inference_executor import InferenceExecutor
+from services.rate_limiter import LocalBucketStore, RateLimiter, SharedBucketStore, parse_limit
+from services.single_flight import SingleFlight
+
+class CountingAnalyzer(SentimentAnalyzer):
+    """Analyzer recording the texts it is asked to score"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def predict(self, text):
+        self.calls.append([text])
+        return super().predict(text)
+
+    def predict_batch(self, texts, validate=True):
+        self.calls.append(list(texts))
+        return super().predict_batch(texts, validate=validate)
+
+class TestPredictionCache(unittest.TestCase):
+    """Test cases for PredictionCache"""
+
+    def setUp(self):
+        """Set up cache and a sample result"""
+        self.cache = PredictionCache(max_entries=2)
+        self.result = {'text': 'x', 'sentiment': 'positive', 'confidence': 0.6}
+
+    def test_normalized_key(self):
+        """Test texts differing only in whitespace share an entry"""
+        self.cache.put('great   product ', self.result, '1.0.0')
+        cached = self.cache.get(' great product', '1.0.0')
+
+        self.assertEqual(cached['sentiment'], 'positive')
+        self.assertEqual(cached['text'], ' great product')
+
+    def test_lru_eviction(self):
+        """Test least recently used entry is evicted first"""
+        self.cache.put('a', self.result, '1.0.0')
+        self.cache.put('b', self.result, '1.0.0')
+        self.cache.get('a', '1.0.0')
+        self.cache.put('c', self.result, '1.0.0')
+
+        self.assertIsNotNone(self.cache.get('a', '1.0.0'))
+        self.assertIsNone(self.cache.get('b', '1.0.0'))
+        self.assertEqual(self.cache.get_stats()['evictions'], 1)
+
+    def test_byte_budget(self):
+        """Test entries are evicted to stay within the byte budget"""
+        cache = PredictionCache(max_entries=1000, max_bytes=2000)
+        for i in range(50):
+            cache.put(f'text {i}', self.result, '1.0.0')
+
+        stats = cache.get_stats()
+        self.assertLessEqual(stats['bytes'], 2000)
+        self.assertGreater(stats['evictions'], 0)
+
+    def test_ttl_expiry(self):
+        """Test entries expire after the TTL"""
+        cache = PredictionCache(ttl_seconds=0.01)
+        cache.put('a', self.result, '1.0.0')
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get('a', '1.0.0'))
+        self.assertEqual(cache.get_stats()['expirations'], 1)
+
+    def test_model_version_change_clears(self):
+        """Test a new model version invalidates cached predictions"""
+        self.cache.put('a', self.result, '1.0.0')
+
+        self.assertIsNone(self.cache.get('a', '2.0.0'))
+        self.assertEqual(self.cache.get_stats()['invalidations'], 1)
+
+class TestPredictionService(unittest.TestCase):
+    """Test cases for PredictionService"""
+
+    def setUp(self):
+        """Set up service with a counting analyzer"""
+        self.analyzer = CountingAnalyzer()
+        self.service = PredictionService(self.analyzer, cache=PredictionCache())
+
+    def test_predict_uses_cache(self):
+        """Test repeated single predictions hit the cache"""
+        first = self.service.predict('Great!')
+        second = self.service.predict('Great!')
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.analyzer.calls, [['Great!']])
+
+    def test_batch_sends_only_misses(self):
+        """Test batch lookups send only cache misses to the analyzer"""
+        self.service.predict_batch(['Great!', 'Terrible!'])
+        results = self.service.predict_batch(['Terrible!', 'Okay.', 'Great!'])
+
+        self.assertEqual(self.analyzer.calls[-1], ['Okay.'])
+        self.assertEqual([r['text'] for r in results], ['Terrible!', 'Okay.', 'Great!'])
+        self.assertEqual(results, self.analyzer.batch_analyze(['Terrible!', 'Okay.', 'Great!']))
+
+class BlockingAnalyzer(CountingAnalyzer):
+    """Counting analyzer that holds scoring calls until released"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def predict_batch(self, texts, validate=True):
+        self.started.set()
+        self.release.wait(5)
+        return super().predict_batch(texts, validate=validate)
+
+class TestSingleFlight(unittest.TestCase):
+    """Test cases for coalescing identical predictions"""
+
+    def setUp(self):
+        """Set up an uncached service so only coalescing removes work"""
+        self.analyzer = BlockingAnalyzer()
+        self.single_flight = SingleFlight(timeout=5)
+        self.service = PredictionService(self.analyzer, single_flight=self.single_flight)
+
+    def wait_for_followers(self, count):
+        deadline = time.monotonic() + 5
+        while self.single_flight.coalesced < count and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.assertEqual(self.single_flight.coalesced, count)
+
+    def test_batch_duplicates_scored_once(self):
+        """Test duplicates inside a batch are scored once and copied back"""
+        self.analyzer.release.set()
+        results = self.service.predict_batch(['Great!', ' Great!  ', 'Bad', 'Great!'])
+
+        self.assertEqual(self.analyzer.calls, [['Great!', 'Bad']])
+        self.assertEqual([r['text'] for r in results], ['Great!', ' Great!  ', 'Bad', 'Great!'])
+        self.assertEqual(results[1]['sentiment'], results[0]['sentiment'])
+        self.assertIsNot(results[3], results[0])
+        self.assertEqual(self.service.get_stats()['single_flight']['batch_duplicates'], 2)
+
+    def test_concurrent_predictions_coalesce(self):
+        """Test identical in-flight texts wait for the first request's result"""
+        results = []
+
+        def predict(text):
+            results.append(self.service.predict_batch([text])[0])
+
+        leader = threading.Thread(target=predict, args=('Viral post!',))
+        leader.start()
+        self.assertTrue(self.analyzer.started.wait(5))
+        followers = [threading.Thread(target=predict, args=('Viral  post!',)) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        self.wait_for_followers(3)
+        self.analyzer.release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        self.assertEqual(self.analyzer.calls, [['Viral post!']])
+        self.assertEqual(len(results), 4)
+        self.assertEqual({r['sentiment'] for r in results}, {results[0]['sentiment']})
+        self.assertEqual(self.service.get_stats()['single_flight']['coalesced'], 3)
+        self.assertEqual(self.service.get_stats()['single_flight']['in_flight'], 0)
+
+    def test_batch_scores_only_texts_not_in_flight(self):
+        """Test a batch waits for texts another request is scoring and scores the rest"""
+        first = threading.Thread(target=self.service.predict_batch, args=(['Great!'],))
+        first.start()
+        self.assertTrue(self.analyzer.started.wait(5))
+        results = []
+        second = threading.Thread(target=lambda: results.extend(self.service.predict_batch(['Bad', 'Great!'])))
+        second.start()
+        self.wait_for_followers(1)
+        self.analyzer.release.set()
+        first.join(5)
+        second.join(5)
+
+        # Both calls were blocked together, so either may be recorded first
+        self.assertEqual(sorted(self.analyzer.calls), [['Bad'], ['Great!']])
+        self.assertEqual([r['text'] for r in results], ['Bad', 'Great!'])
+
+    def test_leader_error_reaches_followers(self):
+        """Test followers get the leader's exception and the key is released"""
+        errors = []
+
+        def fail(text):
+            self.analyzer.started.set()
+            self.analyzer.release.wait(5)
+            raise RuntimeError('scoring failed')
+
+        def call():
+            try:
+                self.service.predict('Great!')
+            except RuntimeError as e:
+                errors.append(e)
+
+        self.analyzer.predict = fail
+        leader = threading.Thread(target=call)
+        leader.start()
+        self.assertTrue(self.analyzer.started.wait(5))
+        follower = threading.Thread(target=call)
+        follower.start()
+        self.wait_for_followers(1)
+        self.analyzer.release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(self.single_flight.get_stats()['in_flight'], 0)
+        del self.analyzer.predict
+        self.assertEqual(self.service.predict('Great!')['text'], 'Great!')
+
+class TestModelSwap(unittest.TestCase):
+    """Test cases for swapping the analyzer under a running service"""
+
+    def test_in_flight_request_finishes_on_old_model(self):
+        """Test a request started before a swap is served and not cached by the old model"""
+        new_analyzer = SentimentAnalyzer(version='2.0.0')
+        service = PredictionService(None, cache=PredictionCache())
+
+        class SwappingAnalyzer(SentimentAnalyzer):
+            def predict_batch(self, texts, validate=True):
+                # Swap and let a new request look up the cache mid-request
+                service.set_analyzer(new_analyzer)
+                service.predict('other')
+                return super().predict_batch(texts, validate=validate)
+
+        service.set_analyzer(SwappingAnalyzer(version='1.0.0'))
+        results = service.predict_batch(['Great!'])
+
+        self.assertEqual(results[0]['model_version'], '1.0.0')
+        self.assertEqual(service.model_version, '2.0.0')
+        self.assertEqual(service.cache.get_stats()['model_version'], '2.0.0')
+        self.assertIsNone(service.cache.get('Great!', '2.0.0'))
+
+class TestMicroBatcher(unittest.TestCase):
+    """Test cases for MicroBatcher"""
+
+    def test_concurrent_requests_share_a_batch(self):
+        """Test concurrent submissions are flushed together in order"""
+        analyzer = CountingAnalyzer()
+        batcher = MicroBatcher(analyzer.predict_batch, max_batch_size=8, max_wait_ms=200)
+        texts = [f'great {i}' if i % 2 else f'sad {i}' for i in range(8)]
+        results = [None] * len(texts)
+
+        def worker(i):
+            results[i] = batcher.predict(texts[i])
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(texts))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([r['text'] for r in results], texts)
+        self.assertEqual(results, analyzer.batch_analyze(texts))
+        stats = batcher.get_stats()
+        self.assertEqual(stats['items'], 8)
+        self.assertLess(stats['batches'], 8)
+
+    def test_flushes_after_max_wait(self):
+        """Test a lone request is flushed once the wait expires"""
+        batcher = MicroBatcher(SentimentAnalyzer().predict_batch, max_batch_size=32, max_wait_ms=5)
+        result = batcher.predict('Great!')
+
+        self.assertEqual(result['sentiment'], 'positive')
+        self.assertEqual(batcher.get_stats()['batch_sizes'], {1: 1})
+
+    def test_errors_reach_every_caller(self):
+        """Test a failing batch raises in the waiting callers"""
+        def failing_batch(texts):
+            raise ValueError('model failure')
+
+        batcher = MicroBatcher(failing_batch, max_wait_ms=1)
+        with self.assertRaises(ValueError):
+            batcher.predict('text')
+
+    def test_service_batches_cache_misses(self):
+        """Test the prediction service routes single misses through the batcher"""
+        analyzer = CountingAnalyzer()
+        service = PredictionService(
+            analyzer,
+            cache=PredictionCache(),
+            micro_batching={'max_batch_size': 4, 'max_wait_ms': 1}
+        )
+        service.predict('Great!')
+        service.predict('Great!')
+
+        self.assertEqual(analyzer.calls, [['Great!']])
+        self.assertEqual(service.get_stats()['micro_batching']['items'], 1)
+
+class TestInferenceExecutor(unittest.TestCase):
+    """Test cases for InferenceExecutor"""
+
+    def setUp(self):
+        """Mixed texts spanning several shards"""
+        self.analyzer = SentimentAnalyzer(max_batch_size=1000)
+        words = ['good', 'bad', 'great', 'awful', 'naïve café', 'okay']
+        self.texts = [' '.join(words[j % len(words)] for j in range(i % 7 + 1)) for i in range(230)]
+        self.expected = self.analyzer.predict_batch(self.texts)
+
+    def test_thread_backend_preserves_order(self):
+        """Test thread-pool shards are reassembled in input order"""
+        executor = InferenceExecutor(self.analyzer, backend='thread', workers=3, shard_size=40)
+        try:
+            self.assertEqual(executor.predict_batch(self.texts), self.expected)
+        finally:
+            executor.shutdown()
+        self.assertEqual(executor.get_stats()['shards'], 6)
+
+    def test_process_backend_matches_inline(self):
+        """Test shared-memory process shards give the inline results"""
+        executor = InferenceExecutor(self.analyzer, backend='process', workers=2, shard_size=64)
+        try:
+            self.assertEqual(executor.predict_batch(self.texts), self.expected)
+            self.assertEqual(executor.predict_batch(self.texts[:10]), self.expected[:10])
+        finally:
+            executor.shutdown()
+        self.assertEqual(executor.get_stats()['parallel_batches'], 1)
+
+    def test_swapped_out_analyzer_scores_its_own_batch(self):
+        """Test a call keeps the analyzer it started with across a swap"""
+        executor = InferenceExecutor(self.analyzer, backend='thread', workers=2, shard_size=40)
+        replacement = SentimentAnalyzer(max_batch_size=1000)
+        try:
+            self.assertIsNotNone(executor._get_pool(self.analyzer))
+            executor.set_analyzer(replacement)
+            # The pool now belongs to the replacement; the old analyzer scores inline
+            self.assertIsNone(executor._get_pool(self.analyzer))
+            labels, _, _ = executor.score_batch(self.texts, self.analyzer)
+            self.assertEqual(len(labels), len(self.texts))
+            self.assertIsNotNone(executor._get_pool(replacement))
+        finally:
+            executor.shutdown()
+
+    def test_validation_matches_analyzer(self):
+        """Test invalid batches are rejected before dispatch"""
+        executor = InferenceExecutor(self.analyzer, backend='thread')
+        with self.assertRaises(ValueError):
+            executor.predict_batch(['ok', ''])
+        with self.assertRaises(ValueError):
+            InferenceExecutor(self.analyzer, backend='gpu')
+
+class TestModelLifecycle(unittest.TestCase):
+    """Test cases for staged model startup"""
+
+    def test_background_load_and_warmup(self):
+        """Test the service is unavailable until the model loads"""
+        release = threading.Event()
+        analyzer = CountingAnalyzer()
+
+        def load_model():
+            release.wait(5)
+            return analyzer
+
+        service = PredictionService(None, cache=PredictionCache())
+        lifecycle = ModelLifecycle(service, load_model, warmup_texts=['good', 'bad', 'okay'], warmup_batch_size=2)
+        lifecycle.start(background=True)
+
+        self.assertFalse(lifecycle.is_ready())
+        self.assertEqual(lifecycle.get_status()['status'], 'loading')
+        with self.assertRaises(ModelNotReadyError):
+            service.predict('Great!')
+
+        release.set()
+        self.assertTrue(lifecycle.wait_ready(5))
+        status = lifecycle.get_status()
+        self.assertEqual(status['status'], 'ready')
+        self.assertEqual(status['warmup_items'], 3)
+        self.assertIsNotNone(status['time_to_first_prediction_seconds'])
+        self.assertEqual(analyzer.calls, [['good', 'bad'], ['okay'], ['good']])
+        # Warmup does not seed the prediction cache
+        self.assertEqual(service.cache.get_stats()['entries'], 0)
+
+    def test_watcher_follows_registry_pointer(self):
+        """Test a process swaps when another one moves CURRENT"""
+        registry_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, registry_dir)
+        registry = ModelRegistry(registry_dir)
+        registry.publish(SentimentAnalyzer(), '1')
+
+        service = PredictionService(None)
+        lifecycle = ModelLifecycle(service, lambda: registry.load('1'), registry=registry, watch_interval=0.02)
+        self.addCleanup(lifecycle.stop)
+        lifecycle.start(background=False)
+        self.assertEqual(service.model_version, '1')
+
+        registry.publish(SentimentAnalyzer(), '2', activate=True)
+        deadline = time.time() + 5
+        while service.model_version != '2' and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(service.model_version, '2')
+        self.assertEqual(lifecycle.get_status()['swap']['swaps'], 1)
+
+    def test_failed_activation_keeps_current(self):
+        """Test CURRENT only moves once the new version has loaded"""
+        registry_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, registry_dir)
+        registry = ModelRegistry(registry_dir)
+        registry.publish(SentimentAnalyzer(), '1', activate=True)
+        registry.publish(SentimentAnalyzer(), '2')
+        loads = []
+
+        def load_version(version):
+            loads.append(version)
+            if version == '2':
+                raise ValueError('corrupt weights')
+            return registry.load(version)
+
+        service = PredictionService(None)
+        lifecycle = ModelLifecycle(service, lambda: registry.load('1'), registry=registry,
+                                   load_version=load_version)
+        lifecycle.start(background=False)
+
+        self.assertTrue(lifecycle.activate('2', background=False))
+        self.assertEqual(registry.current_version(), '1')
+        self.assertEqual(service.model_version, '1')
+        self.assertEqual(lifecycle.get_status()['swap']['state'], 'failed')
+
+        # The watcher does not retry a version that already failed
+        registry.set_current('2')
+        lifecycle.watch_interval = 0.01
+        lifecycle._start_watcher()
+        self.addCleanup(lifecycle.stop)
+        time.sleep(0.1)
+        self.assertEqual(loads, ['2'])
+
+    def test_concurrent_activation_is_refused(self):
+        """Test a second activation during a swap is refused and leaves CURRENT alone"""
+        registry_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, registry_dir)
+        registry = ModelRegistry(registry_dir)
+        for version in ('1', '2', '3'):
+            registry.publish(SentimentAnalyzer(), version)
+        registry.set_current('1')
+        release = threading.Event()
+
+        def load_version(version):
+            release.wait(5)
+            return registry.load(version)
+
+        service = PredictionService(None)
+        lifecycle = ModelLifecycle(service, lambda: registry.load('1'), registry=registry,
+                                   load_version=load_version)
+        lifecycle.start(background=False)
+
+        self.assertTrue(lifecycle.activate('2'))
+        self.assertFalse(lifecycle.activate('3'))
+        self.assertEqual(registry.current_version(), '1')
+        release.set()
+
+        deadline = time.time() + 5
+        while service.model_version != '2' and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(service.model_version, '2')
+        self.assertEqual(registry.current_version(), '2')
+
+    def test_failed_load(self):
+        """Test a loader error leaves the lifecycle failed, not ready"""
+        def load_model():
+            raise FileNotFoundError('model.pkl')
+
+        lifecycle = ModelLifecycle(PredictionService(None), load_model)
+        lifecycle.start(background=False)
+
+        self.assertFalse(lifecycle.is_ready())
+        self.assertEqual(lifecycle.get_status()['status'], 'failed')
+        self.assertIn('model.pkl', lifecycle.get_status()['error'])
+
+class TestRateLimiter(unittest.TestCase):
+    """Test cases for token-bucket admission control"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'buckets')
+
+    def test_parse_limit(self):
+        """Test capacity/refill limits parse and reject non-positive values"""
+        self.assertEqual(parse_limit('500/50'), (500.0, 50.0))
+        self.assertEqual(parse_limit('10'), (10.0, 10.0))
+        with self.assertRaises(ValueError):
+            parse_limit('0/5')
+
+    def test_bucket_refills(self):
+        """Test a drained bucket admits again after refilling"""
+        for store in (LocalBucketStore(), SharedBucketStore(self.path, groups=4)):
+            self.assertEqual(store.consume(7, 10, 2, 10, now=100.0), 0)
+            self.assertAlmostEqual(store.consume(7, 10, 2, 4, now=100.5), 1.5)
+            self.assertEqual(store.consume(7, 10, 2, 4, now=102.0), 0)
+            # Other keys have their own buckets
+            self.assertEqual(store.consume(8, 10, 2, 10, now=102.0), 0)
+
+    def test_shared_between_stores(self):
+        """Test two processes' views of the file share buckets"""
+        first = SharedBucketStore(self.path, groups=4)
+        second = SharedBucketStore(self.path, groups=4)
+        self.assertEqual(first.consume(7, 10, 1, 8, now=100.0), 0)
+        self.assertAlmostEqual(second.consume(7, 10, 1, 8, now=100.0), 6.0)
+
+    def test_full_group_reuses_oldest_slot(self):
+        """Test a new key in a full group replaces the least recent bucket"""
+        store = SharedBucketStore(self.path, groups=1)
+        for key in range(1, 9):
+            store.consume(key, 10, 1, 10, now=100.0 + key)
+        self.assertEqual(store.consume(9, 10, 1, 10, now=110.0), 0)
+        # Key 1 was evicted and starts with a full bucket; key 3 is still draining
+        self.assertEqual(store.consume(1, 10, 1, 10, now=110.0), 0)
+        self.assertGreater(store.consume(3, 10, 1, 10, now=110.0), 0)
+
+    def test_limits_by_role(self):
+        """Test roles get their own capacity and unknown roles the smallest"""
+        limiter = RateLimiter({'admin': (100, 1), 'viewer': (2, 1)})
+        self.assertEqual(limiter.acquire('a', 'admin', 50), 0)
+        self.assertEqual(limiter.acquire('v', 'viewer', 2), 0)
+        self.assertGreater(limiter.acquire('v', 'viewer', 1), 0)
+        self.assertEqual(limiter.acquire('x', 'guest', 2), 0)
+        self.assertGreater(limiter.acquire('x', 'guest', 1), 0)
+        # Costs above capacity are admitted from a full bucket
+        self.assertEqual(limiter.acquire('b', 'viewer', 50), 0)
+        self.assertEqual(limiter.get_stats()['limited'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Tests for the offline bulk scoring CLI
+Tests chunked scoring, output formats and resuming
+"""
+
+import unittest
+import json
+import sys
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import score_cli
+
+class TestScoreCLI(unittest.TestCase):
+    """Test cases for score_cli.run"""
+
+    def setUp(self):
+        """Write a small input file"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.tmp_dir, 'reviews.csv')
+        pd.DataFrame({
+            'id': range(7),
+            'review': ['Great!', 'Terrible!', 'Okay.', '', 'good good', 'sad', 'happy']
+        }).to_csv(self.input_path, index=False)
+
+    def tearDown(self):
+        """Remove temporary files"""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_scores_csv_in_chunks(self):
+        """Test every row is scored and written in input order"""
+        output_path = os.path.join(self.tmp_dir, 'scored.csv')
+        progress = score_cli.run(self.input_path, output_path, text_column='review', chunk_size=3)
+
+        output = pd.read_csv(output_path)
+        self.assertEqual(output['id'].tolist(), list(range(7)))
+        self.assertEqual(output['sentiment'].tolist()[:3], ['positive', 'negative', 'neutral'])
+        self.assertTrue(pd.isna(output['sentiment'][3]))
+        self.assertEqual(progress['chunks_done'], 3)
+        self.assertTrue(progress['completed'])
+
+    def test_process_pool_matches_inline(self):
+        """Test worker processes produce the same output as inline scoring"""
+        inline_path = os.path.join(self.tmp_dir, 'inline.jsonl')
+        pool_path = os.path.join(self.tmp_dir, 'pool.jsonl')
+        score_cli.run(self.input_path, inline_path, text_column='review', chunk_size=2)
+        score_cli.run(self.input_path, pool_path, text_column='review', chunk_size=2, workers=2)
+
+        with open(inline_path) as inline, open(pool_path) as pool:
+            self.assertEqual(inline.read(), pool.read())
+
+    def test_resume_after_interruption(self):
+        """Test a re-run continues from the last checkpoint"""
+        output_path = os.path.join(self.tmp_dir, 'scored.jsonl')
+        score_cli.run(self.input_path, output_path, text_column='review', chunk_size=3)
+        with open(output_path) as f:
+            expected = f.read()
+
+        # Simulate a crash after the first chunk plus a partial write
+        progress_path = output_path + '.progress.json'
+        with open(progress_path) as f:
+            progress = json.load(f)
+        first_chunk_bytes = len(''.join(expected.splitlines(keepends=True)[:3]).encode())
+        progress.update(chunks_done=1, rows_done=3, output_bytes=first_chunk_bytes, completed=False)
+        with open(progress_path, 'w') as f:
+            json.dump(progress, f)
+        with open(output_path, 'a') as f:
+            f.write('{"partial": ')
+
+        progress = score_cli.run(self.input_path, output_path, text_column='review', chunk_size=3)
+
+        with open(output_path) as f:
+            self.assertEqual(f.read(), expected)
+        self.assertEqual(progress['rows_done'], 7)
+
+    def test_resume_without_output_fails(self):
+        """Test a checkpoint without its output file is not resumed"""
+        output_path = os.path.join(self.tmp_dir, 'scored.csv')
+        score_cli.run(self.input_path, output_path, text_column='review', chunk_size=3)
+        progress_path = output_path + '.progress.json'
+        with open(progress_path) as f:
+            progress = json.load(f)
+        progress.update(chunks_done=1, completed=False)
+        with open(progress_path, 'w') as f:
+            json.dump(progress, f)
+
+        with open(output_path, 'w') as f:
+            f.write('id,review\n')
+        with self.assertRaises(ValueError):
+            score_cli.run(self.input_path, output_path, text_column='review', chunk_size=3)
+
+        os.remove(output_path)
+        with self.assertRaises(ValueError):
+            score_cli.run(self.input_path, output_path, text_column='review', chunk_size=3)
+
+    def test_missing_text_column(self):
+        """Test a clear error when the text column is missing"""
+        output_path = os.path.join(self.tmp_dir, 'scored.csv')
+        with self.assertRaises(ValueError):
+            score_cli.run(self.input_path, output_path, text_column='text')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,340 @@
+"""
+Unit tests for the sentiment model
+Tests lexicon matching and analyzer predictions
+"""
+
+import unittest
+import json
+import sys
+import os
+import tempfile
+import shutil
+
+import gc
+
+import pickle
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models.hashing_vectorizer import HashingVectorizer
+from models.lexicon import Lexicon
+from models.linear_model import LinearModel, drift_report
+from models.sentiment_model import SentimentAnalyzer
+from models.model_loader import (save_model, load_model, load_analyzer, export_quantized,
+                                 QuantizationError, _loaded_models)
+from models.model_registry import ModelRegistry
+
+class TestLexicon(unittest.TestCase):
+    """Test cases for the compiled lexicon matcher"""
+
+    def test_weighted_scores(self):
+        """Test positive and negative weights are summed separately"""
+        lexicon = Lexicon({'good': 2.0, 'awful': -3.0, 'fine': 0.5})
+        positive, negative = lexicon.score('Good food, AWFUL service, fine view. Good!')
+
+        self.assertEqual(positive, 4.5)
+        self.assertEqual(negative, 3.0)
+
+    def test_phrase_terms(self):
+        """Test multi-word terms are matched as phrases"""
+        lexicon = Lexicon({'not good': -2.0, 'good': 1.0})
+        positive, negative = lexicon.score('This is not good')
+
+        self.assertEqual(positive, 1.0)
+        self.assertEqual(negative, 2.0)
+
+    def test_matches_whole_tokens(self):
+        """Test terms do not match inside longer words"""
+        lexicon = Lexicon.default()
+        self.assertEqual(lexicon.score('A crusade of goodness'), (0.0, 0.0))
+
+    def test_load_tsv_file(self):
+        """Test loading an AFINN style lexicon file"""
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False) as f:
+            f.write('# comment\nsuperb\t3\nmeh\t-1\n')
+            path = f.name
+
+        try:
+            lexicon = Lexicon.from_file(path)
+        finally:
+            os.remove(path)
+
+        self.assertEqual(len(lexicon), 2)
+        self.assertEqual(lexicon.score('superb but meh'), (3.0, 1.0))
+
+    def test_load_json_file(self):
+        """Test loading a JSON lexicon file"""
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump({'love': 2, 'hate': -2}, f)
+            path = f.name
+
+        try:
+            analyzer = SentimentAnalyzer(lexicon_path=path)
+        finally:
+            os.remove(path)
+
+        self.assertEqual(analyzer.analyze('I love it')['sentiment'], 'positive')
+
+class TestSentimentAnalyzer(unittest.TestCase):
+    """Test cases for SentimentAnalyzer"""
+
+    def setUp(self):
+        """Set up analyzer"""
+        self.analyzer = SentimentAnalyzer()
+
+    def test_analyze_labels(self):
+        """Test labels for positive, negative and neutral text"""
+        self.assertEqual(self.analyzer.analyze('Great!')['sentiment'], 'positive')
+        self.assertEqual(self.analyzer.analyze('Terrible!')['sentiment'], 'negative')
+        self.assertEqual(self.analyzer.analyze('Okay.')['sentiment'], 'neutral')
+
+    def test_analyze_scores(self):
+        """Test result contains weighted scores and confidence"""
+        result = self.analyzer.analyze('good, great and a bit sad')
+
+        self.assertEqual(result['scores'], {'positive': 2.0, 'negative': 1.0})
+        self.assertEqual(result['confidence'], 0.6)
+
+    def test_batch_matches_single_analysis(self):
+        """Test vectorized batch scoring agrees with per-text analysis"""
+        texts = ['Great!', 'Terrible!', 'Okay.', 'good, great and a bit sad', 'sad sad happy']
+        batch = self.analyzer.batch_analyze(texts)
+
+        self.assertEqual(batch, [self.analyzer.analyze(text) for text in texts])
+
+    def test_batch_with_phrase_lexicon(self):
+        """Test batch scoring handles multi-word terms"""
+        analyzer = SentimentAnalyzer(lexicon=Lexicon({'not good': -2.0, 'good': 1.0}))
+        results = analyzer.predict_batch(['not good at all', 'good'])
+
+        self.assertEqual([r['sentiment'] for r in results], ['negative', 'positive'])
+
+    def test_batch_too_many_items(self):
+        """Test batch above the size limit is rejected"""
+        with self.assertRaises(ValueError):
+            self.analyzer.batch_analyze(['text'] * 101)
+
+    def test_analyze_invalid_text(self):
+        """Test invalid input raises ValueError"""
+        with self.assertRaises(ValueError):
+            self.analyzer.analyze('')
+
+TRAINING_TEXTS = [
+    "great product, I love it", "excellent quality and great value", "really happy with this",
+    "love the design, works great", "good service and fast delivery", "happy customer, excellent",
+    "terrible product, I hate it", "awful quality and bad value", "really sad about this",
+    "hate the design, broke fast", "bad service and slow delivery", "angry customer, terrible"
+]
+TRAINING_LABELS = ['positive'] * 6 + ['negative'] * 6
+
+class TestHashingVectorizer(unittest.TestCase):
+    """Test cases for signed feature hashing"""
+
+    def test_fixed_width_and_deterministic(self):
+        """Test rows have n_features columns and match across instances"""
+        texts = ['Great movie!', 'not good at all', 'Café crème']
+        first = HashingVectorizer(n_features=2 ** 12).transform(texts)
+        second = HashingVectorizer.from_config(HashingVectorizer(n_features=2 ** 12).get_config()).transform(texts)
+
+        self.assertEqual(first.shape, (3, 2 ** 12))
+        self.assertEqual(abs(first - second).sum(), 0)
+        self.assertTrue(first.has_canonical_format)
+        np.testing.assert_allclose(np.asarray(first.multiply(first).sum(axis=1)).ravel(), 1.0)
+
+    def test_batch_rows_match_single_texts(self):
+        """Test n-grams never span two texts of a batch"""
+        vectorizer = HashingVectorizer(n_features=2 ** 14)
+        texts = ['good product', 'bad', 'the delivery was late', 'ok']
+        batch = vectorizer.transform(texts)
+        for i, text in enumerate(texts):
+            self.assertEqual(abs(batch[i] - vectorizer.transform([text])).sum(), 0)
+
+    def test_word_ngrams(self):
+        """Test word features depend on tokens, not case or punctuation"""
+        vectorizer = HashingVectorizer(n_features=2 ** 16, word_ngrams=(1, 2), char_ngrams=None, norm=None)
+        same = vectorizer.transform(['Not  good!', 'not good'])
+        self.assertEqual(abs(same[0] - same[1]).sum(), 0)
+        # Two unigrams and one bigram
+        self.assertEqual(abs(same[0]).sum(), 3)
+        swapped = vectorizer.transform(['good not'])
+        self.assertNotEqual(abs(same[0] - swapped[0]).sum(), 0)
+
+    def test_pickle_round_trip(self):
+        """Test the vectorizer survives pickling for process-pool workers"""
+        vectorizer = HashingVectorizer(n_features=2 ** 10)
+        vectorizer.transform(['warm up the tables'])
+        restored = pickle.loads(pickle.dumps(vectorizer))
+        self.assertEqual(abs(restored.transform(['hello']) - vectorizer.transform(['hello'])).sum(), 0)
+
+class TestLinearModel(unittest.TestCase):
+    """Test cases for the linear model over hashed features"""
+
+    def setUp(self):
+        """Train a small model"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        model = LinearModel.train(TRAINING_TEXTS, TRAINING_LABELS, HashingVectorizer(n_features=2 ** 12))
+        self.analyzer = SentimentAnalyzer(linear_model=model, version='3.0.0')
+
+    def test_predictions(self):
+        """Test the trained model labels held-out texts"""
+        results = self.analyzer.batch_analyze(['I love this, great', 'I hate this, terrible'])
+        self.assertEqual([result['sentiment'] for result in results], ['positive', 'negative'])
+        self.assertEqual(set(results[0]['scores']), {'negative', 'positive'})
+        self.assertEqual(self.analyzer.analyze('I love this, great'), results[0])
+        self.assertEqual(self.analyzer.get_model_info()['type'], 'linear')
+
+    def test_artifact_round_trip(self):
+        """Test linear artifacts load memory-mapped with identical scores"""
+        texts = ['great value', 'awful delivery', 'it is a product']
+        for name in ('linear.pkl', 'linear'):
+            loaded = load_model(save_model(self.analyzer, os.path.join(self.tmp_dir, name)))
+            self.assertIsInstance(loaded.linear_model.coef, np.memmap)
+            self.assertEqual(loaded.version, '3.0.0')
+            self.assertEqual(loaded.batch_analyze(texts), self.analyzer.batch_analyze(texts))
+
+    def test_quantize(self):
+        """Test float16 and int8 weights shrink 4x and 8x and keep labels"""
+        model = self.analyzer.linear_model
+        texts = TRAINING_TEXTS * 10
+        for dtype, ratio in (('float16', 4), ('int8', 8)):
+            quantized = model.quantize(dtype)
+            self.assertEqual(str(quantized.coef.dtype), dtype)
+            self.assertEqual(model.coef.nbytes, ratio * quantized.coef.nbytes)
+            # Small batches gather rows, large ones upcast the whole matrix
+            for batch in (texts[:2], texts):
+                np.testing.assert_allclose(quantized.decision_function(batch),
+                                           model.decision_function(batch), atol=0.05)
+            report = drift_report(model, quantized, texts)
+            self.assertEqual(report['label_changes'], 0)
+            self.assertLess(report['max_probability_drift'], 0.01)
+
+    def test_export_quantized(self):
+        """Test quantized artifacts record their drift and score like the original"""
+        path = os.path.join(self.tmp_dir, 'int8')
+        report = export_quantized(self.analyzer, path, 'int8', TRAINING_TEXTS)
+        self.assertEqual(report['compression'], 8.0)
+
+        loaded = load_model(path)
+        self.assertEqual(loaded.linear_model.coef.dtype, np.int8)
+        info = loaded.get_model_info()['linear']
+        self.assertEqual(info['weights_dtype'], 'int8')
+        self.assertEqual(info['quantization']['label_changes'], 0)
+        self.assertEqual([r['sentiment'] for r in loaded.batch_analyze(TRAINING_TEXTS)], TRAINING_LABELS)
+
+        with self.assertRaises(ValueError):
+            export_quantized(loaded, os.path.join(self.tmp_dir, 'again'), 'float16', TRAINING_TEXTS)
+
+    def test_export_refuses_label_changes(self):
+        """Test the export fails when quantization flips labels"""
+        vectorizer = HashingVectorizer(n_features=16, char_ngrams=None, norm=None)
+        coef = np.tile([1.0, 0.9], (16, 1))
+        # One large weight coarsens the int8 scale of the first class
+        coef[vectorizer.transform(['outlier']).indices[0], 0] = 100.0
+        model = LinearModel(vectorizer, coef, np.zeros(2), ['positive', 'negative'])
+        text = next(word for word in ('a', 'b', 'c', 'd')
+                    if vectorizer.transform([word]).indices[0] != vectorizer.transform(['outlier']).indices[0])
+        analyzer = SentimentAnalyzer(linear_model=model)
+        path = os.path.join(self.tmp_dir, 'flipped')
+
+        with self.assertRaises(QuantizationError) as context:
+            export_quantized(analyzer, path, 'int8', [text])
+        self.assertEqual(context.exception.report['label_changes'], 1)
+        self.assertFalse(os.path.exists(path))
+
+        report = export_quantized(analyzer, path, 'int8', [text], max_label_changes=1)
+        self.assertEqual(report['changed_indices'], [0])
+
+class TestModelLoader(unittest.TestCase):
+    """Test cases for memory-mapped model artifacts"""
+
+    def setUp(self):
+        """Create artifact directory and source analyzer"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.analyzer = SentimentAnalyzer(
+            lexicon=Lexicon({'love': 2.0, 'not bad': 1.0, 'hate': -2.0}),
+            version='2.0.0'
+        )
+
+    def tearDown(self):
+        """Remove artifacts"""
+        shutil.rmtree(self.tmp_dir)
+
+    def _assert_round_trip(self, path):
+        loaded = load_model(save_model(self.analyzer, path))
+        texts = ['I love it', 'not bad', 'I hate this']
+
+        self.assertIsInstance(loaded.lexicon.weights, np.memmap)
+        self.assertEqual(loaded.version, '2.0.0')
+        self.assertEqual(loaded.batch_analyze(texts), self.analyzer.batch_analyze(texts))
+        self.assertEqual(loaded.analyze('not bad'), self.analyzer.analyze('not bad'))
+        return loaded
+
+    def test_joblib_artifact(self):
+        """Test joblib artifact is loaded memory-mapped"""
+        self._assert_round_trip(os.path.join(self.tmp_dir, 'model.pkl'))
+
+    def test_npy_directory_artifact(self):
+        """Test .npy directory artifact is loaded memory-mapped"""
+        self._assert_round_trip(os.path.join(self.tmp_dir, 'model'))
+
+    def test_loaded_model_is_reused(self):
+        """Test repeated loads of an unchanged artifact do not re-read it"""
+        path = save_model(self.analyzer, os.path.join(self.tmp_dir, 'model.pkl'))
+        self.assertIs(load_model(path), load_model(path))
+
+    def test_missing_artifact_falls_back(self):
+        """Test missing artifact falls back to the lexicon analyzer"""
+        analyzer = load_analyzer(os.path.join(self.tmp_dir, 'missing.pkl'))
+        self.assertEqual(analyzer.analyze('great')['sentiment'], 'positive')
+
+class TestModelRegistry(unittest.TestCase):
+    """Test cases for the versioned model registry"""
+
+    def setUp(self):
+        """Create an empty registry"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.registry = ModelRegistry(self.tmp_dir)
+
+    def tearDown(self):
+        """Remove the registry"""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_publish_and_activate(self):
+        """Test versions are ordered and CURRENT selects the served one"""
+        for version in ('1.9', '1.10', '1.2'):
+            self.registry.publish(SentimentAnalyzer(), version)
+
+        self.assertEqual(self.registry.list_versions(), ['1.2', '1.9', '1.10'])
+        self.assertEqual(self.registry.current_version(), '1.10')
+
+        self.registry.set_current('1.2')
+        self.assertEqual(self.registry.current_version(), '1.2')
+        self.assertEqual(self.registry.load('1.2').version, '1.2')
+
+    def test_rejects_bad_versions(self):
+        """Test duplicate, unknown and path-like versions are rejected"""
+        self.registry.publish(SentimentAnalyzer(), '1.0.0')
+        with self.assertRaises(ValueError):
+            self.registry.publish(SentimentAnalyzer(), '1.0.0')
+        with self.assertRaises(ValueError):
+            self.registry.publish(SentimentAnalyzer(), '../escape')
+        with self.assertRaises(ValueError):
+            self.registry.set_current('2.0.0')
+
+    def test_unreferenced_version_is_unloaded(self):
+        """Test a loaded version is released once nothing uses it"""
+        path = self.registry.publish(SentimentAnalyzer(), '1.0.0')
+        analyzer = self.registry.load('1.0.0')
+        key = (path, os.path.getmtime(path))
+        self.assertIs(_loaded_models.get(key), analyzer)
+
+        del analyzer
+        gc.collect()
+        self.assertIsNone(_loaded_models.get(key))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Unit tests for input validators
+Tests single-pass batch validation and normalization
+"""
+
+import unittest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.validators import check_text, normalize_text, sanitize_text, validate_batch
+
+class TestValidators(unittest.TestCase):
+    """Test cases for text validators"""
+
+    def test_normalize_matches_sanitize(self):
+        """Test normalization collapses whitespace like the regex version"""
+        text = '  Great\t\tproduct \n  really  '
+        self.assertEqual(normalize_text(text), 'Great product really')
+        self.assertEqual(sanitize_text(text), normalize_text(text))
+
+    def test_check_text(self):
+        """Test per-text validation results"""
+        self.assertEqual(check_text(' ok  then '), ('ok then', None))
+        self.assertEqual(check_text('   ')[1], 'Text must be a non-empty string')
+        self.assertEqual(check_text(None)[1], 'Text must be a non-empty string')
+        self.assertIsNotNone(check_text('abcdef', max_length=5)[1])
+
+    def test_validate_batch_strict(self):
+        """Test strict mode rejects the batch on the first bad item"""
+        self.assertEqual(validate_batch([' a ', 'b  c']).texts, ['a', 'b c'])
+        with self.assertRaises(ValueError):
+            validate_batch(['a', ''])
+        with self.assertRaises(ValueError):
+            validate_batch(['a'] * 3, max_items=2)
+        with self.assertRaises(ValueError):
+            validate_batch('not a list')
+
+    def test_validate_batch_partial(self):
+        """Test partial mode keeps valid items with their positions"""
+        result = validate_batch(['a', '', 'b', 7], partial=True)
+        self.assertEqual(result.texts, ['a', 'b'])
+        self.assertEqual(result.positions, [0, 2])
+        self.assertEqual([index for index, _ in result.errors], [1, 3])
+
+if __name__ == '__main__':
+    unittest.main()